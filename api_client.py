@@ -1,10 +1,13 @@
+import gzip
 import requests
 import json
+from metrics import METRICS
 
 class APIClient:
     def __init__(self, base_url):
         self.base_url = base_url
         self.session = requests.Session()
+        self.timeout = 30
         
     def get_user_profile(self) -> dict:
         response = self.session.get(f"{self.base_url}profile")
@@ -15,6 +18,12 @@ class APIClient:
         response = self.session.get(f"{self.base_url}search/mods", params=params)
         return response.json()['results']
     
-    def sync_resources(self, resources: list):
-        response = self.session.post(f"{self.base_url}sync", json=resources)
+    def sync_resources(self, changes: dict):
+        # Пакет изменений уходит одним сжатым запросом
+        body = gzip.compress(json.dumps(changes, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        response = self.session.post(f"{self.base_url}sync", data=body, timeout=self.timeout, headers={
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip'
+        })
+        METRICS.incr('sync.bytes_sent', len(body))
         return response.status_code == 200
\ No newline at end of file
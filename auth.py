@@ -1,8 +1,6 @@
 import os
 import json
 import uuid
-import webbrowser
-from http.server import BaseHTTPRequestHandler, HTTPServer
 from threading import Thread
 from PyQt5.QtCore import QObject, pyqtSignal
 
@@ -46,6 +44,9 @@ class AuthManager:
         self._save_auth_data()
 
     def _start_server(self):
+        # http.server нужен только на время входа, при старте лаунчера не импортируется
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
         class AuthHandler(BaseHTTPRequestHandler):
             def do_GET(_):
                 _.send_response(200)
@@ -128,5 +129,6 @@ class AuthManager:
         self.signals.authenticated.emit()
 
     def authenticate(self):
+        import webbrowser
         Thread(target=self._start_server, daemon=True).start()
         webbrowser.open(f'http://localhost:{self.port}')
\ No newline at end of file
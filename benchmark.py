@@ -0,0 +1,581 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import configparser
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Callable
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from endpoints import DEFAULT_ENDPOINTS
+
+RESULTS_FORMAT = 1
+VERSION_ID = '1.20.1'
+GAME_VERSIONS = ['1.21.1', '1.20.1', '1.19.2', '1.18.2', '1.16.5', '1.12.2']
+LOADER_TYPES = [1, 4, 5, 6]
+WORDS = ['craft', 'tech', 'magic', 'storage', 'farm', 'biome', 'ore', 'map', 'mob', 'tweaks',
+         'core', 'lib', 'sodium', 'create', 'quest', 'dungeon', 'boss', 'shader', 'cook', 'furniture']
+SEARCH_QUERIES = ['', 'craft', 'tech stor', 'magic dungeon boss', 'zzz']
+# Эти модули не должны загружаться до появления окна лаунчера
+DEFERRED_MODULES = ['requests', 'minecraft_launcher_lib', 'http.server', 'downloader', 'minecraft_manager']
+COLD_START_CODE = (
+    "import sys, time; start = time.perf_counter(); import main; "
+    "print((time.perf_counter() - start) * 1000); "
+    f"print(','.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+)
+
+
+def _blob(name: str, size: int) -> bytes:
+    return random.Random(name).randbytes(size)
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'max_ms': round(ordered[-1], 3)
+    }
+
+
+def _measure(fn: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def parse_size(value: str) -> int:
+    # 512K, 10M, 1G -> байты; 0 отключает ограничение
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper()
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+class SyntheticUpstream:
+    # Локальная замена Mojang, Fabric и CurseForge с детерминированным содержимым
+    def __init__(self, libraries: int, library_size: int, assets: int, asset_size: int, mods: int,
+                 latency: float = 0.0, bandwidth: int = 0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.files: Dict[str, bytes] = {}
+        self.mods: Dict[int, List[Dict]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._build_versions(libraries, library_size, assets, asset_size)
+        self._build_mods(mods)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='bench-upstream', daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _add(self, path: str, data: bytes) -> Dict:
+        self.files[path] = data
+        return {'url': f"{self.base_url}{path}", 'sha1': _sha1(data), 'size': len(data)}
+
+    def _add_json(self, path: str, value) -> Dict:
+        return self._add(path, json.dumps(value).encode('utf-8'))
+
+    def _build_versions(self, libraries: int, library_size: int, assets: int, asset_size: int):
+        objects = {}
+        for i in range(assets):
+            data = _blob(f"asset-{i}", asset_size)
+            digest = _sha1(data)
+            self.files[f"/objects/{digest[:2]}/{digest}"] = data
+            objects[f"minecraft/bench/{i}.bin"] = {'hash': digest, 'size': len(data)}
+        asset_index = self._add_json('/indexes/bench.json', {'objects': objects})
+
+        version_libraries = []
+        for i in range(libraries):
+            path = f"org/bench/lib{i}/1.0/lib{i}-1.0.jar"
+            artifact = self._add(f"/libraries/{path}", _blob(path, library_size))
+            version_libraries.append({
+                'name': f"org.bench:lib{i}:1.0",
+                'downloads': {'artifact': dict(artifact, path=path)}
+            })
+
+        client = self._add(f"/client/{VERSION_ID}.jar", _blob('client', library_size * 16))
+        version = self._add_json(f"/v1/packages/{VERSION_ID}.json", {
+            'id': VERSION_ID,
+            'type': 'release',
+            'mainClass': 'net.minecraft.client.main.Main',
+            'assets': 'bench',
+            'assetIndex': dict(asset_index, id='bench', totalSize=assets * asset_size),
+            'downloads': {'client': client},
+            'libraries': version_libraries,
+            'arguments': {'game': ['--username', '${auth_player_name}', '--uuid', '${auth_uuid}',
+                                   '--accessToken', '${auth_access_token}', '--gameDir', '${game_directory}'],
+                          'jvm': ['-Djava.library.path=${natives_directory}', '-cp', '${classpath}']},
+            'javaVersion': {'majorVersion': 17}
+        })
+
+        manifest_versions = [{'id': VERSION_ID, 'type': 'release', 'url': version['url'], 'sha1': version['sha1']}]
+        for i in range(600):
+            manifest_versions.append({'id': f"bench-{i}", 'type': 'snapshot' if i % 3 else 'release',
+                                      'url': f"{self.base_url}/v1/packages/missing-{i}.json", 'sha1': '0' * 40})
+        self._add_json('/mc/game/version_manifest_v2.json', {'latest': {'release': VERSION_ID},
+                                                              'versions': manifest_versions})
+        self._add_json('/v2/versions/game', [{'version': v, 'stable': True} for v in GAME_VERSIONS])
+
+    def _build_mods(self, count: int):
+        rng = random.Random('mods')
+        start = datetime(2026, 1, 1)
+        for loader_type in LOADER_TYPES:
+            self.mods[loader_type] = []
+        for mod_id in range(1, count + 1):
+            loader_type = LOADER_TYPES[mod_id % len(LOADER_TYPES)]
+            words = rng.sample(WORDS, 3)
+            versions = rng.sample(GAME_VERSIONS, 2)
+            self.mods[loader_type].append({
+                'id': mod_id,
+                'name': ' '.join(w.capitalize() for w in words[:2]),
+                'slug': '-'.join(words[:2]) + f"-{mod_id}",
+                'summary': f"Adds {words[2]} and {words[0]} features",
+                'categories': [{'name': words[2].capitalize()}],
+                'downloadCount': rng.randint(0, 10 ** 7),
+                'dateModified': (start - timedelta(minutes=mod_id)).isoformat() + 'Z',
+                'logo': {'thumbnailUrl': f"{self.base_url}/logos/{mod_id}.png"},
+                'latestFiles': [{'downloadUrl': f"{self.base_url}/mods/{mod_id}.jar"}],
+                'latestFilesIndexes': [{'fileId': mod_id * 10 + i, 'gameVersion': v, 'modLoader': loader_type}
+                                       for i, v in enumerate(versions)]
+            })
+
+    def search_page(self, query: Dict[str, List[str]]) -> bytes:
+        loader_type = int(query.get('modLoaderType', ['1'])[0])
+        index = int(query.get('index', ['0'])[0])
+        page_size = int(query.get('pageSize', ['50'])[0])
+        mods = self.mods.get(loader_type, [])
+        return json.dumps({
+            'data': mods[index:index + page_size],
+            'pagination': {'index': index, 'pageSize': page_size, 'totalCount': len(mods)}
+        }).encode('utf-8')
+
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with upstream._lock:
+                    upstream.requests += 1
+                if upstream.latency:
+                    time.sleep(upstream.latency)
+                url = urlparse(self.path)
+                if url.path == '/v1/mods/search':
+                    self._send(200, upstream.search_page(parse_qs(url.query)))
+                    return
+                data = upstream.files.get(url.path)
+                if data is None:
+                    self._send(404, b'')
+                    return
+                etag = f'"{_sha1(data)}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self._send(304, b'', {'ETag': etag})
+                    return
+                offset = 0
+                range_header = self.headers.get('Range', '')
+                if range_header.startswith('bytes='):
+                    offset = int(range_header[6:].split('-', 1)[0] or 0)
+                    if offset >= len(data):
+                        self._send(416, b'')
+                        return
+                    self._send(206, data[offset:], {
+                        'ETag': etag, 'Content-Range': f"bytes {offset}-{len(data) - 1}/{len(data)}"})
+                    return
+                self._send(200, data, {'ETag': etag})
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict] = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                view = memoryview(body)
+                for offset in range(0, len(body), 65536):
+                    chunk = view[offset:offset + 65536]
+                    self.wfile.write(chunk)
+                    # Ограничение полосы на соединение
+                    if upstream.bandwidth:
+                        time.sleep(len(chunk) / upstream.bandwidth)
+
+        return Handler
+
+
+class Benchmark:
+    def __init__(self, args, upstream: SyntheticUpstream, work_dir: str):
+        self.args = args
+        self.upstream = upstream
+        self.work_dir = work_dir
+        self.config = self._make_config()
+        self.minecraft_dir = os.path.expanduser(self.config['Launcher']['minecraft_dir'])
+        self._services = None
+        self._installed = False
+
+    def _make_config(self) -> configparser.ConfigParser:
+        base = self.upstream.base_url
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'Launcher': {'minecraft_dir': os.path.join(self.work_dir, 'minecraft'), 'appcds': 'false'},
+            'Mods': {'curseforge_api_key': 'bench', 'mods_dir': os.path.join(self.work_dir, 'mods')},
+            'Store': {'path': os.path.join(self.work_dir, 'store')},
+            'Cache': {'dir': os.path.join(self.work_dir, 'cache'), 'metadata_ttl': '3600', 'timeout': '10'},
+            'Downloads': {'workers': str(self.args.workers), 'timeout': '30', 'retries': '3', 'chunk_size': '65536'},
+            'Database': {'path': os.path.join(self.work_dir, 'bench.db')},
+            'Endpoints': dict({name: base for name in DEFAULT_ENDPOINTS}, minecraft_resources=f"{base}/objects")
+        })
+        return config
+
+    def services(self):
+        # Импорт по требованию: сценарии, которым хватает stdlib, работают и без зависимостей лаунчера
+        if self._services is None:
+            from database import Database
+            from downloader import DownloadManager
+            from metadata_cache import MetadataCache
+            from library_store import LibraryStore
+            from minecraft_manager import MinecraftManager
+            db = Database(self.config)
+            downloader = DownloadManager(self.config)
+            self._services = {
+                'db': db,
+                'downloader': downloader,
+                'meta': MetadataCache(self.config, downloader.session),
+                'store': LibraryStore(db, self.config),
+                'mc': MinecraftManager(db, self.config, downloader)
+            }
+        return self._services
+
+    def bench_versions(self) -> Dict:
+        meta = self.services()['meta']
+        url = f"{self.upstream.base_url}/mc/game/version_manifest_v2.json"
+        cold = _measure(lambda: meta.get_json(url), 1)[0]
+        warm = _measure(lambda: meta.get_json(url), self.args.repeat)
+        revalidate = _measure(lambda: meta.get_json(url, ttl=0), self.args.repeat)
+        fabric = _measure(lambda: meta.get_json(f"{self.upstream.base_url}/v2/versions/game", ttl=0),
+                          self.args.repeat)
+        return {
+            'cold_ms': round(cold, 3),
+            'warm': _stats(warm),
+            'revalidate': _stats(revalidate),
+            'fabric_revalidate': _stats(fabric)
+        }
+
+    def _install_files(self):
+        # Скачивающая часть установки версии в лаунчере; завершение через minecraft_launcher_lib требует
+        # настоящих серверов Mojang и в замер не входит
+        self.services()['mc'].download_version_files(VERSION_ID, lambda percent: None, lambda message: None)
+
+    def ensure_installed(self):
+        if not self._installed:
+            self._install_files()
+            self._installed = True
+
+    def bench_install(self) -> Dict:
+        from version_files import collect_version_files
+        store = self.services()['store']
+        shutil.rmtree(self.minecraft_dir, ignore_errors=True)
+
+        start = time.perf_counter()
+        self._install_files()
+        cold = time.perf_counter() - start
+        self._installed = True
+        files = collect_version_files(self.minecraft_dir, VERSION_ID)
+        total = sum(size for _, _, size in files)
+
+        warm = _measure(self._install_files, 1)[0]
+        adopt = _measure(lambda: store.adopt(VERSION_ID, files), 1)[0]
+
+        # Вторая установка той же версии в пустой каталог: только клонирование из хранилища
+        other_dir = os.path.join(self.work_dir, 'minecraft-seed')
+        seeded = [(os.path.join(other_dir, os.path.relpath(path, self.minecraft_dir)), sha1, size)
+                  for path, sha1, size in files]
+        seed = _measure(lambda: store.seed(seeded), 1)[0]
+        shutil.rmtree(other_dir, ignore_errors=True)
+
+        return {
+            'files': len(files),
+            'bytes': total,
+            'cold_s': round(cold, 3),
+            'cold_bytes_per_sec': round(total / cold) if cold else 0,
+            'cold_files_per_sec': round(len(files) / cold, 1) if cold else 0,
+            'verify_ms': round(warm, 3),
+            'store_adopt_ms': round(adopt, 3),
+            'store_seed_ms': round(seed, 3)
+        }
+
+    def bench_mod_search(self) -> Dict:
+        from mod_catalog import ModCatalog
+        services = self.services()
+        catalog = ModCatalog(services['db'], self.config, services['downloader'].session)
+        start = time.perf_counter()
+        synced = catalog.sync()
+        sync = time.perf_counter() - start
+
+        results = {'synced': synced, 'sync_s': round(sync, 3),
+                   'sync_mods_per_sec': round(synced / sync) if sync else 0}
+        for query in SEARCH_QUERIES:
+            samples = _measure(lambda: catalog.search(query, limit=100), self.args.repeat)
+            samples += _measure(lambda: catalog.search(query, 'fabric', GAME_VERSIONS[1], limit=100),
+                                self.args.repeat)
+            results[f"query[{query or '*'}]"] = _stats(samples)
+        return results
+
+    def bench_db_write(self) -> Dict:
+        db = self.services()['db']
+        rows = self.args.db_rows
+        mods = [{'name': f"Bench mod {i}", 'version': '1.0', 'file_path': os.path.join(self.work_dir, f"m{i}.jar"),
+                 'mod_id': str(i)} for i in range(rows)]
+        start = time.perf_counter()
+        for offset in range(0, rows, 500):
+            db.save_mods(mods[offset:offset + 500])
+        batched = time.perf_counter() - start
+
+        single_rows = min(rows, 500)
+        start = time.perf_counter()
+        for mod in mods[:single_rows]:
+            db.save_mod(mod)
+        single = time.perf_counter() - start
+
+        versions = [{'version': f"bench-{i}", 'type': 'vanilla', 'path': self.work_dir, 'main_class': 'Main',
+                     'libraries': [f"lib{j}.jar" for j in range(40)]} for i in range(500)]
+        start = time.perf_counter()
+        db.save_versions(versions)
+        versions_s = time.perf_counter() - start
+        return {
+            'batched_rows_per_sec': round(rows / batched) if batched else 0,
+            'single_rows_per_sec': round(single_rows / single) if single else 0,
+            'versions_rows_per_sec': round(len(versions) / versions_s) if versions_s else 0
+        }
+
+    def bench_launch_plan(self) -> Dict:
+        try:
+            from launch_plan import build_launch_plan, is_plan_current, render_command
+        except ImportError as e:
+            return {'skipped': f"launch plan dependencies missing: {e}"}
+        self.ensure_installed()
+        options = {
+            'executablePath': 'java',
+            'nativesDirectory': os.path.join(self.minecraft_dir, 'natives', 'bench'),
+            'gameDirectory': self.minecraft_dir,
+            'launcherName': 'Soreon',
+            'launcherVersion': 'bench'
+        }
+        build = _measure(lambda: build_launch_plan(self.minecraft_dir, VERSION_ID, options), 5)
+        plan = build_launch_plan(self.minecraft_dir, VERSION_ID, options)
+
+        def prepare():
+            # Горячий путь нажатия «Играть»: проверка отпечатка и подстановка данных игрока
+            if not is_plan_current(plan):
+                raise Exception("Launch plan unexpectedly stale")
+            render_command(plan, 'Bench', '00000000-0000-0000-0000-000000000000', 'token', self.minecraft_dir)
+
+        return {
+            'classpath_entries': len(plan['classpath']),
+            'build': _stats(build),
+            'cached_prepare': _stats(_measure(prepare, self.args.repeat))
+        }
+
+    def bench_cold_start(self) -> Dict:
+        # Импорт main в свежем интерпретаторе: всё, что происходит до создания QApplication
+        root = os.path.dirname(os.path.abspath(__file__))
+        samples = []
+        eager = set()
+        modules = {}
+        for _ in range(max(3, self.args.repeat // 5)):
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', COLD_START_CODE], cwd=root,
+                                    capture_output=True, text=True, timeout=120)
+            if result.returncode != 0:
+                error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error'
+                if 'ModuleNotFoundError' in error:
+                    return {'skipped': f"launcher dependencies missing: {error}"}
+                raise Exception(error)
+            elapsed, loaded = (result.stdout.strip().splitlines() + ['', ''])[:2]
+            samples.append(float(elapsed))
+            eager.update(name for name in loaded.split(',') if name)
+            # Строки -X importtime: "import time: own | cumulative | name", отступ имени — глубина вложенности
+            for line in result.stderr.splitlines():
+                parts = line.split('|')
+                if len(parts) == 3 and parts[1].strip().isdigit() and len(parts[2]) - len(parts[2].lstrip()) <= 3:
+                    name = parts[2].strip()
+                    modules[name] = max(modules.get(name, 0), int(parts[1]) / 1000)
+        stats = _stats(samples)
+        heaviest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:10]
+        slow = bool(self.args.import_budget_ms) and stats['p50_ms'] > self.args.import_budget_ms
+        return {
+            'import': stats,
+            'budget_ms': self.args.import_budget_ms,
+            'over_budget': slow or bool(eager),
+            'eager_modules': sorted(eager),
+            'heaviest_ms': {name: round(value, 1) for name, value in heaviest}
+        }
+
+
+SCENARIOS = {
+    'versions': Benchmark.bench_versions,
+    'install': Benchmark.bench_install,
+    'mod_search': Benchmark.bench_mod_search,
+    'db_write': Benchmark.bench_db_write,
+    'launch_plan': Benchmark.bench_launch_plan,
+    'cold_start': Benchmark.bench_cold_start
+}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _flatten(value, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        flat[prefix] = value
+    return flat
+
+
+def _previous_result(output_dir: str, current: str) -> Optional[str]:
+    if not os.path.isdir(output_dir):
+        return None
+    runs = sorted(name for name in os.listdir(output_dir) if name.startswith('bench-') and name.endswith('.json'))
+    runs = [os.path.join(output_dir, name) for name in runs]
+    runs = [path for path in runs if os.path.abspath(path) != os.path.abspath(current)]
+    return runs[-1] if runs else None
+
+
+def compare(previous_path: str, report: Dict):
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    if previous.get('settings') != report['settings']:
+        print("Warning: previous run used different settings, deltas are not comparable")
+    old = _flatten(previous.get('results', {}))
+    new = _flatten(report['results'])
+    print(f"\nCompared with {previous_path} ({previous.get('git') or 'unknown revision'}):")
+    for key in sorted(new):
+        if key in old and old[key]:
+            delta = (new[key] - old[key]) / old[key] * 100
+            print(f"  {key:<50} {old[key]:>14} -> {new[key]:<14} {delta:+.1f}%")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark against a local stand-in for Mojang, Fabric and CurseForge")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma-separated list of scenarios")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="added latency per request")
+    parser.add_argument('--bandwidth', default='0', help="per-connection bandwidth, e.g. 10M (0 = unlimited)")
+    parser.add_argument('--libraries', type=int, default=60)
+    parser.add_argument('--library-size', default='256K')
+    parser.add_argument('--assets', type=int, default=400)
+    parser.add_argument('--asset-size', default='4K')
+    parser.add_argument('--mods', type=int, default=4000, help="synthetic CurseForge catalog size")
+    parser.add_argument('--db-rows', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--output', default=os.path.join(os.path.expanduser('~'), '.soreon', 'bench_results'),
+                        help="directory for result JSON files (default: ~/.soreon/bench_results)")
+    parser.add_argument('--compare', help="result file to compare with (default: previous run in --output)")
+    parser.add_argument('--keep', action='store_true', help="keep the temporary work directory")
+    parser.add_argument('--import-budget-ms', type=float, default=400.0,
+                        help="fail if importing main takes longer (median, 0 = no limit)")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    settings = {
+        'latency_ms': args.latency_ms,
+        'bandwidth': parse_size(args.bandwidth),
+        'libraries': args.libraries,
+        'library_size': parse_size(args.library_size),
+        'assets': args.assets,
+        'asset_size': parse_size(args.asset_size),
+        'mods': args.mods,
+        'db_rows': args.db_rows,
+        'workers': args.workers,
+        'repeat': args.repeat
+    }
+    upstream = SyntheticUpstream(settings['libraries'], settings['library_size'], settings['assets'],
+                                 settings['asset_size'], settings['mods'], args.latency_ms / 1000,
+                                 settings['bandwidth'])
+    upstream.start()
+    work_dir = tempfile.mkdtemp(prefix='soreon-bench-')
+    bench = Benchmark(args, upstream, work_dir)
+
+    report = {
+        'format': RESULTS_FORMAT,
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'git': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': settings,
+        'results': {}
+    }
+    failed = False
+    try:
+        for name in scenarios:
+            print(f"Running {name}...")
+            start = time.perf_counter()
+            try:
+                report['results'][name] = SCENARIOS[name](bench)
+            except Exception as e:
+                failed = True
+                report['results'][name] = {'error': str(e)}
+                print(f"Error in scenario {name}: {str(e)}")
+            if report['results'][name].get('over_budget'):
+                failed = True
+                print(f"Scenario {name} is over budget")
+            print(f"  {json.dumps(report['results'][name])} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        upstream.stop()
+        if args.keep:
+            print(f"Work directory kept: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    report['requests'] = upstream.requests
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {path}")
+
+    previous = args.compare or _previous_result(args.output, path)
+    if previous:
+        compare(previous, report)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
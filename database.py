@@ -1,12 +1,276 @@
+import re
 import sqlite3
 import json
+import threading
 import configparser
+from contextlib import contextmanager
 from typing import List, Dict, Optional
-from PyQt5.QtCore import QMutex
+
+
+def _add_column(cursor, table: str, column: str, column_type: str):
+    # Базы, созданные до системы миграций, могли уже получить колонку
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def _migration_1(cursor):
+    # Исходные таблицы версий и модов
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS versions (
+            id INTEGER PRIMARY KEY,
+            version TEXT UNIQUE,
+            type TEXT,
+            path TEXT,
+            main_class TEXT,
+            libraries TEXT
+        )
+    """)
+    _add_column(cursor, 'versions', 'main_class', 'TEXT')
+    _add_column(cursor, 'versions', 'libraries', 'TEXT')
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mods (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE,
+            version TEXT,
+            file_path TEXT,
+            mod_id TEXT
+        )
+    """)
+
+
+def _migration_2(cursor):
+    # Хранилище библиотек и ассетов по SHA-1
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha1 TEXT PRIMARY KEY,
+            size INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blob_refs (
+            owner TEXT,
+            path TEXT,
+            sha1 TEXT,
+            PRIMARY KEY (owner, path)
+        )
+    """)
+
+
+def _migration_3(cursor):
+    # Кэш плана запуска
+    _add_column(cursor, 'versions', 'launch_plan', 'TEXT')
+
+
+def _migration_4(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_versions_type ON versions (type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mods_mod_id ON mods (mod_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_blob_refs_sha1 ON blob_refs (sha1)")
+
+
+def _migration_5(cursor):
+    # Локальный каталог модов с полнотекстовым поиском
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_mods (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            slug TEXT,
+            summary TEXT,
+            categories TEXT,
+            downloads INTEGER,
+            date_modified TEXT,
+            logo_url TEXT,
+            download_url TEXT,
+            files TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_mod_versions (
+            mod_id INTEGER,
+            game_version TEXT,
+            loader TEXT,
+            PRIMARY KEY (mod_id, game_version, loader)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_catalog_versions_lookup ON catalog_mod_versions (game_version, loader)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_catalog_mods_downloads ON catalog_mods (downloads DESC)")
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(
+            name, summary, categories,
+            content='catalog_mods', content_rowid='id'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS catalog_mods_ai AFTER INSERT ON catalog_mods BEGIN
+            INSERT INTO catalog_fts (rowid, name, summary, categories)
+            VALUES (new.id, new.name, new.summary, new.categories);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS catalog_mods_ad AFTER DELETE ON catalog_mods BEGIN
+            INSERT INTO catalog_fts (catalog_fts, rowid, name, summary, categories)
+            VALUES ('delete', old.id, old.name, old.summary, old.categories);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS catalog_mods_au AFTER UPDATE ON catalog_mods BEGIN
+            INSERT INTO catalog_fts (catalog_fts, rowid, name, summary, categories)
+            VALUES ('delete', old.id, old.name, old.summary, old.categories);
+            INSERT INTO catalog_fts (rowid, name, summary, categories)
+            VALUES (new.id, new.name, new.summary, new.categories);
+        END
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+
+def _migration_6(cursor):
+    # Реальный id версии в каталоге versions (у Fabric и Forge он отличается от версии игры)
+    _add_column(cursor, 'versions', 'version_id', 'TEXT')
+
+
+def _migration_7(cursor):
+    # Сборки: свой каталог игры и настройки Java поверх общих версий и хранилища
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS instances (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE,
+            version TEXT,
+            game_dir TEXT,
+            java_path TEXT,
+            max_ram TEXT,
+            jvm_args TEXT,
+            last_played REAL
+        )
+    """)
+
+
+def _migration_8(cursor):
+    # Хэши ресурсов, уже отправленных на сервер: синхронизируется только разница
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_resources (
+            kind TEXT,
+            key TEXT,
+            hash TEXT,
+            PRIMARY KEY (kind, key)
+        )
+    """)
+
+
+def _migration_9(cursor):
+    # Индекс проверки целостности: файл перехэшируется, только если изменились размер или mtime
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_index (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            sha1 TEXT
+        )
+    """)
+    _add_column(cursor, 'mods', 'sha1', 'TEXT')
+    _add_column(cursor, 'mods', 'download_url', 'TEXT')
+
+
+def _migration_10(cursor):
+    # Метаданные из jar в каталогах модов: jar перечитывается, только если изменились размер или mtime
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mod_index (
+            path TEXT PRIMARY KEY,
+            directory TEXT,
+            size INTEGER,
+            mtime_ns INTEGER,
+            loader TEXT,
+            mod_id TEXT,
+            name TEXT,
+            version TEXT,
+            description TEXT,
+            authors TEXT,
+            depends TEXT,
+            enabled INTEGER,
+            error TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_index_directory ON mod_index (directory)")
+
+
+def _migration_11(cursor):
+    # Отпечатки CurseForge (murmur2) и SHA-1 для поиска обновлений; старые записи индекса перечитываются
+    _add_column(cursor, 'mod_index', 'fingerprint', 'INTEGER')
+    _add_column(cursor, 'mod_index', 'sha1', 'TEXT')
+    cursor.execute("DELETE FROM mod_index")
+
+
+def _migration_12(cursor):
+    # Версии и сборки ключуются id профиля: ванильная версия, Fabric и Forge одной версии игры живут рядом
+    _add_column(cursor, 'instances', 'version_id', 'TEXT')
+    cursor.execute("UPDATE versions SET version_id = version WHERE version_id IS NULL")
+    cursor.execute("""
+        UPDATE instances SET version_id = COALESCE(
+            (SELECT version_id FROM versions WHERE versions.version = instances.version), version)
+        WHERE version_id IS NULL
+    """)
+    # UNIQUE с колонки version снимается только пересозданием таблицы
+    cursor.execute("""
+        CREATE TABLE versions_new (
+            id INTEGER PRIMARY KEY,
+            version TEXT,
+            type TEXT,
+            path TEXT,
+            main_class TEXT,
+            libraries TEXT,
+            launch_plan TEXT,
+            version_id TEXT UNIQUE
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO versions_new (id, version, type, path, main_class, libraries, launch_plan, version_id)
+        SELECT id, version, type, path, main_class, libraries, launch_plan, version_id FROM versions
+    """)
+    cursor.execute("DROP TABLE versions")
+    cursor.execute("ALTER TABLE versions_new RENAME TO versions")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_versions_type ON versions (type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_versions_version ON versions (version, type)")
+
+
+def _migration_13(cursor):
+    # Версия загрузчика: модпак ставится на ту сборку Fabric/Forge, что указана в его манифесте
+    _add_column(cursor, 'versions', 'loader_version', 'TEXT')
+    cursor.execute("SELECT id, version, type, version_id FROM versions WHERE type IN ('fabric', 'forge')")
+    for row_id, version, version_type, version_id in cursor.fetchall():
+        if version_type == 'fabric':
+            match = re.match(r"fabric-loader-(.+)-" + re.escape(version) + "$", version_id or '')
+        else:
+            match = re.match(re.escape(version) + r"-forge-?(.+)$", version_id or '')
+        if match:
+            cursor.execute("UPDATE versions SET loader_version = ? WHERE id = ?", (match.group(1), row_id))
+
+
+# Номер миграции хранится в PRAGMA user_version; новые миграции добавляются только в конец
+MIGRATIONS = [
+    _migration_1,
+    _migration_2,
+    _migration_3,
+    _migration_4,
+    _migration_5,
+    _migration_6,
+    _migration_7,
+    _migration_8,
+    _migration_9,
+    _migration_10,
+    _migration_11,
+    _migration_12,
+    _migration_13,
+]
+
 
 class Database:
     _instance = None
-    _mutex = QMutex()
+    _write_lock = threading.Lock()
 
     def __new__(cls, config=None):
         if cls._instance is None:
@@ -23,106 +287,369 @@ class Database:
         except (configparser.NoSectionError, configparser.NoOptionError):
             db_path = 'soreon.db'
 
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.execute("PRAGMA foreign_keys = ON")
-        self.init_tables()
+        self.db_path = db_path
+        self._local = threading.local()
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.migrate()
 
-    def init_tables(self):
-        cursor = self.conn.cursor()
-        
-        # Создание таблицы версий
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS versions (
-                id INTEGER PRIMARY KEY,
-                version TEXT UNIQUE,
-                type TEXT,
-                path TEXT,
-                main_class TEXT,
-                libraries TEXT
-            )
-        """)
-        
-        # Проверка и добавление отсутствующих колонок
-        cursor.execute("PRAGMA table_info(versions)")
-        columns = {column[1] for column in cursor.fetchall()}
-        
-        if 'main_class' not in columns:
-            cursor.execute("ALTER TABLE versions ADD COLUMN main_class TEXT")
-        if 'libraries' not in columns:
-            cursor.execute("ALTER TABLE versions ADD COLUMN libraries TEXT")
-
-        # Создание таблицы модов
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS mods (
-                id INTEGER PRIMARY KEY,
-                name TEXT UNIQUE,
-                version TEXT,
-                file_path TEXT,
-                mod_id TEXT
-            )
-        """)
-        
-        self.conn.commit()
-
-    def save_version(self, version: str, version_type: str, path: str, main_class: str, libraries: list):
-        self._mutex.lock()
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO versions 
-                (version, type, path, main_class, libraries)
-                VALUES (?, ?, ?, ?, ?)
-            """, (version, version_type, path, main_class, json.dumps(libraries)))
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            raise e
-        finally:
-            self._mutex.unlock()
-
-    def get_version(self, version: str) -> Optional[Dict]:
-        self._mutex.lock()
-        try:
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Своё соединение на каждый поток: чтения в WAL не блокируют друг друга
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        with self._write_lock:
             cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def migrate(self):
+        with self.transaction() as cursor:
+            cursor.execute("PRAGMA user_version")
+            current = cursor.fetchone()[0]
+            for number, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {number}")
+
+    def save_version(self, version: str, version_type: str, path: str, main_class: str, libraries: list,
+                     version_id: Optional[str] = None, loader_version: Optional[str] = None):
+        self.save_versions([{
+            'version': version,
+            'type': version_type,
+            'path': path,
+            'main_class': main_class,
+            'libraries': libraries,
+            'version_id': version_id,
+            'loader_version': loader_version
+        }])
+
+    def save_versions(self, versions: List[Dict]):
+        with self.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO versions
+                (version, type, path, main_class, libraries, version_id, loader_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(v['version'], v['type'], v['path'], v['main_class'], json.dumps(v['libraries']),
+                   v.get('version_id') or v['version'], v.get('loader_version'))
+                  for v in versions])
+
+    def _version_from_row(self, row) -> Dict:
+        return {
+            "version": row[0],
+            "type": row[1],
+            "path": row[2],
+            "main_class": row[3],
+            "libraries": json.loads(row[4]) if row[4] else [],
+            "launch_plan": json.loads(row[5]) if row[5] else None,
+            "version_id": row[6] or row[0]
+        }
+
+    def get_version(self, version_id: str) -> Optional[Dict]:
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT version, type, path, main_class, libraries, launch_plan, version_id
+            FROM versions WHERE version_id = ?
+        ''', (version_id,))
+        row = cursor.fetchone()
+        return self._version_from_row(row) if row else None
+
+    def find_version(self, version: str, version_type: str, loader_version: Optional[str] = None) -> Optional[Dict]:
+        # Последняя установленная версия игры с этим загрузчиком (и его версией, если она задана)
+        cursor = self.conn.cursor()
+        query = '''
+            SELECT version, type, path, main_class, libraries, launch_plan, version_id
+            FROM versions WHERE version = ? AND type = ?
+        '''
+        params = [version, version_type]
+        if loader_version:
+            query += ' AND loader_version = ?'
+            params.append(loader_version)
+        cursor.execute(query + ' ORDER BY id DESC LIMIT 1', params)
+        row = cursor.fetchone()
+        return self._version_from_row(row) if row else None
+
+    def get_versions(self) -> List[Dict]:
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT version, type, path, version_id FROM versions ORDER BY version, version_id')
+        return [{
+            "version": row[0],
+            "type": row[1],
+            "path": row[2],
+            "version_id": row[3] or row[0]
+        } for row in cursor.fetchall()]
+
+    def save_launch_plan(self, version_id: str, plan: Dict):
+        with self.transaction() as cursor:
             cursor.execute('''
-                SELECT version, type, path, main_class, libraries 
-                FROM versions WHERE version = ?
-            ''', (version,))
-            row = cursor.fetchone()
-            if row:
-                return {
-                    "version": row[0],
-                    "type": row[1],
-                    "path": row[2],
-                    "main_class": row[3],
-                    "libraries": json.loads(row[4]) if row[4] else []
-                }
-            return None
-        finally:
-            self._mutex.unlock()
+                UPDATE versions SET main_class = ?, libraries = ?, launch_plan = ?
+                WHERE version_id = ?
+            ''', (plan['main_class'], json.dumps(plan['classpath']), json.dumps(plan), version_id))
 
     def save_mod(self, mod: Dict):
-        self._mutex.lock()
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO mods (name, version, file_path)
-                VALUES (?, ?, ?)
-            ''', (mod['name'], mod['version'], mod['file_path']))
-            self.conn.commit()
-        finally:
-            self._mutex.unlock()
+        self.save_mods([mod])
+
+    def save_mods(self, mods: List[Dict]):
+        with self.transaction() as cursor:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO mods (name, version, file_path, mod_id, sha1, download_url)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(mod['name'], mod['version'], mod['file_path'], mod.get('mod_id'), mod.get('sha1'),
+                   mod.get('download_url')) for mod in mods])
 
     def get_mods(self) -> List[Dict]:
-        self._mutex.lock()
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT * FROM mods')
-            return [{
-                "id": row[0],
-                "name": row[1],
-                "version": row[2],
-                "file_path": row[3]
-            } for row in cursor.fetchall()]
-        finally:
-            self._mutex.unlock()
\ No newline at end of file
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, name, version, file_path, mod_id, sha1, download_url FROM mods')
+        return [{
+            "id": row[0],
+            "name": row[1],
+            "version": row[2],
+            "file_path": row[3],
+            "mod_id": row[4],
+            "sha1": row[5],
+            "download_url": row[6]
+        } for row in cursor.fetchall()]
+
+    def replace_blob_refs(self, owner: str, refs: List[tuple]):
+        with self.transaction() as cursor:
+            cursor.execute('DELETE FROM blob_refs WHERE owner = ?', (owner,))
+            cursor.executemany('INSERT OR IGNORE INTO blobs (sha1, size) VALUES (?, ?)',
+                               [(sha1, size) for sha1, size, _ in refs])
+            cursor.executemany('INSERT OR REPLACE INTO blob_refs (owner, path, sha1) VALUES (?, ?, ?)',
+                               [(owner, path, sha1) for sha1, _, path in refs])
+
+    def get_referenced_blobs(self) -> set:
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT DISTINCT sha1 FROM blob_refs')
+        return {row[0] for row in cursor.fetchall()}
+
+    def delete_orphan_blobs(self):
+        with self.transaction() as cursor:
+            cursor.execute('DELETE FROM blobs WHERE sha1 NOT IN (SELECT sha1 FROM blob_refs)')
+
+    def get_sync_state(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT value FROM sync_state WHERE key = ?', (key,))
+        row = cursor.fetchone()
+        return row[0] if row else default
+
+    def set_sync_state(self, values: Dict[str, Optional[str]], cursor=None):
+        if cursor is None:
+            with self.transaction() as cursor:
+                return self.set_sync_state(values, cursor)
+        for key, value in values.items():
+            if value is None:
+                cursor.execute('DELETE FROM sync_state WHERE key = ?', (key,))
+            else:
+                cursor.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, value))
+
+    def save_catalog_mods(self, mods: List[Dict], state: Optional[Dict[str, Optional[str]]] = None):
+        # Страница каталога и курсор синхронизации пишутся одной транзакцией
+        with self.transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO catalog_mods
+                (id, name, slug, summary, categories, downloads, date_modified, logo_url, download_url, files)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    name = excluded.name, slug = excluded.slug, summary = excluded.summary,
+                    categories = excluded.categories, downloads = excluded.downloads,
+                    date_modified = excluded.date_modified, logo_url = excluded.logo_url,
+                    download_url = excluded.download_url, files = excluded.files
+            ''', [(m['id'], m['name'], m['slug'], m['summary'], m['categories'], m['downloads'],
+                   m['date_modified'], m['logo_url'], m['download_url'], json.dumps(m['files'])) for m in mods])
+            cursor.executemany('DELETE FROM catalog_mod_versions WHERE mod_id = ?', [(m['id'],) for m in mods])
+            cursor.executemany('INSERT OR IGNORE INTO catalog_mod_versions (mod_id, game_version, loader) VALUES (?, ?, ?)',
+                               [(m['id'], game_version, loader) for m in mods for game_version, loader in m['versions']])
+            if state:
+                self.set_sync_state(state, cursor)
+
+    def search_catalog(self, match: Optional[str], loader: Optional[str] = None, game_version: Optional[str] = None,
+                       limit: int = 50, offset: int = 0) -> List[Dict]:
+        where = []
+        params = []
+        if match:
+            source = 'catalog_fts JOIN catalog_mods m ON m.id = catalog_fts.rowid'
+            where.append('catalog_fts MATCH ?')
+            params.append(match)
+            order = 'bm25(catalog_fts, 10.0, 1.0, 2.0), m.downloads DESC'
+        else:
+            source = 'catalog_mods m'
+            order = 'm.downloads DESC'
+        if loader or game_version:
+            condition = 'SELECT 1 FROM catalog_mod_versions v WHERE v.mod_id = m.id'
+            if loader:
+                condition += ' AND v.loader = ?'
+                params.append(loader)
+            if game_version:
+                condition += ' AND v.game_version = ?'
+                params.append(game_version)
+            where.append(f'EXISTS ({condition})')
+
+        sql = f'''
+            SELECT m.id, m.name, m.slug, m.summary, m.categories, m.downloads, m.logo_url, m.download_url
+            FROM {source}
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+        '''
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params + [limit, offset])
+        return [{
+            "id": row[0],
+            "name": row[1],
+            "slug": row[2],
+            "summary": row[3],
+            "categories": row[4],
+            "downloadCount": row[5],
+            "logoUrl": row[6],
+            "downloadUrl": row[7]
+        } for row in cursor.fetchall()]
+
+    def get_catalog_files(self, mod_id: int) -> List[Dict]:
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT files FROM catalog_mods WHERE id = ?', (mod_id,))
+        row = cursor.fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def save_instance(self, instance: Dict) -> int:
+        with self.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO instances (name, version, version_id, game_dir, java_path, max_ram, jvm_args)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    version = excluded.version, version_id = excluded.version_id, game_dir = excluded.game_dir,
+                    java_path = excluded.java_path, max_ram = excluded.max_ram, jvm_args = excluded.jvm_args
+            ''', (instance['name'], instance['version'], instance['version_id'], instance['game_dir'],
+                  instance.get('java_path'), instance.get('max_ram'), json.dumps(instance.get('jvm_args') or [])))
+            cursor.execute('SELECT id FROM instances WHERE name = ?', (instance['name'],))
+            return cursor.fetchone()[0]
+
+    def _instance_from_row(self, row) -> Dict:
+        return {
+            "id": row[0],
+            "name": row[1],
+            "version": row[2],
+            "game_dir": row[3],
+            "java_path": row[4],
+            "max_ram": row[5],
+            "jvm_args": json.loads(row[6]) if row[6] else [],
+            "last_played": row[7],
+            "version_id": row[8] or row[2]
+        }
+
+    def get_instances(self) -> List[Dict]:
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, name, version, game_dir, java_path, max_ram, jvm_args, last_played, version_id
+            FROM instances ORDER BY last_played IS NULL, last_played DESC, name
+        ''')
+        return [self._instance_from_row(row) for row in cursor.fetchall()]
+
+    def get_instance(self, instance_id: int) -> Optional[Dict]:
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, name, version, game_dir, java_path, max_ram, jvm_args, last_played, version_id
+            FROM instances WHERE id = ?
+        ''', (instance_id,))
+        row = cursor.fetchone()
+        return self._instance_from_row(row) if row else None
+
+    def touch_instance(self, instance_id: int, played_at: float):
+        with self.transaction() as cursor:
+            cursor.execute('UPDATE instances SET last_played = ? WHERE id = ?', (played_at, instance_id))
+
+    def delete_instance(self, instance_id: int):
+        with self.transaction() as cursor:
+            cursor.execute('DELETE FROM instances WHERE id = ?', (instance_id,))
+
+    def get_synced_hashes(self) -> Dict[tuple, str]:
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT kind, key, hash FROM sync_resources')
+        return {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+
+    def mark_synced(self, upserted: List[tuple], deleted: List[tuple]):
+        with self.transaction() as cursor:
+            cursor.executemany('INSERT OR REPLACE INTO sync_resources (kind, key, hash) VALUES (?, ?, ?)', upserted)
+            cursor.executemany('DELETE FROM sync_resources WHERE kind = ? AND key = ?', deleted)
+
+    def get_file_index(self, paths: List[str]) -> Dict[str, tuple]:
+        index = {}
+        cursor = self.conn.cursor()
+        # Ограничение SQLite на число параметров в одном запросе
+        for offset in range(0, len(paths), 500):
+            chunk = paths[offset:offset + 500]
+            cursor.execute(f"SELECT path, size, mtime_ns, sha1 FROM file_index WHERE path IN ({','.join('?' * len(chunk))})",
+                           chunk)
+            index.update({row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()})
+        return index
+
+    def save_file_index(self, entries: List[tuple]):
+        with self.transaction() as cursor:
+            cursor.executemany('INSERT OR REPLACE INTO file_index (path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)',
+                               entries)
+
+    def get_mod_index_stats(self, directory: str) -> Dict[str, tuple]:
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT path, size, mtime_ns FROM mod_index WHERE directory = ?', (directory,))
+        return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    def save_mod_index(self, entries: List[Dict]):
+        with self.transaction() as cursor:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO mod_index
+                (path, directory, size, mtime_ns, loader, mod_id, name, version, description, authors, depends,
+                 enabled, error, fingerprint, sha1)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(e['path'], e['directory'], e['size'], e['mtime_ns'], e['loader'], e['mod_id'], e['name'],
+                   e['version'], e['description'], e['authors'], json.dumps(e['depends']), int(e['enabled']),
+                   e['error'], e.get('fingerprint'), e.get('sha1')) for e in entries])
+
+    def delete_mod_index(self, paths: List[str]):
+        with self.transaction() as cursor:
+            cursor.executemany('DELETE FROM mod_index WHERE path = ?', [(path,) for path in paths])
+
+    def search_mod_index(self, directory: str, query: str = '', loader: Optional[str] = None,
+                         limit: int = 100, offset: int = 0) -> List[Dict]:
+        where = ['directory = ?']
+        params = [directory]
+        if query:
+            where.append("(name LIKE ? OR mod_id LIKE ? OR description LIKE ?)")
+            params += [f"%{query}%"] * 3
+        if loader:
+            where.append('loader = ?')
+            params.append(loader)
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+            SELECT path, loader, mod_id, name, version, description, authors, depends, enabled, error, size,
+                   fingerprint, sha1
+            FROM mod_index
+            WHERE {' AND '.join(where)}
+            ORDER BY name COLLATE NOCASE
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset])
+        return [{
+            "path": row[0],
+            "loader": row[1],
+            "mod_id": row[2],
+            "name": row[3],
+            "version": row[4],
+            "description": row[5],
+            "authors": row[6],
+            "depends": json.loads(row[7]) if row[7] else [],
+            "enabled": bool(row[8]),
+            "error": row[9],
+            "size": row[10],
+            "fingerprint": row[11],
+            "sha1": row[12]
+        } for row in cursor.fetchall()]
@@ -0,0 +1,322 @@
+import os
+import time
+import queue
+import hashlib
+import itertools
+import threading
+import requests
+from concurrent.futures import Future, as_completed
+from typing import List, Optional, Callable
+from requests.adapters import HTTPAdapter
+from metrics import METRICS
+from mirrors import MirrorSelector
+
+
+# Классы приоритета: меньше — раньше; задачи из очереди берутся по приоритету, внутри класса — по порядку
+PRIORITY_LAUNCH = 0
+PRIORITY_USER = 1
+PRIORITY_BACKGROUND = 2
+
+
+class DownloadError(Exception):
+    def __init__(self, message: str, failed: Optional[List['DownloadTask']] = None):
+        super().__init__(message)
+        # Задачи, которые не удалось скачать: остальные файлы пакета на месте и проверены
+        self.failed = failed or []
+
+
+class DownloadTask:
+    def __init__(self, url: str, path: str, size: int = 0, sha1: Optional[str] = None):
+        self.url = url
+        self.path = path
+        self.size = size
+        self.sha1 = sha1
+
+
+def file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _Progress:
+    # Общий прогресс по всем задачам пакета: проценты и скорость в байтах/сек
+    def __init__(self, tasks: List[DownloadTask], progress_cb: Optional[Callable], speed_cb: Optional[Callable]):
+        self.progress_cb = progress_cb
+        self.speed_cb = speed_cb
+        self.sizes = {id(t): t.size for t in tasks}
+        self.done = {id(t): 0 for t in tasks}
+        self.finished = 0
+        self.count = len(tasks)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.last_emit = 0.0
+
+    def start(self, task: DownloadTask, offset: int, total: int):
+        with self.lock:
+            if total:
+                self.sizes[id(task)] = total
+            self.done[id(task)] = offset
+
+    def advance(self, task: DownloadTask, count: int):
+        with self.lock:
+            self.done[id(task)] += count
+            self.window_bytes += count
+            self._emit()
+
+    def complete(self, task: DownloadTask):
+        with self.lock:
+            self.finished += 1
+            size = self.sizes[id(task)] or self.done[id(task)]
+            self.sizes[id(task)] = self.done[id(task)] = size
+            self._emit(force=True)
+
+    def _emit(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self.last_emit < 0.1:
+            return
+        self.last_emit = now
+
+        if self.progress_cb:
+            total = sum(self.sizes.values())
+            if total:
+                percent = sum(self.done.values()) * 100 // total
+            else:
+                percent = self.finished * 100 // max(self.count, 1)
+            self.progress_cb(min(int(percent), 100))
+
+        elapsed = now - self.window_start
+        if self.speed_cb and elapsed >= 0.5:
+            self.speed_cb(self.window_bytes / elapsed)
+            self.window_start = now
+            self.window_bytes = 0
+
+
+class TokenBucket:
+    # Ограничение скорости в байтах/сек; 0 — без ограничения. Запас — одна секунда трафика
+    def __init__(self, rate: int = 0):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate: int):
+        with self.lock:
+            self.rate = rate
+            self.tokens = min(self.tokens, float(rate))
+
+    def consume(self, count: int):
+        while True:
+            with self.lock:
+                if not self.rate:
+                    return
+                now = time.monotonic()
+                self.tokens = min(float(self.rate), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Кусок больше запаса уходит в долг, следующие ждут, пока долг не погасится
+                if self.tokens > 0:
+                    self.tokens -= count
+                    return
+                wait = -self.tokens / self.rate
+            # Короткий сон: лимит может смениться, пока поток ждёт
+            time.sleep(min(wait, 0.25) or 0.01)
+
+
+class _PriorityExecutor:
+    def __init__(self, workers: int, name: str):
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        for number in range(workers):
+            threading.Thread(target=self._work, name=f"{name}-{number}", daemon=True).start()
+
+    def submit(self, priority: int, fn: Callable, *args) -> Future:
+        future = Future()
+        self._queue.put((priority, next(self._order), future, fn, args))
+        return future
+
+    def _work(self):
+        while True:
+            _, _, future, fn, args = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+class DownloadManager:
+    def __init__(self, config=None):
+        self.workers = self._get_int(config, 'workers', 8)
+        self.timeout = self._get_int(config, 'timeout', 30)
+        self.retries = self._get_int(config, 'retries', 3)
+        self.chunk_size = self._get_int(config, 'chunk_size', 65536)
+        # Лимиты в КБ/с: обычные и на время, пока запущена хотя бы одна игра
+        self.limits = {
+            False: (self._get_int(config, 'rate_limit', 0), self._get_int(config, 'background_rate_limit', 0)),
+            True: (self._get_int(config, 'game_rate_limit', 2048), self._get_int(config, 'game_background_rate_limit', 256))
+        }
+        self.game_running = False
+        self.bucket = TokenBucket()
+        self.background_bucket = TokenBucket()
+        self._apply_limits()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'SoreonLauncher/1.0.0'
+        self._executor = _PriorityExecutor(self.workers, 'download')
+        self.mirrors = MirrorSelector(config, self.session)
+        self.mirrors.start()
+
+    @staticmethod
+    def _get_int(config, option: str, default: int) -> int:
+        if config is None or not config.has_section('Downloads'):
+            return default
+        return config.getint('Downloads', option, fallback=default)
+
+    def _apply_limits(self):
+        rate, background_rate = self.limits[self.game_running]
+        self.bucket.set_rate(rate * 1024)
+        self.background_bucket.set_rate(background_rate * 1024)
+
+    def set_game_running(self, running: bool):
+        # Пока идёт игра, загрузки лаунчера не должны забирать канал целиком
+        if running == self.game_running:
+            return
+        self.game_running = running
+        self._apply_limits()
+        self.mirrors.paused = running
+        METRICS.event('download_limits', game_running=running, limits=self.limits[running])
+
+    def _throttle(self, count: int, priority: int):
+        if priority >= PRIORITY_BACKGROUND:
+            self.background_bucket.consume(count)
+        self.bucket.consume(count)
+
+    def fetch_bytes(self, url: str, priority: int = PRIORITY_BACKGROUND, timeout: int = 15) -> bytes:
+        # Мелкие ответы целиком в память (иконки и т.п.), под теми же лимитами скорости
+        with self.session.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            chunks = []
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                chunks.append(chunk)
+                self._throttle(len(chunk), priority)
+        return b''.join(chunks)
+
+    def download(self, url: str, path: str, sha1: Optional[str] = None,
+                 progress_cb: Optional[Callable] = None, speed_cb: Optional[Callable] = None,
+                 priority: int = PRIORITY_USER):
+        self.download_many([DownloadTask(url, path, sha1=sha1)], progress_cb, speed_cb, priority)
+
+    def download_many(self, tasks: List[DownloadTask], progress_cb: Optional[Callable] = None,
+                      speed_cb: Optional[Callable] = None, priority: int = PRIORITY_USER):
+        progress = _Progress(tasks, progress_cb, speed_cb)
+        errors = []
+        failed = []
+        with METRICS.phase('download.batch', files=len(tasks), priority=priority):
+            futures = {self._executor.submit(priority, self._fetch, task, progress, priority): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(f"{futures[future].url}: {str(e)}")
+                    failed.append(futures[future])
+        if errors:
+            raise DownloadError(f"Не удалось скачать файлов: {len(errors)}. {errors[0]}", failed)
+
+    def _fetch(self, task: DownloadTask, progress: _Progress, priority: int):
+        if task.sha1 and os.path.exists(task.path) and file_sha1(task.path) == task.sha1:
+            METRICS.incr('download.cache_hits')
+            progress.complete(task)
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(task.path)), exist_ok=True)
+        part_path = f"{task.path}.part"
+
+        # Зеркала используются только для файлов с известным SHA-1: проверка всегда идёт по хэшу апстрима
+        urls = self.mirrors.candidates(task.url) if task.sha1 else [task.url]
+        sources = []
+        error = None
+        for url in urls:
+            started = time.perf_counter()
+            resumed = os.path.exists(part_path)
+            try:
+                # Зеркало получает одну попытку и уступает следующему, повторы с паузой — только у апстрима
+                self._fetch_with_retries(task, url, part_path, progress, priority,
+                                         self.retries if url == task.url else 0)
+            except (requests.RequestException, OSError) as e:
+                self.mirrors.record_failure(url)
+                error = e
+                if os.path.exists(part_path):
+                    sources.append(url)
+                continue
+            sources.append(url)
+
+            if task.sha1 and file_sha1(part_path) != task.sha1:
+                os.remove(part_path)
+                METRICS.incr('download.hash_mismatches')
+                for source in set(sources):
+                    if source != task.url:
+                        self.mirrors.record_failure(source, bad_data=True)
+                sources = []
+                error = DownloadError(f"Контрольная сумма не совпадает: {task.path}")
+                continue
+            elapsed = time.perf_counter() - started
+            size = os.path.getsize(part_path)
+            self.mirrors.record_success(url, size, elapsed)
+            METRICS.transfer(url, size, elapsed, resumed)
+
+            os.replace(part_path, task.path)
+            progress.complete(task)
+            return
+        METRICS.incr('download.failures')
+        raise error
+
+    def _fetch_with_retries(self, task: DownloadTask, url: str, part_path: str, progress: _Progress,
+                            priority: int, retries: int):
+        for attempt in range(retries + 1):
+            try:
+                self._fetch_once(task, url, part_path, progress, priority)
+                return
+            except (requests.RequestException, OSError) as e:
+                METRICS.incr('download.retries')
+                METRICS.event('retry', url=url, attempt=attempt + 1, error=str(e))
+                if attempt == retries:
+                    raise
+                time.sleep(min(2 ** attempt, 10))
+
+    def _fetch_once(self, task: DownloadTask, url: str, part_path: str, progress: _Progress, priority: int):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if offset and response.status_code == 416:
+                # Сервер считает, что файл уже докачан полностью
+                if task.size and offset == task.size:
+                    progress.start(task, offset, offset)
+                    return
+                os.remove(part_path)
+                return self._fetch_once(task, url, part_path, progress, priority)
+
+            response.raise_for_status()
+            if offset and response.status_code == 206:
+                mode = 'ab'
+            else:
+                offset = 0
+                mode = 'wb'
+
+            length = int(response.headers.get('Content-Length', 0))
+            progress.start(task, offset, offset + length if length else task.size)
+
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    progress.advance(task, len(chunk))
+                    self._throttle(len(chunk), priority)
@@ -0,0 +1,26 @@
+DEFAULT_ENDPOINTS = {
+    'mojang_meta': 'https://launchermeta.mojang.com',
+    'minecraft_resources': 'https://resources.download.minecraft.net',
+    'fabric_meta': 'https://meta.fabricmc.net',
+    'fabric_maven': 'https://maven.fabricmc.net',
+    'forge_maven': 'https://maven.minecraftforge.net',
+    'forge_files': 'https://files.minecraftforge.net',
+    'curseforge_api': 'https://api.curseforge.com',
+    'modrinth_api': 'https://api.modrinth.com'
+}
+
+
+def endpoint(config, name: str) -> str:
+    # Базовый адрес сервиса; секция [Endpoints] позволяет подменить его, например, на локальный стенд
+    default = DEFAULT_ENDPOINTS[name]
+    if config is not None and config.has_section('Endpoints'):
+        return config.get('Endpoints', name, fallback=default).rstrip('/')
+    return default
+
+
+def rebase(config, name: str, url: str) -> str:
+    # Адреса из чужих профилей (например, url библиотек Fabric) переводятся на настроенный хост
+    default = DEFAULT_ENDPOINTS[name]
+    if url.startswith(default):
+        return endpoint(config, name) + url[len(default):]
+    return url
@@ -0,0 +1,85 @@
+import re
+import json
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from typing import List, Dict, Optional
+from endpoints import endpoint
+
+FORGE_PATH = "/net/minecraftforge/forge"
+
+
+def _version_key(version: str) -> tuple:
+    return tuple(int(part) if part.isdigit() else 0 for part in re.split(r"[.\-]", version))
+
+
+def parse_maven_metadata(text: str) -> Dict[str, List[str]]:
+    # Версия игры -> сборки Forge, от новых к старым
+    index = {}
+    root = ElementTree.fromstring(text)
+    for element in root.iter('version'):
+        build = (element.text or '').strip()
+        if '-' not in build:
+            continue
+        game_version = build.split('-', 1)[0]
+        index.setdefault(game_version, []).append(build)
+    for builds in index.values():
+        builds.sort(key=lambda b: _version_key(b.split('-', 1)[1]), reverse=True)
+    return index
+
+
+def installer_version_id(installer_path: str) -> Optional[str]:
+    # id версии, которую создаст установщик: version.json в новых, install_profile.json в старых
+    with zipfile.ZipFile(installer_path) as archive:
+        names = set(archive.namelist())
+        if 'version.json' in names:
+            return json.loads(archive.read('version.json'))['id']
+        if 'install_profile.json' in names:
+            profile = json.loads(archive.read('install_profile.json'))
+            return profile.get('versionInfo', {}).get('id') or profile.get('version')
+    return None
+
+
+class ForgeResolver:
+    def __init__(self, meta, config=None):
+        self.meta = meta
+        self.maven_url = f"{endpoint(config, 'forge_maven')}{FORGE_PATH}"
+        self.promotions_url = f"{endpoint(config, 'forge_files')}{FORGE_PATH}/promotions_slim.json"
+        self._index = None
+        self._source = None
+
+    def get_index(self, offline: bool = False) -> Dict[str, List[str]]:
+        text = self.meta.get_text(f"{self.maven_url}/maven-metadata.xml", offline=offline)
+        # Разбор XML повторяется только при смене содержимого кэша
+        if text is not self._source:
+            self._index = parse_maven_metadata(text)
+            self._source = text
+        return self._index
+
+    def game_versions(self, offline: bool = False) -> List[str]:
+        return sorted(self.get_index(offline), key=_version_key, reverse=True)
+
+    def pick_build(self, game_version: str, offline: bool = False, loader_version: Optional[str] = None) -> str:
+        builds = self.get_index(offline).get(game_version)
+        if not builds:
+            raise Exception(f"Forge не поддерживает версию {game_version}")
+        if loader_version:
+            # Старые сборки Forge несут версию игры ещё и в конце: 1.7.10-10.13.4.1614-1.7.10
+            prefix = f"{game_version}-{loader_version}"
+            for build in builds:
+                if build == prefix or build.startswith(f"{prefix}-"):
+                    return build
+            raise Exception(f"Forge {loader_version} не найден для версии {game_version}")
+        try:
+            promos = self.meta.get_json(self.promotions_url, offline=offline).get('promos', {})
+        except Exception:
+            promos = {}
+        for channel in ('recommended', 'latest'):
+            promoted = promos.get(f"{game_version}-{channel}")
+            if promoted:
+                for build in builds:
+                    if build.startswith(f"{game_version}-{promoted}"):
+                        return build
+        return builds[0]
+
+    def installer_url(self, build: str) -> str:
+        return f"{self.maven_url}/{build}/forge-{build}-installer.jar"
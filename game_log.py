@@ -0,0 +1,267 @@
+import os
+import re
+import glob
+import gzip
+import time
+import shutil
+import locale
+import threading
+from collections import deque
+from typing import List, Dict, Optional
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPlainTextEdit
+from tasks import run_task
+from metrics import METRICS
+
+LOG_NAME = 'launcher-output'
+# Кусок без перевода строки длиннее этого считается строкой: буфер не растёт на выводе без переносов
+MAX_LINE = 64 * 1024
+MAX_FINDING_LINE = 300
+
+SEVERITY_CRASH = 'crash'
+SEVERITY_ERROR = 'error'
+
+# (ключ, важность, описание для пользователя, шаблон); все шаблоны проверяются одним регулярным выражением
+SIGNATURES = [
+    ('crash_report', SEVERITY_CRASH, "Игра упала, сохранён отчёт о сбое",
+     r"Crash report saved to"),
+    ('crash_header', SEVERITY_CRASH, "Игра упала",
+     r"---- Minecraft Crash Report ----"),
+    ('out_of_memory', SEVERITY_CRASH, "Java не хватило памяти: увеличьте выделенную память сборки",
+     r"java\.lang\.OutOfMemoryError"),
+    ('heap_reserve', SEVERITY_CRASH, "JVM не смогла выделить память: уменьшите выделенную память сборки",
+     r"Could not reserve enough space for|Invalid maximum heap size|Could not create the Java Virtual Machine"),
+    ('java_version', SEVERITY_CRASH, "Неподходящая версия Java для этой версии игры",
+     r"UnsupportedClassVersionError|compiled by a more recent version of the Java Runtime"),
+    ('incompatible_mods', SEVERITY_CRASH, "Несовместимые моды или не хватает зависимостей",
+     r"Incompatible mods? (?:set|found)|Mod resolution (?:encountered|failed)|"
+     r"Missing or unsupported mandatory dependencies|ModLoadingException|DuplicateModsFoundException"),
+    ('mixin', SEVERITY_CRASH, "Мод не смог применить mixin: вероятно, он собран для другой версии игры",
+     r"Mixin apply(?: for mod \S+)? failed|MixinTransformerError|InvalidInjectionException"),
+    ('opengl', SEVERITY_CRASH, "Драйвер видеокарты не поддерживает нужную версию OpenGL",
+     r"GLFW error 6554[23]|Pixel format not accelerated|driver does not appear to support OpenGL"),
+    ('main_exception', SEVERITY_CRASH, "Необработанное исключение в главном потоке игры",
+     r'Exception in thread "(?:main|Render thread|Server thread)"'),
+    ('missing_class', SEVERITY_ERROR, "Не найден класс или метод: мод не для этой версии или не хватает библиотеки",
+     r"NoClassDefFoundError|ClassNotFoundException|NoSuchMethodError|NoSuchFieldError"),
+]
+SIGNATURE_RE = re.compile('|'.join(f"(?P<s{number}>{pattern})" for number, (_, _, _, pattern) in enumerate(SIGNATURES)))
+CRASH_REPORT_RE = re.compile(r"Crash report saved to:?\s*(?:#@!@#\s*)?(\S.*?)\s*$")
+ARCHIVE_RE = re.compile(re.escape(LOG_NAME) + r"-\d{8}-\d{6}(?:-\d+)?\.log(?:\.gz)?$")
+
+_archive_locks: Dict[str, threading.Lock] = {}
+_archive_locks_guard = threading.Lock()
+
+
+def _archive(logs_dir: str, backups: int):
+    # Ротации подряд ставят несколько задач в общий пул: в одном каталоге они выполняются по очереди,
+    # иначе два потока сжимали бы один файл в тот же .gz.part
+    with _archive_locks_guard:
+        lock = _archive_locks.setdefault(os.path.abspath(logs_dir), threading.Lock())
+    with lock:
+        _compress_archives(logs_dir, backups)
+
+
+def _compress_archives(logs_dir: str, backups: int):
+    # Сжимает все несжатые архивы (в том числе брошенные при закрытии лаунчера) и удаляет лишние
+    for path in glob.glob(os.path.join(logs_dir, f"{LOG_NAME}-*.log")):
+        if not ARCHIVE_RE.search(os.path.basename(path)):
+            continue
+        part_path = f"{path}.gz.part"
+        with open(path, 'rb') as source, gzip.open(part_path, 'wb') as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(part_path, f"{path}.gz")
+        os.remove(path)
+    archives = sorted(path for path in glob.glob(os.path.join(logs_dir, f"{LOG_NAME}-*.log.gz"))
+                      if ARCHIVE_RE.search(os.path.basename(path)))
+    for path in archives[:max(len(archives) - backups, 0)]:
+        os.remove(path)
+
+
+class GameLog(QObject):
+    lines_added = pyqtSignal(list)
+    problem_detected = pyqtSignal(dict)
+
+    def __init__(self, logs_dir: str, buffer_lines: int = 5000, max_file_bytes: int = 20 * 1024 * 1024,
+                 backups: int = 10, parent=None):
+        super().__init__(parent)
+        self.logs_dir = logs_dir
+        self.path = os.path.join(logs_dir, f"{LOG_NAME}.log")
+        self.max_file_bytes = max_file_bytes
+        self.backups = backups
+        # Память ограничена последними строками; полный вывод остаётся только на диске
+        self.lines = deque(maxlen=buffer_lines)
+        self.total_lines = 0
+        self.findings: Dict[str, Dict] = {}
+        self.crash_report: Optional[str] = None
+        self.encoding = locale.getpreferredencoding(False) or 'utf-8'
+        self._partial = b''
+        self._file = None
+        self._written = 0
+        os.makedirs(logs_dir, exist_ok=True)
+        # Вывод прошлого запуска уходит в архив, новый сеанс пишется в чистый файл
+        self._rotate()
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path):
+                stamp = time.strftime('%Y%m%d-%H%M%S')
+                target = os.path.join(self.logs_dir, f"{LOG_NAME}-{stamp}.log")
+                number = 2
+                while os.path.exists(target) or os.path.exists(f"{target}.gz"):
+                    target = os.path.join(self.logs_dir, f"{LOG_NAME}-{stamp}-{number}.log")
+                    number += 1
+                os.replace(self.path, target)
+                # Сжатие идёт в фоне: чтение вывода игры не должно ждать gzip
+                run_task(_archive, self.logs_dir, self.backups,
+                         on_error=lambda message: print(f"Error archiving game log: {message}"))
+            self._file = open(self.path, 'w', encoding='utf-8', newline='\n')
+            self._written = 0
+        except OSError as e:
+            # Без файла лог остаётся в буфере: запись на диск не должна мешать игре
+            print(f"Error opening game log: {str(e)}")
+
+    def _decode(self, chunk: bytes) -> str:
+        # log4j пишет в UTF-8, но JVM и нативные библиотеки — в кодировке системы
+        try:
+            return chunk.decode('utf-8').rstrip('\r')
+        except UnicodeDecodeError:
+            return chunk.decode(self.encoding, 'replace').rstrip('\r')
+
+    def feed(self, data: bytes):
+        if not data:
+            return
+        chunks = (self._partial + data).split(b'\n')
+        self._partial = chunks.pop()
+        if len(self._partial) > MAX_LINE:
+            chunks.append(self._partial)
+            self._partial = b''
+        if chunks:
+            self._add([self._decode(chunk) for chunk in chunks])
+
+    def close(self):
+        if self._partial:
+            self._add([self._decode(self._partial)])
+            self._partial = b''
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _add(self, lines: List[str]):
+        self.lines.extend(lines)
+        for line in lines:
+            self.total_lines += 1
+            match = SIGNATURE_RE.search(line)
+            if match:
+                self._found(SIGNATURES[int(match.lastgroup[1:])], line)
+        self._write(lines)
+        self.lines_added.emit(lines)
+
+    def _found(self, signature: tuple, line: str):
+        key, severity, title, _ = signature
+        if key == 'crash_report':
+            match = CRASH_REPORT_RE.search(line)
+            if match:
+                self.crash_report = match.group(1)
+        finding = self.findings.get(key)
+        if finding:
+            # Повторы только считаются: список находок ограничен числом сигнатур
+            finding['count'] += 1
+            return
+        finding = {
+            'key': key,
+            'severity': severity,
+            'title': title,
+            'line': line.strip()[:MAX_FINDING_LINE],
+            'line_number': self.total_lines,
+            'count': 1
+        }
+        self.findings[key] = finding
+        METRICS.incr(f"game_log.{key}")
+        self.problem_detected.emit(finding)
+
+    def _write(self, lines: List[str]):
+        if not self._file:
+            return
+        text = '\n'.join(lines) + '\n'
+        try:
+            self._file.write(text)
+            self._file.flush()
+        except OSError as e:
+            print(f"Error writing game log: {str(e)}")
+            self._file.close()
+            self._file = None
+            return
+        self._written += len(text)
+        if self._written >= self.max_file_bytes:
+            self._rotate()
+
+    @property
+    def crashed(self) -> bool:
+        return any(finding['severity'] == SEVERITY_CRASH for finding in self.findings.values())
+
+    def problems(self) -> List[Dict]:
+        return sorted(self.findings.values(), key=lambda finding: (finding['severity'] != SEVERITY_CRASH,
+                                                                   finding['line_number']))
+
+    def summary(self) -> str:
+        lines = [f"• {finding['title']}" for finding in self.problems()]
+        if self.crash_report:
+            lines.append(f"Отчёт о сбое: {self.crash_report}")
+        return "\n".join(lines)
+
+    def tail(self, count: int = 200) -> List[str]:
+        return list(self.lines)[-count:]
+
+
+class LogViewer(QDialog):
+    # Показывает буфер лога и дописывает новые строки по мере поступления
+    def __init__(self, log: GameLog, title: str, parent=None):
+        super().__init__(parent)
+        self.log = log
+        self.setWindowTitle(f"Лог: {title}")
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.resize(960, 600)
+
+        layout = QVBoxLayout(self)
+        self.problems_label = QLabel()
+        self.problems_label.setWordWrap(True)
+        self.problems_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        # Окно хранит не больше строк, чем буфер, сколько бы ни шла игра
+        self.text.setMaximumBlockCount(log.lines.maxlen)
+        self.text.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.problems_label)
+        layout.addWidget(self.text)
+
+        self.text.setPlainText("\n".join(log.lines))
+        self.text.verticalScrollBar().setValue(self.text.verticalScrollBar().maximum())
+        self.update_problems()
+        log.lines_added.connect(self.append_lines)
+        log.problem_detected.connect(self.update_problems)
+
+    def append_lines(self, lines: List[str]):
+        scroll_bar = self.text.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 4
+        self.text.appendPlainText("\n".join(lines))
+        # Прокрутка следует за логом, только если пользователь не листает историю
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def update_problems(self, finding=None):
+        summary = self.log.summary()
+        self.problems_label.setText(summary or "Проблем не обнаружено")
+
+    def closeEvent(self, event):
+        try:
+            self.log.lines_added.disconnect(self.append_lines)
+            self.log.problem_detected.disconnect(self.update_problems)
+        except TypeError:
+            pass
+        super().closeEvent(event)
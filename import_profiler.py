@@ -0,0 +1,81 @@
+import sys
+import time
+from typing import List, Dict
+
+
+class _TimedLoader:
+    def __init__(self, profiler: 'ImportProfiler', loader):
+        self._profiler = profiler
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # После загрузки модулю возвращается настоящий загрузчик: importlib.resources и pkgutil смотрят на него
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit()
+
+
+class ImportProfiler:
+    # Аналог python -X importtime: собственное и суммарное время выполнения каждого модуля
+    def __init__(self):
+        self.timings: Dict[str, tuple] = {}
+        self._stack: List[list] = []
+        self.installed = False
+
+    def install(self):
+        if not self.installed:
+            sys.meta_path.insert(0, self)
+            self.installed = True
+
+    def uninstall(self):
+        if self.installed:
+            sys.meta_path.remove(self)
+            self.installed = False
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(self, spec.loader)
+                return spec
+        return None
+
+    def _enter(self, name: str):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self):
+        name, started, children = self._stack.pop()
+        total = time.perf_counter() - started
+        self.timings[name] = (total - children, total, len(self._stack))
+        if self._stack:
+            self._stack[-1][2] += total
+
+    def top(self, limit: int = 20) -> List[tuple]:
+        # (модуль, собственное мс, суммарное мс) для модулей верхнего уровня и самых тяжёлых вложенных
+        rows = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)
+        return [(name, own * 1000, total * 1000) for name, (own, total, _) in rows[:limit]]
+
+    def total_ms(self) -> float:
+        return sum(total for own, total, depth in self.timings.values() if depth == 0) * 1000
+
+    def report(self, limit: int = 20) -> str:
+        lines = [f"Импорт модулей: {self.total_ms():.1f} мс"]
+        lines += [f"  {total:8.1f} мс (своё {own:6.1f}) {name}" for name, own, total in self.top(limit)]
+        return "\n".join(lines)
+
+
+IMPORT_PROFILER = ImportProfiler()
@@ -0,0 +1,219 @@
+import os
+import re
+import time
+import shutil
+from typing import List, Dict, Optional
+from PyQt5.QtCore import QObject, QProcess, QTimer, pyqtSignal
+from jvm_profiles import total_memory_mb
+from game_log import GameLog
+from metrics import METRICS
+
+# Запуск без выбранной сборки: общий каталог игры, как до появления сборок
+DEFAULT_INSTANCE = "Общая папка"
+STOP_TIMEOUT_MS = 10000
+
+STATUS_STOPPED = 'stopped'
+STATUS_STARTING = 'starting'
+STATUS_RUNNING = 'running'
+STATUS_STOPPING = 'stopping'
+STATUS_CRASHED = 'crashed'
+
+
+class InstanceManager(QObject):
+    status_changed = pyqtSignal(int, str)
+    exited = pyqtSignal(int, int)
+
+    def __init__(self, db, mc_manager, config, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.mc_manager = mc_manager
+        root = '~/.soreon/instances'
+        self.max_running = 4
+        self.memory_reserve_mb = 2048
+        if config.has_section('Instances'):
+            root = config.get('Instances', 'dir', fallback=root)
+            self.max_running = config.getint('Instances', 'max_running', fallback=self.max_running)
+            self.memory_reserve_mb = config.getint('Instances', 'memory_reserve_mb', fallback=self.memory_reserve_mb)
+        self.root = os.path.expanduser(root)
+        self.log_buffer_lines = 5000
+        self.log_max_file_mb = 20
+        self.log_backups = 10
+        if config.has_section('Logs'):
+            self.log_buffer_lines = config.getint('Logs', 'buffer_lines', fallback=self.log_buffer_lines)
+            self.log_max_file_mb = config.getint('Logs', 'max_file_mb', fallback=self.log_max_file_mb)
+            self.log_backups = config.getint('Logs', 'backups', fallback=self.log_backups)
+        self.processes: Dict[int, QProcess] = {}
+        self.heaps: Dict[int, int] = {}
+        self.statuses: Dict[int, str] = {}
+        # Лог последнего запуска сборки живёт и после выхода игры: по нему видна причина падения
+        self.logs: Dict[int, GameLog] = {}
+        self._stopping = set()
+
+    def list_instances(self) -> List[Dict]:
+        return [instance for instance in self.db.get_instances() if instance['name'] != DEFAULT_INSTANCE]
+
+    def get(self, instance_id: int) -> Optional[Dict]:
+        return self.db.get_instance(instance_id)
+
+    def _find(self, name: str) -> Optional[Dict]:
+        return next((instance for instance in self.db.get_instances() if instance['name'] == name), None)
+
+    def unique_name(self, name: str) -> str:
+        candidate = name.strip() or "Сборка"
+        number = 2
+        while self._find(candidate) or candidate == DEFAULT_INSTANCE:
+            candidate = f"{name.strip()} ({number})"
+            number += 1
+        return candidate
+
+    def create(self, name: str, version_id: str, java_path: Optional[str] = None, max_ram: Optional[str] = None,
+               jvm_args: Optional[List[str]] = None) -> Dict:
+        name = name.strip()
+        if not name or name == DEFAULT_INSTANCE:
+            raise Exception("Некорректное название сборки")
+        if self._find(name):
+            raise Exception(f"Сборка {name} уже существует")
+        # Сборка привязана к профилю, а не к версии игры: Fabric и Forge одной версии не подменяют друг друга
+        version_data = self.db.get_version(version_id)
+        if not version_data:
+            raise Exception(f"Версия {version_id} не установлена")
+
+        # Библиотеки, ассеты и версии общие; у сборки свои моды, конфиги и миры
+        game_dir = os.path.join(self.root, re.sub(r"[^\w.-]+", '_', name))
+        for sub_dir in ('mods', 'config', 'saves'):
+            os.makedirs(os.path.join(game_dir, sub_dir), exist_ok=True)
+        instance_id = self.db.save_instance({
+            'name': name,
+            'version': version_data['version'],
+            'version_id': version_id,
+            'game_dir': game_dir,
+            'java_path': java_path,
+            'max_ram': max_ram,
+            'jvm_args': jvm_args
+        })
+        return self.get(instance_id)
+
+    def get_default(self) -> Optional[Dict]:
+        return self._find(DEFAULT_INSTANCE)
+
+    def default_instance(self, version_id: str) -> Dict:
+        version_data = self.db.get_version(version_id)
+        if not version_data:
+            raise Exception(f"Версия {version_id} не установлена")
+        instance = self._find(DEFAULT_INSTANCE) or {'name': DEFAULT_INSTANCE}
+        instance.update(version=version_data['version'], version_id=version_id, game_dir=self.mc_manager.minecraft_dir)
+        return self.get(self.db.save_instance(instance))
+
+    def delete(self, instance_id: int, remove_files: bool = False):
+        if instance_id in self.processes:
+            raise Exception("Нельзя удалить запущенную сборку")
+        instance = self.get(instance_id)
+        if not instance:
+            return
+        self.db.delete_instance(instance_id)
+        # Удаляются только каталоги внутри корня сборок, общий каталог игры не трогается
+        if remove_files and os.path.abspath(instance['game_dir']).startswith(os.path.abspath(self.root) + os.sep):
+            shutil.rmtree(instance['game_dir'], ignore_errors=True)
+
+    def status(self, instance_id: int) -> str:
+        return self.statuses.get(instance_id, STATUS_STOPPED)
+
+    def running_count(self) -> int:
+        return len(self.processes)
+
+    def launch(self, instance_id: int, args: dict) -> QProcess:
+        instance = self.get(instance_id)
+        if not instance:
+            raise Exception("Сборка не найдена")
+        if instance_id in self.processes:
+            raise Exception(f"Сборка {instance['name']} уже запущена")
+        if len(self.processes) >= self.max_running:
+            raise Exception(f"Одновременно можно запустить не больше {self.max_running} сборок")
+
+        # Кучи всех запущенных сборок вместе с новой должны уместиться в физической памяти
+        heap = self.mc_manager.heap_size(instance['game_dir'], instance.get('max_ram'))
+        available = total_memory_mb() - self.memory_reserve_mb - sum(self.heaps.values())
+        if heap > available:
+            raise Exception(f"Недостаточно памяти для запуска: нужно {heap} МБ, доступно {max(available, 0)} МБ")
+
+        process = QProcess(self)
+        process.setProcessChannelMode(QProcess.MergedChannels)
+        log = GameLog(os.path.join(instance['game_dir'], 'logs'), self.log_buffer_lines,
+                      self.log_max_file_mb * 1024 * 1024, self.log_backups)
+        self.logs[instance_id] = log
+        process.readyReadStandardOutput.connect(lambda: log.feed(bytes(process.readAllStandardOutput())))
+        process.started.connect(lambda: self._set_status(instance_id, STATUS_RUNNING))
+        process.finished.connect(lambda code, exit_status: self._on_finished(instance_id, code, exit_status))
+        process.errorOccurred.connect(lambda error: self._on_error(instance_id, error))
+
+        self.processes[instance_id] = process
+        self.heaps[instance_id] = heap
+        self._set_status(instance_id, STATUS_STARTING)
+        try:
+            self.mc_manager.launch(instance['version_id'], process, args, instance)
+        except Exception:
+            self._forget(instance_id)
+            self._set_status(instance_id, STATUS_STOPPED)
+            raise
+        self.db.touch_instance(instance_id, time.time())
+        METRICS.event('instance_launch', instance=instance['name'], version=instance['version_id'], heap_mb=heap)
+        return process
+
+    def stop(self, instance_id: int):
+        process = self.processes.get(instance_id)
+        if not process:
+            return
+        self._stopping.add(instance_id)
+        self._set_status(instance_id, STATUS_STOPPING)
+        process.terminate()
+
+        def kill():
+            if self.processes.get(instance_id) is process:
+                process.kill()
+
+        QTimer.singleShot(STOP_TIMEOUT_MS, kill)
+
+    def stop_all(self, wait_ms: int = 3000):
+        for instance_id, process in list(self.processes.items()):
+            self._stopping.add(instance_id)
+            process.terminate()
+            if not process.waitForFinished(wait_ms):
+                process.kill()
+                process.waitForFinished(wait_ms)
+
+    def _set_status(self, instance_id: int, status: str):
+        self.statuses[instance_id] = status
+        self.status_changed.emit(instance_id, status)
+
+    def _forget(self, instance_id: int):
+        self.heaps.pop(instance_id, None)
+        self._stopping.discard(instance_id)
+        process = self.processes.pop(instance_id, None)
+        if process:
+            log = self.logs.get(instance_id)
+            if log:
+                log.feed(bytes(process.readAllStandardOutput()))
+                log.close()
+            process.deleteLater()
+
+    def crash_summary(self, instance_id: int) -> str:
+        log = self.logs.get(instance_id)
+        return log.summary() if log else ""
+
+    def _on_finished(self, instance_id: int, code: int, exit_status):
+        stopped = instance_id in self._stopping
+        # Остаток вывода дочитывается в _forget, до проверки на отчёт о сбое
+        self._forget(instance_id)
+        log = self.logs.get(instance_id)
+        # Игра может сохранить отчёт о сбое и выйти с кодом 0
+        crashed = not stopped and (exit_status == QProcess.CrashExit or code != 0 or
+                                   (log is not None and log.crash_report is not None))
+        self._set_status(instance_id, STATUS_CRASHED if crashed else STATUS_STOPPED)
+        self.exited.emit(instance_id, code)
+
+    def _on_error(self, instance_id: int, error):
+        # finished не приходит, если процесс так и не стартовал
+        if error == QProcess.FailedToStart and instance_id in self.processes:
+            print(f"Error starting instance {instance_id}: {self.processes[instance_id].errorString()}")
+            self._forget(instance_id)
+            self._set_status(instance_id, STATUS_CRASHED)
@@ -0,0 +1,166 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Optional, Callable
+from downloader import DownloadTask, file_sha1, PRIORITY_LAUNCH
+from version_files import collect_version_files, collect_version_urls
+from endpoints import endpoint, rebase
+from metrics import METRICS
+
+# Крупные jar хэшируются в отдельных процессах, мелкие файлы — в потоках: запуск процесса дороже их хэша
+LARGE_FILE_SIZE = 4 * 1024 * 1024
+
+REASON_MISSING = 'missing'
+REASON_SIZE = 'size'
+REASON_HASH = 'hash'
+
+
+class VerifyIssue:
+    def __init__(self, path: str, sha1: str, size: int, url: Optional[str], reason: str):
+        self.path = path
+        self.sha1 = sha1
+        self.size = size
+        self.url = url
+        self.reason = reason
+
+
+class VerifyReport:
+    def __init__(self):
+        self.checked = 0
+        self.hashed = 0
+        self.issues: List[VerifyIssue] = []
+        self.repaired: List[str] = []
+        self.failed: List[tuple] = []
+
+    @property
+    def ok(self) -> bool:
+        return len(self.repaired) == len(self.issues) and not self.failed
+
+
+class IntegrityVerifier:
+    def __init__(self, db, store, downloader, minecraft_dir: str, config):
+        self.db = db
+        self.store = store
+        self.downloader = downloader
+        self.minecraft_dir = minecraft_dir
+        self.config = config
+        self.resources_url = endpoint(config, 'minecraft_resources')
+        self.workers = os.cpu_count() or 4
+
+    def expected_files(self, version_id: str, mods_dir: Optional[str] = None) -> List[tuple]:
+        # (путь, sha1, размер, url) для файлов версии и модов с известным хэшем
+        urls = collect_version_urls(self.minecraft_dir, version_id, self.resources_url)
+        files = {}
+        for path, sha1, size in collect_version_files(self.minecraft_dir, version_id):
+            url = urls.get(path)
+            files[path] = (path, sha1, size, rebase(self.config, 'fabric_maven', url) if url else None)
+        if mods_dir:
+            mods_dir = os.path.abspath(mods_dir)
+            for mod in self.db.get_mods():
+                path = mod['file_path']
+                if mod['sha1'] and path and os.path.dirname(os.path.abspath(path)) == mods_dir:
+                    files[path] = (path, mod['sha1'], 0, mod['download_url'])
+        return list(files.values())
+
+    def verify(self, version_id: str, mods_dir: Optional[str] = None,
+               progress_cb: Optional[Callable] = None) -> VerifyReport:
+        report = VerifyReport()
+        files = self.expected_files(version_id, mods_dir)
+        index = self.db.get_file_index([f[0] for f in files])
+        to_hash = []
+
+        with METRICS.phase('verify.scan', version=version_id, files=len(files)):
+            for path, sha1, size, url in files:
+                report.checked += 1
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    report.issues.append(VerifyIssue(path, sha1, size, url, REASON_MISSING))
+                    continue
+                if size and stat.st_size != size:
+                    report.issues.append(VerifyIssue(path, sha1, size, url, REASON_SIZE))
+                    continue
+                cached = index.get(path)
+                if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                    if cached[2] != sha1:
+                        report.issues.append(VerifyIssue(path, sha1, size, url, REASON_HASH))
+                    continue
+                to_hash.append((path, sha1, size, url, stat))
+
+        if to_hash:
+            with METRICS.phase('verify.hash', files=len(to_hash)):
+                self._hash_files(to_hash, report, progress_cb)
+        METRICS.incr('verify.files', report.checked)
+        METRICS.incr('verify.hashed', report.hashed)
+        return report
+
+    def _hash_files(self, files: List[tuple], report: VerifyReport, progress_cb: Optional[Callable]):
+        large = [f for f in files if f[4].st_size >= LARGE_FILE_SIZE]
+        small = [f for f in files if f[4].st_size < LARGE_FILE_SIZE]
+        entries = []
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as threads:
+            processes = ProcessPoolExecutor(max_workers=self.workers) if large else None
+            try:
+                futures = [(f, processes.submit(file_sha1, f[0])) for f in large]
+                futures += [(f, threads.submit(file_sha1, f[0])) for f in small]
+                for (path, sha1, size, url, stat), future in futures:
+                    done += 1
+                    if progress_cb:
+                        progress_cb(int(done * 100 / len(files)))
+                    try:
+                        actual = future.result()
+                    except OSError:
+                        report.issues.append(VerifyIssue(path, sha1, size, url, REASON_MISSING))
+                        continue
+                    report.hashed += 1
+                    entries.append((path, stat.st_size, stat.st_mtime_ns, actual))
+                    if actual != sha1:
+                        report.issues.append(VerifyIssue(path, sha1, size, url, REASON_HASH))
+            finally:
+                if processes:
+                    processes.shutdown()
+        self.db.save_file_index(entries)
+
+    def repair(self, report: VerifyReport, progress_cb: Optional[Callable] = None,
+               speed_cb: Optional[Callable] = None) -> VerifyReport:
+        tasks = []
+        fixed = []
+        for issue in report.issues:
+            if os.path.exists(issue.path):
+                # Жёсткая ссылка делит содержимое с blob в хранилище: испорчены оба
+                linked = self.store.has(issue.sha1) and os.path.samefile(self.store.blob_path(issue.sha1), issue.path)
+                os.remove(issue.path)
+                if linked:
+                    os.remove(self.store.blob_path(issue.sha1))
+            if self.store.has(issue.sha1) and file_sha1(self.store.blob_path(issue.sha1)) == issue.sha1:
+                self.store.materialize(issue.sha1, issue.path)
+                fixed.append(issue)
+            elif issue.url:
+                tasks.append((issue, DownloadTask(issue.url, issue.path, issue.size, issue.sha1)))
+            else:
+                report.failed.append((issue.path, "Нет адреса для скачивания"))
+
+        if tasks:
+            with METRICS.phase('verify.repair', files=len(tasks)):
+                try:
+                    # Без этих файлов игра не запустится: они обгоняют остальные загрузки в очереди
+                    self.downloader.download_many([task for _, task in tasks], progress_cb, speed_cb, PRIORITY_LAUNCH)
+                except Exception as e:
+                    print(f"Error repairing files: {str(e)}")
+            for issue, task in tasks:
+                # Загрузчик заменяет файл только после проверки SHA-1
+                if os.path.exists(task.path):
+                    self.store.add_file(task.path, issue.sha1)
+                    fixed.append(issue)
+                else:
+                    report.failed.append((issue.path, "Не удалось скачать"))
+
+        entries = []
+        for issue in fixed:
+            stat = os.stat(issue.path)
+            entries.append((issue.path, stat.st_size, stat.st_mtime_ns, issue.sha1))
+            report.repaired.append(issue.path)
+        self.db.save_file_index(entries)
+        METRICS.incr('verify.repaired', len(report.repaired))
+        return report
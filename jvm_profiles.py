@@ -0,0 +1,134 @@
+import os
+import re
+import ctypes
+import shutil
+import platform
+import threading
+import subprocess
+from typing import List, Optional
+
+BASE_HEAP_MB = 2048
+HEAP_PER_MOD_MB = 48
+MIN_HEAP_MB = 1024
+
+_java_versions = {}
+_java_lock = threading.Lock()
+
+
+def total_memory_mb() -> int:
+    system = platform.system()
+    try:
+        if system == 'Windows':
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [
+                    ('dwLength', ctypes.c_ulong),
+                    ('dwMemoryLoad', ctypes.c_ulong),
+                    ('ullTotalPhys', ctypes.c_ulonglong),
+                    ('ullAvailPhys', ctypes.c_ulonglong),
+                    ('ullTotalPageFile', ctypes.c_ulonglong),
+                    ('ullAvailPageFile', ctypes.c_ulonglong),
+                    ('ullTotalVirtual', ctypes.c_ulonglong),
+                    ('ullAvailVirtual', ctypes.c_ulonglong),
+                    ('ullAvailExtendedVirtual', ctypes.c_ulonglong)
+                ]
+            status = MemoryStatus()
+            status.dwLength = ctypes.sizeof(MemoryStatus)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return status.ullTotalPhys // (1024 * 1024)
+        if system == 'Darwin':
+            output = subprocess.run(['sysctl', '-n', 'hw.memsize'], capture_output=True, text=True).stdout
+            return int(output.strip()) // (1024 * 1024)
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 4096
+
+
+def parse_memory_mb(value: str) -> int:
+    match = re.fullmatch(r"\s*(\d+)\s*([KMGkmg]?)\s*", value or '')
+    if not match:
+        raise ValueError(f"Некорректный объём памяти: {value}")
+    amount, unit = int(match.group(1)), match.group(2).upper()
+    if unit == 'G':
+        return amount * 1024
+    if unit == 'K':
+        return amount // 1024
+    # Число без единицы — мегабайты: в настройках пишут «4096», а не объём в байтах
+    return amount
+
+
+def _java_key(java: str) -> tuple:
+    # Путь вместе со временем изменения: после обновления Java по тому же пути версия определяется заново
+    path = shutil.which(java) or java
+    try:
+        return path, os.path.getmtime(path)
+    except OSError:
+        return path, None
+
+
+def java_major_version(java: str) -> int:
+    # Запускает java -version, поэтому вызывается только из фоновых потоков; дальше ответ берётся из кэша
+    key = _java_key(java)
+    with _java_lock:
+        if key in _java_versions:
+            return _java_versions[key]
+    try:
+        output = subprocess.run([java, '-version'], capture_output=True, text=True, timeout=15).stderr
+        match = re.search(r'version "(\d+)(?:\.(\d+))?', output)
+        major = int(match.group(1)) if match else 8
+        # Java 8 и более ранние сообщают версию как 1.8
+        if major == 1 and match.group(2):
+            major = int(match.group(2))
+    except (OSError, subprocess.SubprocessError):
+        major = 8
+    with _java_lock:
+        _java_versions[key] = major
+    return major
+
+
+def heap_size_mb(mod_count: int, max_ram_mb: Optional[int]) -> int:
+    heap = BASE_HEAP_MB + HEAP_PER_MOD_MB * mod_count
+    # Не больше половины физической памяти, чтобы системе и лаунчеру хватило остального
+    heap = max(min(heap, total_memory_mb() // 2), MIN_HEAP_MB)
+    # Ограничение пользователя применяется последним: куча никогда не превышает заданный объём
+    if max_ram_mb:
+        heap = min(heap, max_ram_mb)
+    return heap
+
+
+def gc_args(java_version: int, heap_mb: int) -> List[str]:
+    # На больших кучах поколенческий ZGC даёт паузы меньше миллисекунды.
+    # С Java 23 он включён по умолчанию, а флаг ZGenerational устарел и будет удалён
+    if java_version >= 21 and heap_mb >= 8192:
+        return ['-XX:+UseZGC', '-XX:+ZGenerational'] if java_version < 23 else ['-XX:+UseZGC']
+
+    args = ['-XX:+UseG1GC', '-XX:+ParallelRefProcEnabled', '-XX:MaxGCPauseMillis=200',
+            '-XX:+UnlockExperimentalVMOptions', '-XX:+DisableExplicitGC',
+            '-XX:G1NewSizePercent=30', '-XX:G1MaxNewSizePercent=40', '-XX:G1HeapRegionSize=8M',
+            '-XX:G1ReservePercent=20', '-XX:G1HeapWastePercent=5', '-XX:G1MixedGCCountTarget=4',
+            '-XX:InitiatingHeapOccupancyPercent=15', '-XX:G1MixedGCLiveThresholdPercent=90',
+            '-XX:SurvivorRatio=32', '-XX:+PerfDisableSharedMem', '-XX:MaxTenuringThreshold=1']
+    # Флаг устарел в Java 20 вместе с переделкой уточнения remembered set
+    if java_version < 20:
+        args.append('-XX:G1RSetUpdatingPauseTimePercent=5')
+    return args
+
+
+def cds_args(java_version: int, archive_path: str) -> List[str]:
+    # AppCDS: первый запуск пишет архив классов, следующие его переиспользуют
+    if java_version >= 19:
+        return ['-XX:+AutoCreateSharedArchive', f"-XX:SharedArchiveFile={archive_path}"]
+    if java_version >= 13:
+        if os.path.exists(archive_path):
+            return [f"-XX:SharedArchiveFile={archive_path}"]
+        return [f"-XX:ArchiveClassesAtExit={archive_path}"]
+    return []
+
+
+def build_jvm_args(java: str, mod_count: int, max_ram: Optional[str] = None,
+                   cds_archive: Optional[str] = None) -> List[str]:
+    java_version = java_major_version(java)
+    heap = heap_size_mb(mod_count, parse_memory_mb(max_ram) if max_ram else None)
+    args = [f"-Xms{heap}M", f"-Xmx{heap}M"] + gc_args(java_version, heap)
+    if cds_archive:
+        args += cds_args(java_version, cds_archive)
+    return args
@@ -0,0 +1,77 @@
+import os
+import hashlib
+from typing import List, Dict
+from version_files import version_json_path, load_version_chain
+
+PLAN_FORMAT = 2
+
+# Подставляются вместо данных пользователя и каталога сборки при сборке плана и заменяются при запуске
+PLACEHOLDERS = {
+    'username': '${soreon_username}',
+    'uuid': '${soreon_uuid}',
+    'token': '${soreon_token}',
+    'gameDirectory': '${soreon_game_dir}'
+}
+
+
+def files_fingerprint(paths: List[str]) -> str:
+    digest = hashlib.sha1(f"plan-format:{PLAN_FORMAT}".encode('utf-8'))
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        except OSError:
+            digest.update(f"{path}:missing".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_launch_plan(minecraft_dir: str, version_id: str, options: Dict) -> Dict:
+    # Нужен только при пересборке плана; на горячем пути запуска пакет не импортируется
+    from minecraft_launcher_lib.command import get_minecraft_command
+    chain = load_version_chain(minecraft_dir, version_id)
+    if not chain:
+        raise Exception(f"Не найден JSON версии {version_id}")
+    files = [version_json_path(minecraft_dir, data['id']) for data in chain]
+
+    plan_options = dict(options, **PLACEHOLDERS)
+    command = get_minecraft_command(version_id, minecraft_dir, plan_options)
+
+    classpath = []
+    main_class = chain[0].get('mainClass', '')
+    if '-cp' in command:
+        index = command.index('-cp')
+        classpath = command[index + 1].split(os.pathsep)
+        if index + 2 < len(command):
+            main_class = command[index + 2]
+
+    return {
+        'format': PLAN_FORMAT,
+        'version': version_id,
+        'command': command,
+        'classpath': classpath,
+        'main_class': main_class,
+        'natives_dir': options.get('nativesDirectory', os.path.join(minecraft_dir, 'versions', version_id, 'natives')),
+        'files': files,
+        'fingerprint': files_fingerprint(files)
+    }
+
+
+def is_plan_current(plan: Dict) -> bool:
+    return (plan.get('format') == PLAN_FORMAT
+            and plan.get('fingerprint') == files_fingerprint(plan.get('files', [])))
+
+
+def render_command(plan: Dict, username: str, uuid: str, token: str, game_dir: str) -> List[str]:
+    values = {
+        PLACEHOLDERS['username']: username,
+        PLACEHOLDERS['uuid']: uuid,
+        PLACEHOLDERS['token']: token,
+        PLACEHOLDERS['gameDirectory']: game_dir
+    }
+    command = []
+    for arg in plan['command']:
+        for placeholder, value in values.items():
+            if placeholder in arg:
+                arg = arg.replace(placeholder, value)
+        command.append(arg)
+    return command
@@ -1,11 +1,12 @@
 import os
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QListWidget, QComboBox, QScrollArea,
-    QStackedWidget, QSizePolicy, QProgressBar
+    QPushButton, QListView, QComboBox, QScrollArea,
+    QStackedWidget, QSizePolicy, QProgressBar, QLineEdit, QAbstractItemView,
+    QPlainTextEdit
 )
 from PyQt5.QtGui import QPixmap, QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QSize
 
 class LauncherUI:
     def setup_ui(self, parent):
@@ -77,7 +78,15 @@ class LauncherUI:
         self.version_type_selector.addItems(["Vanilla", "Fabric", "Forge", "OptiFine"])
         self.version_selector = QComboBox()
         self.install_button = QPushButton("Установить")
+        self.verify_button = QPushButton("Проверить установку")
+        self.instance_selector = QComboBox()
+        self.new_instance_button = QPushButton("Новая сборка")
         self.play_button = QPushButton("Играть")
+        self.stop_button = QPushButton("Остановить")
+        self.stop_button.setEnabled(False)
+        self.log_button = QPushButton("Лог")
+        self.log_button.setEnabled(False)
+        self.instance_status_label = QLabel()
         
 
         self.progress_bar = QProgressBar()
@@ -88,7 +97,14 @@ class LauncherUI:
         self.bottom_panel.addWidget(QLabel("Версия:"))
         self.bottom_panel.addWidget(self.version_selector)
         self.bottom_panel.addWidget(self.install_button)
+        self.bottom_panel.addWidget(self.verify_button)
+        self.bottom_panel.addWidget(QLabel("Сборка:"))
+        self.bottom_panel.addWidget(self.instance_selector)
+        self.bottom_panel.addWidget(self.new_instance_button)
         self.bottom_panel.addWidget(self.play_button)
+        self.bottom_panel.addWidget(self.stop_button)
+        self.bottom_panel.addWidget(self.log_button)
+        self.bottom_panel.addWidget(self.instance_status_label)
         self.bottom_panel.addWidget(self.progress_bar)
         
 
@@ -110,13 +126,45 @@ class LauncherUI:
     def setup_mods_panel(self):
         panel = QWidget()
         layout = QVBoxLayout(panel)
-        self.mods_list = QListWidget()
+        self.mods_search = QLineEdit()
+        self.mods_search.setPlaceholderText("Поиск модов")
+        self.mods_search.setClearButtonEnabled(True)
+        layout.addWidget(self.mods_search)
+        self.installed_mods_button = QPushButton("Установленные моды")
+        self.installed_mods_button.setCheckable(True)
+        layout.addWidget(self.installed_mods_button)
+        self.mods_list = QListView()
+        self.mods_list.setUniformItemSizes(True)
+        self.mods_list.setIconSize(QSize(32, 32))
+        self.mods_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.refresh_mods_button = QPushButton("Обновить список модов")  
         layout.addWidget(self.mods_list)
+        self.install_mods_button = QPushButton("Установить выбранные")
+        layout.addWidget(self.install_mods_button)
         layout.addWidget(self.refresh_mods_button)
+        self.update_mods_button = QPushButton("Обновить все моды")
+        layout.addWidget(self.update_mods_button)
+        self.import_modpack_button = QPushButton("Импорт модпака")
+        self.export_modpack_button = QPushButton("Экспорт сборки")
+        layout.addWidget(self.import_modpack_button)
+        layout.addWidget(self.export_modpack_button)
         self.mods_panel.setWidget(panel)
         self.mods_panel.setWidgetResizable(True)
         self.mods_panel.setVisible(False)
 
+    def setup_debug_panel(self):
+        self.debug_button = QPushButton("Отладка")
+        self.nav_bar.insertWidget(self.nav_bar.indexOf(self.login_button), self.debug_button)
+
+        self.debug_panel = QWidget()
+        layout = QVBoxLayout(self.debug_panel)
+        self.metrics_view = QPlainTextEdit()
+        self.metrics_view.setReadOnly(True)
+        self.save_metrics_button = QPushButton("Сохранить метрики в JSON")
+        layout.addWidget(self.metrics_view)
+        layout.addWidget(self.save_metrics_button)
+        self.content_layout.insertWidget(0, self.debug_panel)
+        self.debug_panel.setVisible(False)
+
     def toggle_mods_panel(self):
         self.mods_panel.setVisible(not self.mods_panel.isVisible())
\ No newline at end of file
@@ -0,0 +1,130 @@
+import os
+import time
+import shutil
+import platform
+import threading
+from typing import List, Tuple
+from downloader import file_sha1
+
+FICLONE = 0x40049409
+# Blob моложе этого срока не удаляется: его мог только что добавить другой процесс, ещё не записав ссылки
+GC_GRACE_SECONDS = 3600
+
+
+def _reflink(src: str, dst: str):
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def clone_file(src: str, dst: str):
+    # Жёсткая ссылка, затем reflink (CoW), в крайнем случае обычная копия
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    if platform.system() == 'Linux':
+        try:
+            _reflink(src, dst)
+            return
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+    shutil.copy2(src, dst)
+
+
+class LibraryStore:
+    def __init__(self, db, config):
+        self.db = db
+        root = config.get('Store', 'path', fallback='~/.soreon/store') if config.has_section('Store') else '~/.soreon/store'
+        self.objects_dir = os.path.join(os.path.expanduser(root), 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        # Сборка мусора не идёт одновременно с раскладкой и приёмом файлов: между add_file и записью
+        # ссылок blob ещё ни на что не ссылается
+        self._lock = threading.RLock()
+
+    def blob_path(self, sha1: str) -> str:
+        return os.path.join(self.objects_dir, sha1[:2], sha1)
+
+    def has(self, sha1: str) -> bool:
+        return os.path.exists(self.blob_path(sha1))
+
+    def add_file(self, path: str, sha1: str = None) -> str:
+        sha1 = sha1 or file_sha1(path)
+        blob = self.blob_path(sha1)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            tmp_path = f"{blob}.tmp"
+            clone_file(path, tmp_path)
+            os.replace(tmp_path, blob)
+        return sha1
+
+    def materialize(self, sha1: str, dest: str):
+        blob = self.blob_path(sha1)
+        with self._lock:
+            if os.path.exists(dest) and os.path.samefile(blob, dest):
+                return
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp_path = f"{dest}.tmp"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            clone_file(blob, tmp_path)
+            os.replace(tmp_path, dest)
+
+    def seed(self, files: List[Tuple[str, str, int]]) -> int:
+        # Раскладывает уже имеющиеся в хранилище файлы, чтобы установщик их не скачивал
+        count = 0
+        with self._lock:
+            for path, sha1, _ in files:
+                if not os.path.exists(path) and self.has(sha1):
+                    self.materialize(sha1, path)
+                    count += 1
+        return count
+
+    def adopt(self, owner: str, files: List[Tuple[str, str, int]]):
+        # Переносит файлы версии в хранилище, заменяя дубликаты ссылками на общий blob
+        refs = []
+        with self._lock:
+            for path, sha1, size in files:
+                if self.has(sha1):
+                    self.materialize(sha1, path)
+                elif os.path.exists(path):
+                    if file_sha1(path) != sha1:
+                        continue
+                    self.add_file(path, sha1)
+                else:
+                    continue
+                refs.append((sha1, size or os.path.getsize(path), path))
+            self.db.replace_blob_refs(owner, refs)
+
+    def release(self, owner: str):
+        self.db.replace_blob_refs(owner, [])
+
+    def collect_garbage(self) -> Tuple[int, int]:
+        removed = 0
+        freed = 0
+        with self._lock:
+            referenced = self.db.get_referenced_blobs()
+            cutoff = time.time() - GC_GRACE_SECONDS
+            for prefix in os.listdir(self.objects_dir):
+                prefix_dir = os.path.join(self.objects_dir, prefix)
+                if not os.path.isdir(prefix_dir):
+                    continue
+                for name in os.listdir(prefix_dir):
+                    # Незавершённые копии add_file принадлежат идущему приёму файлов
+                    if name in referenced or name.endswith('.tmp'):
+                        continue
+                    blob = os.path.join(prefix_dir, name)
+                    try:
+                        stat = os.stat(blob)
+                        # Жёсткая ссылка сохраняет mtime исходного файла, а ctime меняется при её создании
+                        if max(stat.st_mtime, stat.st_ctime) > cutoff:
+                            continue
+                        os.remove(blob)
+                    except OSError:
+                        continue
+                    freed += stat.st_size
+                    removed += 1
+            self.db.delete_orphan_blobs()
+        return removed, freed
@@ -1,26 +1,67 @@
+import os
 import sys
-import webbrowser
+import time
+
+PROCESS_START = time.perf_counter()
+DEBUG_MODE = "--debug_pix" in sys.argv
+if DEBUG_MODE:
+    # Ставится до остальных импортов, иначе их время не попадёт в отчёт
+    from import_profiler import IMPORT_PROFILER
+    IMPORT_PROFILER.install()
+
 import configparser
 import uuid
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QMessageBox,
-                            QListWidgetItem, QProgressDialog)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QProcess
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QMessageBox, QProgressDialog, QInputDialog, QFileDialog, QWidget
+)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QEvent
 from PyQt5.QtGui import QIcon
 from launcher_ui import LauncherUI
-from minecraft_manager import MinecraftManager
 from database import Database
-from mod_manager import ModManager
 from auth import AuthManager
-
-DEBUG_MODE = "--debug_pix" in sys.argv
+from tasks import run_task
+from sync_scheduler import SyncScheduler
+from mod_browser import ModListModel, IconLoader
+from metrics import METRICS
+from game_log import LogViewer
+from instance_manager import (
+    InstanceManager, STATUS_STOPPED, STATUS_STARTING, STATUS_RUNNING, STATUS_STOPPING, STATUS_CRASHED
+)
+# minecraft_manager, mod_manager, downloader, api_client и modpack тянут requests и minecraft_launcher_lib:
+# они импортируются в create_services, в фоновом потоке после первой отрисовки окна
 
 def debug_print(message):
     if DEBUG_MODE:
         print(f"[DEBUG] {message}")
 
+class StartupTimeline:
+    def __init__(self, start=None):
+        self.start = start or time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        self.marks.append((name, elapsed))
+        debug_print(f"Запуск: {name} — {elapsed:.1f} мс")
+
+    def summary(self):
+        return ", ".join(f"{name}={elapsed:.0f}мс" for name, elapsed in self.marks)
+
+STARTUP = StartupTimeline(PROCESS_START)
+STARTUP.mark("модули импортированы")
+
+INSTANCE_STATUS_TEXT = {
+    STATUS_STOPPED: "",
+    STATUS_STARTING: "Запуск...",
+    STATUS_RUNNING: "Игра запущена",
+    STATUS_STOPPING: "Остановка...",
+    STATUS_CRASHED: "Игра завершилась с ошибкой"
+}
+
 class InstallThread(QThread):
     progress_updated = pyqtSignal(int)
     message_updated = pyqtSignal(str)
+    speed_updated = pyqtSignal(float)
     finished = pyqtSignal()
 
     def __init__(self, mc_manager, version, version_type):
@@ -36,26 +77,201 @@ class InstallThread(QThread):
                 self.version,
                 self.version_type,
                 lambda p: self.progress_updated.emit(p),
-                lambda m: self.message_updated.emit(m)
+                lambda m: self.message_updated.emit(m),
+                lambda s: self.speed_updated.emit(s)
             )
             self.finished.emit()
         except Exception as e:
             debug_print(f"Ошибка: {str(e)}")
             self.message_updated.emit(f"Ошибка: {str(e)}")
 
+class ModInstallThread(QThread):
+    progress_updated = pyqtSignal(int)
+    message_updated = pyqtSignal(str)
+    speed_updated = pyqtSignal(float)
+    installed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, mod_manager, mod_ids, game_version, loader, mod_dir=None):
+        super().__init__()
+        self.mod_manager = mod_manager
+        self.mod_ids = mod_ids
+        self.game_version = game_version
+        self.loader = loader
+        self.mod_dir = mod_dir
+
+    def run(self):
+        try:
+            result = self.mod_manager.install_mods(
+                self.mod_ids,
+                self.game_version,
+                self.loader,
+                lambda p: self.progress_updated.emit(p),
+                lambda m: self.message_updated.emit(m),
+                lambda s: self.speed_updated.emit(s),
+                self.mod_dir
+            )
+            self.installed.emit(result)
+        except Exception as e:
+            debug_print(f"Ошибка: {str(e)}")
+            self.failed.emit(str(e))
+
+class ModUpdateThread(QThread):
+    progress_updated = pyqtSignal(int)
+    speed_updated = pyqtSignal(float)
+    updated = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, mod_manager, updates):
+        super().__init__()
+        self.mod_manager = mod_manager
+        self.updates = updates
+
+    def run(self):
+        try:
+            result = self.mod_manager.update_mods(
+                self.updates,
+                lambda p: self.progress_updated.emit(p),
+                lambda s: self.speed_updated.emit(s)
+            )
+            self.updated.emit(result)
+        except Exception as e:
+            debug_print(f"Ошибка: {str(e)}")
+            self.failed.emit(str(e))
+
+class VerifyThread(QThread):
+    progress_updated = pyqtSignal(int)
+    message_updated = pyqtSignal(str)
+    speed_updated = pyqtSignal(float)
+    verified = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, mc_manager, version, mods_dir):
+        super().__init__()
+        self.mc_manager = mc_manager
+        self.version = version
+        self.mods_dir = mods_dir
+
+    def run(self):
+        try:
+            report = self.mc_manager.verify_installation(
+                self.version,
+                self.mods_dir,
+                lambda p: self.progress_updated.emit(p),
+                lambda m: self.message_updated.emit(m),
+                lambda s: self.speed_updated.emit(s)
+            )
+            self.verified.emit(report)
+        except Exception as e:
+            debug_print(f"Ошибка: {str(e)}")
+            self.failed.emit(str(e))
+
+class ModpackImportThread(QThread):
+    progress_updated = pyqtSignal(int)
+    message_updated = pyqtSignal(str)
+    speed_updated = pyqtSignal(float)
+    imported = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, mc_manager, instances, modpacks, path):
+        super().__init__()
+        self.mc_manager = mc_manager
+        self.instances = instances
+        self.modpacks = modpacks
+        self.path = path
+
+    def run(self):
+        from modpack import read_modpack_info, SUPPORTED_LOADERS
+        progress = lambda p: self.progress_updated.emit(p)
+        message = lambda m: self.message_updated.emit(m)
+        speed = lambda s: self.speed_updated.emit(s)
+        try:
+            info = read_modpack_info(self.path)
+            if not info.game_version:
+                raise Exception("В модпаке не указана версия игры")
+            if info.loader not in SUPPORTED_LOADERS:
+                raise Exception(f"Загрузчик {info.loader} не поддерживается")
+            # Загрузчик ставится той версии, что указана в модпаке; другие установки этой версии игры не трогаются
+            installed = self.mc_manager.db.find_version(info.game_version, info.loader, info.loader_version)
+            if installed:
+                version_id = installed['version_id']
+            else:
+                version_id = self.mc_manager.install_version(info.game_version, info.loader, progress, message, speed,
+                                                             info.loader_version)
+            instance = self.instances.create(self.instances.unique_name(info.name), version_id)
+            result = self.modpacks.import_pack(self.path, info, instance['game_dir'], progress, message, speed)
+            result.instance = instance
+            self.imported.emit(result)
+        except Exception as e:
+            debug_print(f"Ошибка: {str(e)}")
+            self.failed.emit(str(e))
+
+def create_services(config, db):
+    # Импорт и сервисы без Qt-объектов: выполняется вне GUI-потока
+    from downloader import DownloadManager
+    from minecraft_manager import MinecraftManager
+    from mod_manager import ModManager
+    from modpack import ModpackManager
+    from api_client import APIClient
+    STARTUP.mark("сервисы импортированы")
+    downloader = DownloadManager(config)
+    mod_manager = ModManager(config, downloader, db)
+    return {
+        'downloader': downloader,
+        'mc_manager': MinecraftManager(db, config, downloader),
+        'mod_manager': mod_manager,
+        'modpacks': ModpackManager(db, mod_manager, config),
+        'api': APIClient(config['API']['base_url'])
+    }
+
 class SoreonLauncher(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.minecraft_process = None
         self.config = self.load_config()
         self.db = Database(self.config)
         self.auth = AuthManager(self.config)
-        self.mc_manager = MinecraftManager(self.db, self.config)
-        self.mod_manager = ModManager(self.config)
+        self.pending_loads = set()
+        self.interactive = False
         self.init_ui()
-        self.load_content()
         self.check_auth()
         self.auth.signals.authenticated.connect(self.check_auth)
+        STARTUP.mark("окно построено")
+        # Сервисы поднимаются после первой настоящей отрисовки окна
+        QApplication.instance().installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and isinstance(watched, QWidget) and watched.window() is self:
+            QApplication.instance().removeEventFilter(self)
+            STARTUP.mark("первая отрисовка")
+            QTimer.singleShot(0, self.init_services)
+        return super().eventFilter(watched, event)
+
+    def init_services(self):
+        # Импорт requests и minecraft_launcher_lib занимает сотни миллисекунд: в GUI-потоке окно бы зависло
+        run_task(create_services, self.config, self.db, on_result=self.on_services_ready,
+                 on_error=lambda message: QMessageBox.critical(self, "Ошибка", f"Не удалось запустить сервисы: {message}"))
+
+    def on_services_ready(self, services):
+        self.downloader = services['downloader']
+        self.mc_manager = services['mc_manager']
+        self.mod_manager = services['mod_manager']
+        self.modpacks = services['modpacks']
+        self.api = services['api']
+        self.icon_loader.downloader = self.downloader
+        self.instances = InstanceManager(self.db, self.mc_manager, self.config, parent=self)
+        self.instances.status_changed.connect(self.on_instance_status)
+        self.sync_scheduler = SyncScheduler(self.db, self.api, self.auth, self.config, parent=self)
+        self.sync_scheduler.synced.connect(lambda count: debug_print(f"Синхронизировано ресурсов: {count}"))
+        self.sync_scheduler.failed.connect(lambda message: debug_print(f"Ошибка синхронизации: {message}"))
+        self.auth.signals.authenticated.connect(self.sync_scheduler.request_sync)
+        STARTUP.mark("сервисы инициализированы")
+        for widget in self.service_widgets:
+            widget.setEnabled(True)
+        # Версия Java нужна для аргументов JVM: кэш заполняется заранее, не дожидаясь нажатия «Играть»
+        run_task(self.mc_manager.java_version)
+        self.load_content()
+        self.sync_catalog()
+        self.sync_scheduler.start()
 
     def load_config(self):
         config = configparser.ConfigParser()
@@ -66,23 +282,124 @@ class SoreonLauncher(QMainWindow):
     def init_ui(self):
         self.ui = LauncherUI()
         self.ui.setup_ui(self)
-        self.setup_mods_list()
+        # Загрузчик появляется вместе с сервисами, до этого список модов пуст
+        self.icon_loader = IconLoader(None, parent=self)
+        self.mods_model = ModListModel(self.icon_loader, parent=self)
+        self.ui.mods_list.setModel(self.mods_model)
+        # До готовности сервисов элементы, которым они нужны, недоступны
+        self.service_widgets = [
+            self.ui.install_button, self.ui.verify_button, self.ui.play_button, self.ui.new_instance_button,
+            self.ui.version_type_selector, self.ui.version_selector, self.ui.instance_selector, self.ui.mods_panel
+        ]
+        for widget in self.service_widgets:
+            widget.setEnabled(False)
+        if DEBUG_MODE:
+            self.setup_debug_panel()
         self.apply_styles()
         self.connect_signals()
         self.setWindowIcon(QIcon('assets/icon.png'))
         self.setWindowTitle("Soreon Launcher")
 
     def setup_mods_list(self):
+        if self.mod_manager.has_catalog():
+            self.search_mods()
+            return
         try:
-            mods = self.mod_manager.get_featured_mods()
-            self.ui.mods_list.clear()
-            for mod in mods[:50]:
-                item = QListWidgetItem(mod['name'])
-                item.setData(Qt.UserRole, mod)
-                self.ui.mods_list.addItem(item)
+            self.show_mods(self.mod_manager.get_featured_mods(offline=True))
         except Exception as e:
+            debug_print(f"Нет сохранённого списка модов: {str(e)}")
+        self.start_load("mods", self.mod_manager.get_featured_mods,
+                        on_result=self.show_mods, on_error=self.on_mods_error)
+
+    def show_mods(self, mods):
+        self.mods_model.set_mods(mods)
+
+    def search_mods(self):
+        query = self.ui.mods_search.text().strip()
+        if self.ui.installed_mods_button.isChecked():
+            self.show_installed_mods(query)
+            return
+        if not query and not self.mod_manager.has_catalog():
+            try:
+                self.show_mods(self.mod_manager.get_featured_mods(offline=True))
+            except Exception as e:
+                debug_print(f"Нет сохранённого списка модов: {str(e)}")
+            return
+
+        version_type = self.ui.version_type_selector.currentText().lower()
+        loader = version_type if version_type in ("fabric", "forge") else None
+        game_version = self.ui.version_selector.currentText() or None
+        # Каталог отдаётся страницами по мере прокрутки списка
+        self.mods_model.set_source(
+            lambda offset, limit: self.mod_manager.search_mods(query, loader, game_version, limit, offset))
+
+    def installed_mods_dir(self):
+        instance = self.selected_instance()
+        return os.path.join(instance['game_dir'], 'mods') if instance else self.mod_manager.mod_dir
+
+    def show_installed_mods(self, query=''):
+        mod_dir = self.installed_mods_dir()
+
+        def fetch_page(offset, limit):
+            return [{
+                'id': mod['path'],
+                'name': f"{mod['name']} {mod['version'] or ''}".strip(),
+                'summary': mod['error'] or f"{mod['loader']} · {mod['mod_id']}\n{mod['description']}"
+            } for mod in self.mod_manager.installed_mods(query, limit=limit, offset=offset, mod_dir=mod_dir)]
+
+        self.mods_model.set_source(fetch_page)
+
+    def scan_installed_mods(self):
+        if not self.ui.installed_mods_button.isChecked():
+            self.search_mods()
+            return
+        # Сначала показывается индекс, затем в фоне перечитываются только изменившиеся jar
+        self.search_mods()
+        run_task(self.mod_manager.scan_installed, self.installed_mods_dir(),
+                 on_result=self.on_installed_mods_scanned,
+                 on_error=lambda message: debug_print(f"Ошибка сканирования модов: {message}"))
+
+    def on_installed_mods_scanned(self, count):
+        debug_print(f"Перечитано jar: {count}")
+        if count and self.ui.installed_mods_button.isChecked():
+            self.search_mods()
+
+    def sync_catalog(self):
+        run_task(self.mod_manager.sync_catalog,
+                 on_result=self.on_catalog_synced,
+                 on_error=lambda message: debug_print(f"Ошибка синхронизации каталога: {message}"))
+
+    def on_catalog_synced(self, count):
+        debug_print(f"Каталог модов обновлён: {count}")
+        if count:
+            self.search_mods()
+
+    def on_mods_error(self, message):
+        debug_print(f"Ошибка загрузки модов: {message}")
+        if not self.mods_model.rowCount():
             QMessageBox.warning(self, "Ошибка", "Не удалось загрузить моды")
 
+    def setup_debug_panel(self):
+        self.ui.setup_debug_panel()
+        self.ui.debug_button.clicked.connect(
+            lambda: self.ui.debug_panel.setVisible(not self.ui.debug_panel.isVisible()))
+        self.ui.save_metrics_button.clicked.connect(self.save_metrics)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        self.metrics_timer.start()
+
+    def refresh_metrics(self):
+        if self.ui.debug_panel.isVisible():
+            self.ui.metrics_view.setPlainText(METRICS.to_json(events=50))
+
+    def save_metrics(self):
+        path = os.path.expanduser(f"~/.soreon/metrics-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        METRICS.dump_json(path)
+        debug_print(f"Метрики сохранены: {path}")
+        return path
+
     def apply_styles(self):
         try:
             with open("assets/styles.qss", "r", encoding='utf-8') as f:
@@ -94,12 +411,30 @@ class SoreonLauncher(QMainWindow):
         self.ui.login_button.clicked.connect(self.open_login)
         self.ui.logout_button.clicked.connect(self.logout)
         self.ui.install_button.clicked.connect(self.install_minecraft)
+        self.ui.verify_button.clicked.connect(self.verify_installation)
         self.ui.mods_button.clicked.connect(lambda: self.ui.mods_panel.setVisible(not self.ui.mods_panel.isVisible()))
         self.ui.play_button.clicked.connect(self.launch_game)
-        self.ui.mods_list.itemDoubleClicked.connect(self.install_mod)
+        self.ui.stop_button.clicked.connect(self.stop_game)
+        self.ui.log_button.clicked.connect(lambda: self.show_game_log())
+        self.ui.new_instance_button.clicked.connect(self.create_instance)
+        self.ui.instance_selector.currentIndexChanged.connect(self.update_instance_status)
+        self.ui.instance_selector.currentIndexChanged.connect(
+            lambda: self.ui.installed_mods_button.isChecked() and self.scan_installed_mods())
+        self.ui.mods_list.doubleClicked.connect(self.install_mod)
+        self.ui.installed_mods_button.toggled.connect(self.scan_installed_mods)
         self.ui.version_type_selector.currentIndexChanged.connect(self.load_versions)
         if hasattr(self.ui, 'refresh_mods_button'):
             self.ui.refresh_mods_button.clicked.connect(self.setup_mods_list)
+            self.ui.refresh_mods_button.clicked.connect(self.sync_catalog)
+        self.ui.install_mods_button.clicked.connect(self.install_selected_mods)
+        self.ui.update_mods_button.clicked.connect(self.check_mod_updates)
+        self.ui.import_modpack_button.clicked.connect(self.import_modpack)
+        self.ui.export_modpack_button.clicked.connect(self.export_modpack)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.search_mods)
+        self.ui.mods_search.textChanged.connect(self.search_timer.start)
 
     def check_auth(self):
         if self.auth.is_authenticated():
@@ -111,12 +446,40 @@ class SoreonLauncher(QMainWindow):
 
     def load_content(self):
         self.load_versions()
+        self.load_instances()
+        self.setup_mods_list()
+
+    def start_load(self, name, fn, *args, on_result=None, on_error=None):
+        # Фоновая загрузка; когда все завершены, лаунчер считается готовым к работе
+        self.pending_loads.add(name)
+
+        def finish():
+            self.pending_loads.discard(name)
+            STARTUP.mark(f"загружено: {name}")
+            if not self.pending_loads and not self.interactive:
+                self.interactive = True
+                STARTUP.mark("готов к работе")
+                debug_print(f"Хронология запуска: {STARTUP.summary()}")
+                if DEBUG_MODE:
+                    debug_print(IMPORT_PROFILER.report())
+
+        run_task(fn, *args, on_result=on_result, on_error=on_error, on_finished=finish)
 
     def load_versions(self):
         version_type = self.ui.version_type_selector.currentText().lower()
-        versions = self.mc_manager.get_available_versions(version_type)
+        self.ui.version_selector.clear()
+        self.show_versions(version_type, self.mc_manager.get_available_versions(version_type, offline=True))
+        self.start_load(f"versions:{version_type}", self.mc_manager.get_available_versions, version_type,
+                        on_result=lambda versions: self.show_versions(version_type, versions))
+
+    def show_versions(self, version_type, versions):
+        if version_type != self.ui.version_type_selector.currentText().lower() or not versions:
+            return
+        current = self.ui.version_selector.currentText()
         self.ui.version_selector.clear()
         self.ui.version_selector.addItems(versions)
+        if current in versions:
+            self.ui.version_selector.setCurrentText(current)
 
     def open_login(self):
         self.auth.authenticate()
@@ -134,23 +497,255 @@ class SoreonLauncher(QMainWindow):
 
         self.install_thread = InstallThread(self.mc_manager, version, version_type)
         self.install_thread.progress_updated.connect(self.ui.progress_bar.setValue)
-        self.install_thread.message_updated.connect(lambda m: self.ui.progress_bar.setFormat(f"{m} %p%"))
+        self.install_thread.message_updated.connect(self.on_install_message)
+        self.install_thread.speed_updated.connect(self.on_install_speed)
         self.install_thread.finished.connect(lambda: self.ui.progress_bar.setVisible(False))
+        self.install_thread.finished.connect(self.sync_scheduler.request_sync)
+        self.install_message = ""
+        self.install_speed = 0.0
         self.ui.progress_bar.setVisible(True)
         self.install_thread.start()
 
-    def install_mod(self, item):
-        mod = item.data(Qt.UserRole)
-        try:
-            self.mod_manager.download_mod(mod['id'], mod['downloadUrl'])
-            QMessageBox.information(self, "Успех", f"Мод {mod['name']} установлен!")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка: {str(e)}")
+    def verify_installation(self):
+        instance = self.selected_instance()
+        version_id = instance['version_id'] if instance else self.selected_version_id()
+        if not version_id:
+            return
+        game_dir = instance['game_dir'] if instance else self.mc_manager.minecraft_dir
 
-    def launch_game(self):
+        self.verify_thread = VerifyThread(self.mc_manager, version_id, os.path.join(game_dir, 'mods'))
+        self.verify_thread.progress_updated.connect(self.ui.progress_bar.setValue)
+        self.verify_thread.message_updated.connect(self.on_install_message)
+        self.verify_thread.speed_updated.connect(self.on_install_speed)
+        self.verify_thread.verified.connect(self.on_verified)
+        self.verify_thread.failed.connect(self.on_verify_failed)
+        self.install_message = ""
+        self.install_speed = 0.0
+        self.ui.verify_button.setEnabled(False)
+        self.ui.progress_bar.setVisible(True)
+        self.verify_thread.start()
+
+    def on_verified(self, report):
+        self.ui.progress_bar.setVisible(False)
+        self.ui.verify_button.setEnabled(True)
+        if not report.issues:
+            QMessageBox.information(self, "Проверка", f"Все файлы в порядке: {report.checked}")
+            return
+        text = f"Проверено файлов: {report.checked}\nВосстановлено: {len(report.repaired)}"
+        if report.failed:
+            failed = "\n".join(f"{os.path.basename(path)}: {reason}" for path, reason in report.failed[:10])
+            text += f"\n\nНе удалось восстановить:\n{failed}"
+            QMessageBox.warning(self, "Проверка", text)
+        else:
+            QMessageBox.information(self, "Проверка", text)
+
+    def on_verify_failed(self, message):
+        self.ui.verify_button.setEnabled(True)
+        self.on_mods_install_failed(message)
+
+    def on_install_message(self, message):
+        self.install_message = message
+        self.update_progress_format()
+
+    def on_install_speed(self, speed):
+        self.install_speed = speed
+        self.update_progress_format()
+
+    def update_progress_format(self):
+        if self.install_speed:
+            speed = f" ({self.install_speed / (1024 * 1024):.1f} МБ/с)"
+        else:
+            speed = ""
+        self.ui.progress_bar.setFormat(f"{self.install_message}{speed} %p%")
+
+    def install_mod(self, index):
+        self.install_mods([index.data(Qt.UserRole)])
+
+    def install_selected_mods(self):
+        records = [index.data(Qt.UserRole) for index in self.ui.mods_list.selectionModel().selectedIndexes()]
+        if not records:
+            QMessageBox.warning(self, "Ошибка", "Выберите моды")
+            return
+        self.install_mods(records)
+
+    def install_mods(self, records):
+        if self.ui.installed_mods_button.isChecked():
+            return
+        game_version = self.ui.version_selector.currentText()
+        loader = self.ui.version_type_selector.currentText().lower()
+        if loader not in ("fabric", "forge"):
+            QMessageBox.warning(self, "Ошибка", "Для установки модов выберите Fabric или Forge")
+            return
+        if not game_version:
+            QMessageBox.warning(self, "Ошибка", "Выберите версию")
+            return
+
+        instance = self.selected_instance()
+        mod_dir = os.path.join(instance['game_dir'], 'mods') if instance else None
+        self.mod_install_thread = ModInstallThread(self.mod_manager, [r.id for r in records], game_version, loader, mod_dir)
+        self.mod_install_thread.progress_updated.connect(self.ui.progress_bar.setValue)
+        self.mod_install_thread.message_updated.connect(self.on_install_message)
+        self.mod_install_thread.speed_updated.connect(self.on_install_speed)
+        self.mod_install_thread.installed.connect(self.on_mods_installed)
+        self.mod_install_thread.failed.connect(self.on_mods_install_failed)
+        self.install_message = ""
+        self.install_speed = 0.0
+        self.ui.progress_bar.setVisible(True)
+        self.mod_install_thread.start()
+
+    def on_mods_installed(self, result):
+        self.ui.progress_bar.setVisible(False)
+        self.sync_scheduler.request_sync()
+        text = f"Установлено модов: {len(result.mods)}"
+        if result.missing:
+            missing = "\n".join(f"{mod_id}: {reason}" for mod_id, reason in result.missing)
+            text += f"\n\nНе удалось подобрать:\n{missing}"
+        QMessageBox.information(self, "Успех", text)
+
+    def on_mods_install_failed(self, message):
+        self.ui.progress_bar.setVisible(False)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка: {message}")
+
+    def check_mod_updates(self):
+        instance = self.selected_instance()
+        version_data = self.db.get_version(instance['version_id']) if instance else None
+        if version_data:
+            game_version, loader = version_data['version'], version_data['type']
+        else:
+            game_version = self.ui.version_selector.currentText()
+            loader = self.ui.version_type_selector.currentText().lower()
+        if loader not in ("fabric", "forge") or not game_version:
+            QMessageBox.warning(self, "Ошибка", "Для обновления модов выберите версию Fabric или Forge")
+            return
+        self.ui.update_mods_button.setEnabled(False)
+        run_task(self.mod_manager.check_updates, game_version, loader, self.installed_mods_dir(),
+                 on_result=self.on_mod_updates_checked,
+                 on_error=self.on_mods_install_failed,
+                 on_finished=lambda: self.ui.update_mods_button.setEnabled(True))
+
+    def on_mod_updates_checked(self, result):
+        if not result.updates:
+            QMessageBox.information(self, "Обновление модов",
+                                    f"Все моды актуальны\nПроверено: {result.checked}, опознано: {result.identified}")
+            return
+        lines = "\n".join(f"{u.name}: {u.current_version or '?'} → {u.version}" for u in result.updates[:20])
+        if len(result.updates) > 20:
+            lines += f"\n... и ещё {len(result.updates) - 20}"
+        answer = QMessageBox.question(self, "Обновление модов",
+                                      f"Доступно обновлений: {len(result.updates)}\n\n{lines}\n\nОбновить все?")
+        if answer != QMessageBox.Yes:
+            return
+        self.mod_update_thread = ModUpdateThread(self.mod_manager, result.updates)
+        self.mod_update_thread.progress_updated.connect(self.ui.progress_bar.setValue)
+        self.mod_update_thread.speed_updated.connect(self.on_install_speed)
+        self.mod_update_thread.updated.connect(self.on_mods_updated)
+        self.mod_update_thread.failed.connect(self.on_mods_install_failed)
+        self.install_message = "Обновление модов..."
+        self.install_speed = 0.0
+        self.update_progress_format()
+        self.ui.progress_bar.setVisible(True)
+        self.mod_update_thread.start()
+
+    def on_mods_updated(self, result):
+        updated, failed = result
+        self.ui.progress_bar.setVisible(False)
+        self.sync_scheduler.request_sync()
+        if self.ui.installed_mods_button.isChecked():
+            self.search_mods()
+        text = f"Обновлено модов: {len(updated)}"
+        if failed:
+            text += "\n\nНе удалось обновить:\n" + "\n".join(f"{name}: {reason}" for name, reason in failed[:20])
+        QMessageBox.information(self, "Обновление модов", text)
+
+    def import_modpack(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт модпака", "", "Модпаки (*.mrpack *.zip)")
+        if not path:
+            return
+        self.modpack_thread = ModpackImportThread(self.mc_manager, self.instances, self.modpacks, path)
+        self.modpack_thread.progress_updated.connect(self.ui.progress_bar.setValue)
+        self.modpack_thread.message_updated.connect(self.on_install_message)
+        self.modpack_thread.speed_updated.connect(self.on_install_speed)
+        self.modpack_thread.imported.connect(self.on_modpack_imported)
+        self.modpack_thread.failed.connect(self.on_mods_install_failed)
+        self.install_message = ""
+        self.install_speed = 0.0
+        self.ui.progress_bar.setVisible(True)
+        self.modpack_thread.start()
+
+    def on_modpack_imported(self, result):
+        self.ui.progress_bar.setVisible(False)
+        self.load_instances(select_id=result.instance['id'])
+        self.sync_scheduler.request_sync()
+        text = f"Сборка {result.instance['name']} создана\nФайлов скачано: {len(result.installed)}"
+        if result.missing:
+            missing = "\n".join(f"{name}: {reason}" for name, reason in result.missing[:20])
+            text += f"\n\nНе удалось скачать:\n{missing}"
+        QMessageBox.information(self, "Модпак", text)
+
+    def export_modpack(self):
+        instance = self.selected_instance()
+        if not instance:
+            QMessageBox.warning(self, "Ошибка", "Выберите сборку")
+            return
+        version_data = self.db.get_version(instance['version_id'])
+        if not version_data:
+            QMessageBox.warning(self, "Ошибка", f"Версия {instance['version_id']} не установлена")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт сборки", f"{instance['name']}.mrpack", "Modrinth (*.mrpack)")
+        if not path:
+            return
+        run_task(self.modpacks.export_pack, instance, version_data, path,
+                 on_result=lambda count: QMessageBox.information(self, "Модпак", f"Экспортировано модов: {count}"),
+                 on_error=lambda message: QMessageBox.critical(self, "Ошибка", f"Ошибка: {message}"))
+
+    def load_instances(self, select_id=None):
+        current = select_id if select_id is not None else self.ui.instance_selector.currentData()
+        self.ui.instance_selector.blockSignals(True)
+        self.ui.instance_selector.clear()
+        self.ui.instance_selector.addItem("Без сборки", None)
+        for instance in self.instances.list_instances():
+            self.ui.instance_selector.addItem(f"{instance['name']} ({instance['version_id']})", instance['id'])
+        index = self.ui.instance_selector.findData(current)
+        self.ui.instance_selector.setCurrentIndex(max(index, 0))
+        self.ui.instance_selector.blockSignals(False)
+        self.update_instance_status()
+
+    def selected_instance(self):
+        instance_id = self.ui.instance_selector.currentData()
+        return self.instances.get(instance_id) if instance_id is not None else None
+
+    def selected_version_id(self):
+        # Версия из выпадающих списков: ищется установленный профиль с выбранным загрузчиком
         version = self.ui.version_selector.currentText()
         if not version:
             QMessageBox.warning(self, "Ошибка", "Выберите версию")
+            return None
+        version_type = self.ui.version_type_selector.currentText()
+        version_data = self.db.find_version(version, version_type.lower())
+        if not version_data:
+            QMessageBox.warning(self, "Ошибка", f"Версия {version} {version_type} не установлена")
+            return None
+        return version_data['version_id']
+
+    def create_instance(self):
+        version_id = self.selected_version_id()
+        if not version_id:
+            return
+        name, ok = QInputDialog.getText(self, "Новая сборка", f"Название сборки для версии {version_id}:")
+        if not ok or not name.strip():
+            return
+        try:
+            instance = self.instances.create(name, version_id)
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+        self.load_instances(select_id=instance['id'])
+        self.sync_scheduler.request_sync()
+
+    def launch_game(self):
+        instance = self.selected_instance()
+        version_id = instance['version_id'] if instance else self.selected_version_id()
+        if not version_id:
             return
 
         if not self.auth.is_authenticated():
@@ -158,23 +753,85 @@ class SoreonLauncher(QMainWindow):
             return
 
         try:
-            self.minecraft_process = QProcess()
-            self.minecraft_process.finished.connect(self.on_game_exit)
-            self.mc_manager.launch(version, self.minecraft_process, {
+            instance = instance or self.instances.default_instance(version_id)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", str(e))
+            return
+
+        # java -version может занять секунды: версия Java определяется в фоне, игра запускается после
+        self.ui.play_button.setEnabled(False)
+        run_task(self.mc_manager.java_version, instance.get('java_path'),
+                 on_result=lambda _: self.start_instance(instance),
+                 on_finished=lambda: self.ui.play_button.setEnabled(True))
+
+    def start_instance(self, instance):
+        try:
+            self.instances.launch(instance['id'], {
                 'username': self.auth.get_username(),
                 'uuid': self.auth.get_uuid(),
                 'accessToken': self.auth.get_access_token()
             })
-            self.hide()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
-    def on_game_exit(self):
-        self.show()
-        self.minecraft_process = None
+    def stop_game(self):
+        instance = self.selected_instance() or self.instances.get_default()
+        if instance:
+            self.instances.stop(instance['id'])
+
+    def on_instance_status(self, instance_id, status):
+        self.update_instance_status()
+        self.downloader.set_game_running(self.instances.running_count() > 0)
+        if status == STATUS_CRASHED:
+            instance = self.instances.get(instance_id)
+            name = instance['name'] if instance else instance_id
+            text = f"Игра в сборке {name} завершилась с ошибкой"
+            summary = self.instances.crash_summary(instance_id)
+            if summary:
+                text += f"\n\n{summary}"
+            if instance_id not in self.instances.logs:
+                QMessageBox.warning(self, "Ошибка", text)
+                return
+            answer = QMessageBox.warning(self, "Ошибка", f"{text}\n\nОткрыть лог игры?",
+                                         QMessageBox.Yes | QMessageBox.No)
+            if answer == QMessageBox.Yes:
+                self.show_game_log(instance_id)
+
+    def show_game_log(self, instance_id=None):
+        if instance_id is None:
+            instance = self.selected_instance() or self.instances.get_default()
+            instance_id = instance['id'] if instance else None
+        log = self.instances.logs.get(instance_id)
+        if not log:
+            QMessageBox.information(self, "Лог", "Лог появится после запуска игры")
+            return
+        instance = self.instances.get(instance_id)
+        LogViewer(log, instance['name'] if instance else str(instance_id), parent=self).show()
+
+    def update_instance_status(self):
+        instance = self.selected_instance() or self.instances.get_default()
+        status = self.instances.status(instance['id']) if instance else STATUS_STOPPED
+        self.ui.instance_status_label.setText(INSTANCE_STATUS_TEXT[status])
+        self.ui.stop_button.setEnabled(status in (STATUS_STARTING, STATUS_RUNNING))
+        self.ui.log_button.setEnabled(bool(instance) and instance['id'] in self.instances.logs)
+        running = self.instances.running_count()
+        self.ui.play_button.setToolTip(f"Запущено игр: {running}" if running else "")
+
+    def closeEvent(self, event):
+        if hasattr(self, 'instances') and self.instances.running_count():
+            answer = QMessageBox.question(self, "Выход", "Запущенные игры будут закрыты. Выйти?")
+            if answer != QMessageBox.Yes:
+                event.ignore()
+                return
+            self.instances.stop_all()
+        event.accept()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    STARTUP.mark("QApplication создан")
     launcher = SoreonLauncher()
     launcher.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    exit_code = app.exec_()
+    if DEBUG_MODE:
+        launcher.save_metrics()
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+from typing import Dict, Optional
+from metrics import METRICS
+
+
+class MetadataUnavailable(Exception):
+    pass
+
+
+class MetadataCache:
+    def __init__(self, config, session: Optional[requests.Session] = None):
+        cache_dir = '~/.soreon/cache'
+        self.ttl = 3600
+        self.timeout = 10
+        if config is not None and config.has_section('Cache'):
+            cache_dir = config.get('Cache', 'dir', fallback=cache_dir)
+            self.ttl = config.getint('Cache', 'metadata_ttl', fallback=self.ttl)
+            self.timeout = config.getint('Cache', 'timeout', fallback=self.timeout)
+        self.cache_dir = os.path.join(os.path.expanduser(cache_dir), 'meta')
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.session = session or requests.Session()
+        self._entries = {}
+        self._parsed = {}
+        self._lock = threading.Lock()
+
+    def get_json(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                 ttl: Optional[int] = None, offline: bool = False):
+        key = self._key(url, params)
+        entry = self._get(key, url, params, headers, ttl, offline)
+        with self._lock:
+            parsed = self._parsed.get(key)
+            if parsed is None or parsed[0] != entry['fetched_at']:
+                parsed = (entry['fetched_at'], json.loads(entry['body']))
+                self._parsed[key] = parsed
+        return parsed[1]
+
+    def get_text(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                 ttl: Optional[int] = None, offline: bool = False) -> str:
+        return self._get(self._key(url, params), url, params, headers, ttl, offline)['body']
+
+    def invalidate(self, url: str, params: Optional[Dict] = None):
+        key = self._key(url, params)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._parsed.pop(key, None)
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _key(self, url: str, params: Optional[Dict]) -> str:
+        query = json.dumps(sorted((params or {}).items()))
+        return hashlib.sha1(f"{url}?{query}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def _store(self, key: str, entry: Dict):
+        with self._lock:
+            self._entries[key] = entry
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+
+    def _get(self, key: str, url: str, params: Optional[Dict], headers: Optional[Dict],
+             ttl: Optional[int], offline: bool) -> Dict:
+        entry = self._load(key)
+        ttl = self.ttl if ttl is None else ttl
+        if entry and (offline or time.time() - entry['fetched_at'] < ttl):
+            METRICS.incr('meta.hits')
+            return entry
+        if offline:
+            METRICS.incr('meta.misses')
+            raise MetadataUnavailable(f"Нет сохранённых данных для {url}")
+
+        request_headers = dict(headers or {})
+        if entry and entry.get('etag'):
+            request_headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self.session.get(url, params=params, headers=request_headers, timeout=self.timeout)
+            if response.status_code == 304 and entry:
+                METRICS.incr('meta.not_modified')
+                entry = dict(entry, fetched_at=time.time())
+            else:
+                response.raise_for_status()
+                METRICS.incr('meta.misses')
+                entry = {
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time.time(),
+                    'body': response.text
+                }
+            self._store(key, entry)
+            return entry
+        except (requests.RequestException, OSError) as e:
+            # Нет сети: отдаём устаревшие данные, если они есть
+            if entry:
+                METRICS.incr('meta.stale')
+                return entry
+            METRICS.incr('meta.failures')
+            raise MetadataUnavailable(f"Не удалось получить {url}: {str(e)}")
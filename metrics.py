@@ -0,0 +1,78 @@
+import json
+import time
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Callable
+
+
+class MetricsRegistry:
+    def __init__(self, max_events: int = 2000):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.phases = {}
+        self.events = deque(maxlen=max_events)
+        self.listeners = []
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        self.listeners.append(listener)
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def event(self, kind: str, **fields):
+        event = dict(fields, kind=kind, time=time.time(), thread=threading.current_thread().name)
+        with self._lock:
+            self.events.append(event)
+        for listener in self.listeners:
+            listener(event)
+
+    @contextmanager
+    def phase(self, name: str, **fields):
+        self.event('phase_start', phase=name, **fields)
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            yield
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            with self._lock:
+                stats = self.phases.setdefault(name, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                stats['count'] += 1
+                stats['errors'] += status == 'error'
+                stats['total_ms'] += duration
+                stats['max_ms'] = max(stats['max_ms'], duration)
+                stats['last_ms'] = duration
+            self.event('phase_stop', phase=name, status=status, duration_ms=round(duration, 1), **fields)
+
+    def transfer(self, url: str, size: int, seconds: float, resumed: bool = False):
+        self.incr('download.bytes', size)
+        self.incr('download.files')
+        self.incr('download.seconds', seconds)
+        throughput = size / seconds if seconds > 0 else 0.0
+        self.event('transfer', url=url, bytes=size, seconds=round(seconds, 3),
+                   bytes_per_sec=round(throughput), resumed=resumed)
+
+    def snapshot(self, events: int = 200) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            phases = {name: dict(stats) for name, stats in self.phases.items()}
+            recent = list(self.events)[-events:]
+        if counters.get('download.seconds'):
+            # Средняя скорость по потокам: сумма байтов на суммарное время передач
+            counters['download.avg_bytes_per_sec'] = counters.get('download.bytes', 0) / counters['download.seconds']
+        return {'counters': counters, 'phases': phases, 'events': recent}
+
+    def to_json(self, events: int = 200) -> str:
+        return json.dumps(self.snapshot(events), ensure_ascii=False, indent=2)
+
+    def dump_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json(events=len(self.events)))
+
+
+METRICS = MetricsRegistry()
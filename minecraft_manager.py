@@ -1,21 +1,40 @@
 import os
+import json
 import uuid
-import requests
 import platform
-from typing import List, Dict, Callable
+import subprocess
+from typing import List, Dict, Callable, Optional
 from PyQt5.QtCore import QMutex, QProcess
-from minecraft_launcher_lib.utils import get_minecraft_directory
-from minecraft_launcher_lib.command import get_minecraft_command
-from minecraft_launcher_lib.install import install_minecraft_version
-from bs4 import BeautifulSoup
+from downloader import DownloadManager, DownloadTask, PRIORITY_USER
+from library_store import LibraryStore
+from metadata_cache import MetadataCache, MetadataUnavailable
+from forge_resolver import ForgeResolver, installer_version_id
+from version_files import (
+    collect_version_files, collect_asset_files, load_version_chain, find_manifest_entry, version_json_path, maven_path
+)
+from launch_plan import build_launch_plan, is_plan_current, render_command
+from jvm_profiles import build_jvm_args, heap_size_mb, parse_memory_mb, java_major_version
+from natives_cache import NativesCache, is_natives_ready, library_artifacts, platform_libraries
+from metrics import METRICS
+from endpoints import endpoint, rebase
+from integrity import IntegrityVerifier, VerifyReport
 
 class MinecraftManager:
-    def __init__(self, db, config):
+    def __init__(self, db, config, downloader=None):
         self.db = db
         self.config = config
+        self.downloader = downloader or DownloadManager(config)
+        self.store = LibraryStore(db, config)
+        self.meta = MetadataCache(config, self.downloader.session)
+        self.forge = ForgeResolver(self.meta, config)
+        self.manifest_url = f"{endpoint(config, 'mojang_meta')}/mc/game/version_manifest_v2.json"
+        self.fabric_meta_url = f"{endpoint(config, 'fabric_meta')}/v2"
+        self.resources_url = endpoint(config, 'minecraft_resources')
         self.minecraft_dir = os.path.expanduser(config['Launcher']['minecraft_dir'])
         self.natives_platform = self._get_natives_platform()
         self.ensure_directories()
+        self.natives = NativesCache(self.minecraft_dir, self.natives_platform)
+        self.verifier = IntegrityVerifier(db, self.store, self.downloader, self.minecraft_dir, config)
         self._mutex = QMutex()
 
     def _get_natives_platform(self):
@@ -31,51 +50,58 @@ class MinecraftManager:
         for d in required_dirs:
             os.makedirs(os.path.join(self.minecraft_dir, d), exist_ok=True)
 
-    def get_available_versions(self, version_type: str) -> List[str]:
+    def get_available_versions(self, version_type: str, offline: bool = False) -> List[str]:
         try:
             if version_type == "vanilla":
-                return self._get_vanilla_versions()
+                return self._get_vanilla_versions(offline)
             elif version_type == "fabric":
-                return self._get_fabric_versions()
+                return self._get_fabric_versions(offline)
             elif version_type == "forge":
-                return self._get_forge_versions()
+                return self._get_forge_versions(offline)
             return []
         except Exception as e:
             print(f"Error getting versions: {str(e)}")
             return []
 
-    def _get_vanilla_versions(self) -> List[str]:
-        response = requests.get("https://launchermeta.mojang.com/mc/game/version_manifest_v2.json")
-        return [v['id'] for v in response.json()['versions'] if v['type'] == 'release']
+    def _get_vanilla_versions(self, offline: bool = False) -> List[str]:
+        manifest = self.meta.get_json(self.manifest_url, offline=offline)
+        return [v['id'] for v in manifest['versions'] if v['type'] == 'release']
 
-    def _get_fabric_versions(self) -> List[str]:
-        response = requests.get("https://meta.fabricmc.net/v2/versions/game")
-        return [v['version'] for v in response.json()]
+    def _get_fabric_versions(self, offline: bool = False) -> List[str]:
+        versions = self.meta.get_json(f"{self.fabric_meta_url}/versions/game", offline=offline)
+        return [v['version'] for v in versions]
 
-    def _get_forge_versions(self) -> List[str]:
-        response = requests.get("https://files.minecraftforge.net/net/minecraftforge/forge/promotions_slim.json")
-        return list(response.json()['promos'].keys())
+    def _get_forge_versions(self, offline: bool = False) -> List[str]:
+        return self.forge.game_versions(offline)
 
-    def install_version(self, version: str, version_type: str, progress_cb: Callable, message_cb: Callable):
+    def install_version(self, version: str, version_type: str, progress_cb: Callable, message_cb: Callable,
+                        speed_cb: Optional[Callable] = None, loader_version: Optional[str] = None) -> str:
+        # Возвращает id установленного профиля: по нему сборки запускаются и находят свою версию
         try:
-            if version_type == "vanilla":
-                self._install_vanilla(version, progress_cb, message_cb)
-            elif version_type == "fabric":
-                self.install_fabric(version, progress_cb, message_cb)
-            elif version_type == "forge":
-                self.install_forge(version, progress_cb, message_cb)
-            else:
-                raise NotImplementedError(f"Тип {version_type} не поддерживается")
+            with METRICS.phase(f"install.{version_type}", version=version):
+                if version_type == "vanilla":
+                    version_id = self._install_vanilla(version, progress_cb, message_cb, speed_cb)
+                elif version_type == "fabric":
+                    version_id = self.install_fabric(version, progress_cb, message_cb, speed_cb, loader_version)
+                elif version_type == "forge":
+                    version_id = self.install_forge(version, progress_cb, message_cb, speed_cb, loader_version)
+                else:
+                    raise NotImplementedError(f"Тип {version_type} не поддерживается")
         except Exception as e:
             message_cb(f"Ошибка установки: {str(e)}")
             raise
 
-    def _install_vanilla(self, version: str, progress_cb: Callable, message_cb: Callable):
-        message_cb("Установка версии...")
-        install_minecraft_version(version, self.minecraft_dir, callback={
-            'setStatus': message_cb,
-            'setProgress': progress_cb
-        })
+        try:
+            message_cb("Подготовка плана запуска...")
+            self.prepare_launch_plan(version_id)
+        except Exception as e:
+            # План будет построен при первом запуске
+            print(f"Error preparing launch plan: {str(e)}")
+        return version_id
+
+    def _install_vanilla(self, version: str, progress_cb: Callable, message_cb: Callable,
+                         speed_cb: Optional[Callable] = None) -> str:
+        self._install_vanilla_files(version, progress_cb, message_cb, speed_cb)
 
         self.db.save_version(
             version=version,
@@ -84,88 +110,318 @@ class MinecraftManager:
             main_class="net.minecraft.client.main.Main",
             libraries=[]
         )
+        return version
+
+    def _install_vanilla_files(self, version: str, progress_cb: Callable, message_cb: Callable,
+                               speed_cb: Optional[Callable] = None):
+        self.download_version_files(version, progress_cb, message_cb, speed_cb)
+
+        # Файлы уже на диске и проверены по SHA-1: библиотека только пропускает их и доделывает установку
+        message_cb("Установка версии...")
+        # Пакет minecraft_launcher_lib при импорте тянет все свои модули: грузится только при установке
+        from minecraft_launcher_lib.install import install_minecraft_version
+        with METRICS.phase('install.minecraft_launcher_lib', version=version):
+            install_minecraft_version(version, self.minecraft_dir, callback={
+                'setStatus': message_cb,
+                'setProgress': progress_cb
+            })
+
+        message_cb("Сохранение файлов в общее хранилище...")
+        with METRICS.phase('store.adopt', version=version):
+            self.store.adopt(version, collect_version_files(self.minecraft_dir, version))
+
+    def download_version_files(self, version: str, progress_cb: Callable, message_cb: Callable,
+                               speed_cb: Optional[Callable] = None):
+        message_cb("Подготовка файлов из общего хранилища...")
+        self._prefetch_version_json(version)
+        with METRICS.phase('store.seed', version=version):
+            # Второй проход подхватывает объекты ассетов, индекс которых появился на первом
+            for _ in range(2):
+                METRICS.incr('store.seeded', self.store.seed(collect_version_files(self.minecraft_dir, version)))
+
+        message_cb("Скачивание файлов версии...")
+        tasks = self._version_tasks(version)
+        with METRICS.phase('install.files', version=version, files=len(tasks)):
+            self.downloader.download_many(tasks, progress_cb, speed_cb, priority=PRIORITY_USER)
 
-    def install_fabric(self, version: str, progress_cb: Callable, message_cb: Callable):
+    def _version_tasks(self, version_id: str) -> List[DownloadTask]:
+        # Клиент, библиотеки этой платформы, конфиг логирования и объекты ассетов из JSON версии
+        tasks: Dict[str, DownloadTask] = {}
+        libraries_dir = os.path.join(self.minecraft_dir, 'libraries')
+        assets_dir = os.path.join(self.minecraft_dir, 'assets')
+
+        def add(url: str, path: str, size: int, sha1: Optional[str]):
+            # Одинаковые объекты ассетов встречаются под разными именами: один путь — одна задача
+            tasks.setdefault(path, DownloadTask(url, path, size, sha1))
+
+        for data in load_version_chain(self.minecraft_dir, version_id):
+            client = data.get('downloads', {}).get('client')
+            if client and client.get('url'):
+                add(client['url'], os.path.join(self.minecraft_dir, 'versions', data['id'], f"{data['id']}.jar"),
+                    client.get('size', 0), client.get('sha1'))
+
+            for library in platform_libraries(data.get('libraries', []), self.natives_platform):
+                for artifact in library_artifacts(library, self.natives_platform):
+                    if artifact.get('url'):
+                        add(artifact['url'], os.path.join(libraries_dir, artifact['path']),
+                            artifact.get('size', 0), artifact.get('sha1'))
+
+            logging_file = data.get('logging', {}).get('client', {}).get('file')
+            if logging_file and logging_file.get('url'):
+                add(logging_file['url'], os.path.join(assets_dir, 'log_configs', logging_file['id']),
+                    logging_file.get('size', 0), logging_file.get('sha1'))
+
+            asset_index = data.get('assetIndex')
+            if asset_index and asset_index.get('url'):
+                # Список объектов есть только в индексе, поэтому он скачивается раньше остальных файлов
+                index_path = os.path.join(assets_dir, 'indexes', f"{asset_index['id']}.json")
+                self.downloader.download(asset_index['url'], index_path, sha1=asset_index.get('sha1'),
+                                         priority=PRIORITY_USER)
+                for path, digest, size in collect_asset_files(self.minecraft_dir, asset_index)[1:]:
+                    add(f"{self.resources_url}/{digest[:2]}/{digest}", path, size, digest)
+        return list(tasks.values())
+
+    def _prefetch_version_json(self, version: str):
+        try:
+            manifest = self.meta.get_json(self.manifest_url)
+            entry = find_manifest_entry(manifest, version)
+            if entry:
+                self.downloader.download(entry['url'], version_json_path(self.minecraft_dir, version), sha1=entry.get('sha1'))
+        except Exception as e:
+            print(f"Error prefetching version json: {str(e)}")
+
+    def verify_installation(self, version_id: str, mods_dir: Optional[str], progress_cb: Callable,
+                            message_cb: Callable, speed_cb: Optional[Callable] = None) -> VerifyReport:
+        version_data = self.db.get_version(version_id)
+        if not version_data:
+            raise Exception(f"Версия {version_id} не установлена")
+        message_cb("Проверка файлов...")
+        report = self.verifier.verify(version_data['version_id'], mods_dir, progress_cb)
+        if report.issues:
+            message_cb(f"Восстановление файлов: {len(report.issues)}...")
+            self.verifier.repair(report, progress_cb, speed_cb)
+        return report
+
+    def collect_garbage(self):
+        return self.store.collect_garbage()
+
+    def install_fabric(self, version: str, progress_cb: Callable, message_cb: Callable,
+                       speed_cb: Optional[Callable] = None, loader_version: Optional[str] = None) -> str:
         try:
-            message_cb("Получение Fabric Installer...")
-            loader_url = f"https://meta.fabricmc.net/v2/versions/loader/{version}"
-            response = requests.get(loader_url)
-            if response.status_code != 200:
+            message_cb("Получение данных Fabric...")
+            loader_url = f"{self.fabric_meta_url}/versions/loader/{version}"
+            try:
+                loaders = self.meta.get_json(loader_url)
+            except MetadataUnavailable:
                 raise Exception("Не удалось получить данные Fabric")
-            
-            fabric_data = response.json()
-            installer_url = f"https://maven.fabricmc.net/{fabric_data[0]['loader']['maven']}"
-            installer_path = os.path.join(self.minecraft_dir, "fabric-installer.jar")
-            
-            message_cb("Скачивание установщика...")
-            self._download_file(installer_url, installer_path)
-            
-            message_cb("Установка Fabric...")
-            os.system(f"java -jar {installer_path} client -dir {self.minecraft_dir} -mcversion {version}")
-            
+            if not loaders:
+                raise Exception(f"Fabric не поддерживает версию {version}")
+            if loader_version:
+                # Модпак требует конкретный загрузчик, а не последний стабильный
+                if not any(entry['loader']['version'] == loader_version for entry in loaders):
+                    raise Exception(f"Fabric {loader_version} не найден для версии {version}")
+            else:
+                stable = [entry for entry in loaders if entry['loader'].get('stable')]
+                loader_version = (stable or loaders)[0]['loader']['version']
+
+            # Готовый профиль лаунчера вместо запуска fabric-installer.jar в отдельной JVM
+            profile = self.meta.get_json(f"{loader_url}/{loader_version}/profile/json")
+            profile_id = profile['id']
+            self._write_version_json(profile_id, profile)
+
+            vanilla_jar = os.path.join(self.minecraft_dir, 'versions', version, f"{version}.jar")
+            if not os.path.exists(vanilla_jar):
+                self._install_vanilla_files(version, progress_cb, message_cb, speed_cb)
+
+            message_cb("Скачивание библиотек Fabric...")
+            with METRICS.phase('fabric.libraries', version=profile_id):
+                libraries = self._fetch_maven_libraries(profile, progress_cb, speed_cb)
+            self.store.adopt(profile_id, collect_version_files(self.minecraft_dir, profile_id))
+
             self.db.save_version(
                 version=version,
                 version_type='fabric',
-                path=os.path.join(self.minecraft_dir, 'versions', f"fabric-loader-{version}"),
-                main_class="net.fabricmc.loader.launch.knot.KnotClient",
-                libraries=[]
+                path=os.path.join(self.minecraft_dir, 'versions', profile_id),
+                main_class=profile['mainClass'],
+                libraries=libraries,
+                version_id=profile_id,
+                loader_version=loader_version
             )
-            
+
             message_cb("Fabric успешно установлен!")
+            return profile_id
         except Exception as e:
             message_cb(f"Ошибка: {str(e)}")
             raise
 
-    def install_forge(self, version: str, progress_cb: Callable, message_cb: Callable):
+    def _write_version_json(self, version_id: str, data: dict):
+        path = version_json_path(self.minecraft_dir, version_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _fetch_maven_libraries(self, profile: dict, progress_cb: Callable,
+                               speed_cb: Optional[Callable] = None) -> List[str]:
+        paths = []
+        tasks = []
+        for library in profile.get('libraries', []):
+            path = os.path.join(self.minecraft_dir, 'libraries', maven_path(library['name']))
+            paths.append(path)
+            sha1 = library.get('sha1')
+            if sha1 and self.store.has(sha1):
+                self.store.materialize(sha1, path)
+                METRICS.incr('store.seeded')
+                continue
+            if not sha1 and os.path.exists(path):
+                continue
+            base_url = rebase(self.config, 'fabric_maven', library.get('url', 'https://libraries.minecraft.net/'))
+            url = f"{base_url.rstrip('/')}/{maven_path(library['name'])}"
+            tasks.append(DownloadTask(url, path, library.get('size', 0), sha1))
+        if tasks:
+            self.downloader.download_many(tasks, progress_cb, speed_cb)
+        return paths
+
+    def install_forge(self, version: str, progress_cb: Callable, message_cb: Callable,
+                      speed_cb: Optional[Callable] = None, loader_version: Optional[str] = None) -> str:
         try:
             message_cb("Поиск Forge Installer...")
-            forge_url = f"https://files.minecraftforge.net/net/minecraftforge/forge/index_{version}.html"
-            response = requests.get(forge_url)
-            if response.status_code != 200:
+            try:
+                build = self.forge.pick_build(version, loader_version=loader_version)
+            except MetadataUnavailable:
                 raise Exception("Не удалось получить данные Forge")
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            installer_link = soup.find("a", {"class": "btn btn-large btn-download"})['href']
-            
-            message_cb("Скачивание установщика...")
-            installer_path = os.path.join(self.minecraft_dir, "forge-installer.jar")
-            self._download_file(installer_link, installer_path)
-            
+
+            message_cb(f"Скачивание установщика Forge {build}...")
+            installer_path = os.path.join(self.minecraft_dir, f"forge-{build}-installer.jar")
+            self._download_file(self.forge.installer_url(build), installer_path, progress_cb, speed_cb)
+
+            vanilla_jar = os.path.join(self.minecraft_dir, 'versions', version, f"{version}.jar")
+            if not os.path.exists(vanilla_jar):
+                self._install_vanilla_files(version, progress_cb, message_cb, speed_cb)
+
             message_cb("Установка Forge...")
-            os.system(f"java -jar {installer_path} --installClient")
-            
+            with METRICS.phase('forge.installer', build=build):
+                self._run_forge_installer(installer_path)
+            version_id = installer_version_id(installer_path) or f"{version}-forge-{build.split('-', 1)[1]}"
+            if not os.path.exists(version_json_path(self.minecraft_dir, version_id)):
+                raise Exception(f"Установщик Forge не создал версию {version_id}")
+            self.store.adopt(version_id, collect_version_files(self.minecraft_dir, version_id))
+
+            with open(version_json_path(self.minecraft_dir, version_id), 'r', encoding='utf-8') as f:
+                version_data = json.load(f)
             self.db.save_version(
                 version=version,
                 version_type='forge',
-                path=os.path.join(self.minecraft_dir, 'versions', f"forge-{version}"),
-                main_class="net.minecraftforge.client.ForgeClient",
-                libraries=[]
+                path=os.path.join(self.minecraft_dir, 'versions', version_id),
+                main_class=version_data.get('mainClass', ''),
+                libraries=[],
+                version_id=version_id,
+                loader_version=loader_version or build.split('-', 1)[1]
             )
-            
+
             message_cb("Forge успешно установлен!")
+            return version_id
         except Exception as e:
             message_cb(f"Ошибка: {str(e)}")
             raise
 
-    def _download_file(self, url: str, path: str):
-        response = requests.get(url, stream=True)
-        with open(path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+    def _java_executable(self, java_path: Optional[str] = None) -> str:
+        java_path = java_path or self.config.get('Launcher', 'java_path', fallback='')
+        return java_path if java_path and os.path.exists(java_path) else 'java'
 
-    def launch(self, version: str, process: QProcess, args: dict):
-        version_data = self.db.get_version(version)
-        if not version_data:
-            raise Exception(f"Версия {version} не установлена")
+    def java_version(self, java_path: Optional[str] = None) -> int:
+        # Для фоновых потоков: после первого вызова запуск игры берёт версию из кэша
+        return java_major_version(self._java_executable(java_path))
+
+    def _run_forge_installer(self, installer_path: str):
+        # Установщику нужен launcher_profiles.json в целевом каталоге
+        profiles_path = os.path.join(self.minecraft_dir, 'launcher_profiles.json')
+        if not os.path.exists(profiles_path):
+            with open(profiles_path, 'w', encoding='utf-8') as f:
+                json.dump({'profiles': {}}, f)
 
-        options = {
-            'username': args['username'],
-            'uuid': args['uuid'],
-            'token': args['accessToken'],
-            'gameDirectory': self.minecraft_dir,
+        result = subprocess.run(
+            [self._java_executable(), '-jar', installer_path, '--installClient', self.minecraft_dir],
+            cwd=self.minecraft_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors='replace'
+        )
+        if result.returncode != 0:
+            tail = '\n'.join(result.stdout.strip().splitlines()[-5:])
+            raise Exception(f"Установщик Forge завершился с кодом {result.returncode}:\n{tail}")
+
+    def _download_file(self, url: str, path: str, progress_cb: Optional[Callable] = None,
+                       speed_cb: Optional[Callable] = None):
+        self.downloader.download(url, path, progress_cb=progress_cb, speed_cb=speed_cb)
+
+    def _launch_options(self, natives_dir: str) -> dict:
+        return {
+            'executablePath': self._java_executable(),
+            'nativesDirectory': natives_dir,
             'launcherName': 'Soreon Launcher',
             'launcherVersion': '1.0.0'
         }
 
-        command = get_minecraft_command(version_data['version'], self.minecraft_dir, options)
+    def prepare_launch_plan(self, version_id: str) -> dict:
+        version_data = self.db.get_version(version_id)
+        if not version_data:
+            raise Exception(f"Версия {version_id} не установлена")
+
+        plan = version_data.get('launch_plan')
+        # Если JSON версии не менялся, распаковка нативных библиотек не нужна; Java и каталог сборки подставляются позже
+        if plan and is_plan_current(plan) and is_natives_ready(plan['natives_dir']):
+            METRICS.incr('launch.plan_hits')
+            return plan
+
+        METRICS.incr('launch.plan_misses')
+        with METRICS.phase('natives.ensure', version=version_data['version_id']):
+            natives_dir = self.natives.ensure(version_data['version_id'])
+        with METRICS.phase('launch.plan_build', version=version_data['version_id']):
+            plan = build_launch_plan(self.minecraft_dir, version_data['version_id'], self._launch_options(natives_dir))
+        self.db.save_launch_plan(version_id, plan)
+        return plan
+
+    def _mod_count(self, game_dir: str) -> int:
+        mods_dir = os.path.join(game_dir, 'mods')
+        if not os.path.isdir(mods_dir):
+            return 0
+        return sum(1 for name in os.listdir(mods_dir) if name.endswith('.jar'))
+
+    def _cds_archive(self, plan: dict, java: str) -> Optional[str]:
+        if not self.config.getboolean('Launcher', 'appcds', fallback=True):
+            return None
+        # Архив привязан к плану запуска и версии Java: сборки с разными JVM не перезаписывают архивы друг друга
+        cds_dir = os.path.join(self.minecraft_dir, 'cds')
+        os.makedirs(cds_dir, exist_ok=True)
+        return os.path.join(cds_dir, f"{plan['version']}-{plan['fingerprint'][:12]}-java{java_major_version(java)}.jsa")
+
+    def _max_ram(self, max_ram: Optional[str] = None) -> Optional[str]:
+        return max_ram or self.config.get('Launcher', 'max_ram', fallback=None)
+
+    def heap_size(self, game_dir: str, max_ram: Optional[str] = None) -> int:
+        max_ram = self._max_ram(max_ram)
+        return heap_size_mb(self._mod_count(game_dir), parse_memory_mb(max_ram) if max_ram else None)
+
+    def jvm_args(self, plan: dict, java: str, game_dir: str, max_ram: Optional[str] = None) -> List[str]:
+        return build_jvm_args(
+            java,
+            self._mod_count(game_dir),
+            self._max_ram(max_ram),
+            self._cds_archive(plan, java)
+        )
+
+    def launch(self, version_id: str, process: QProcess, args: dict, instance: Optional[dict] = None):
+        instance = instance or {}
+        game_dir = instance.get('game_dir') or self.minecraft_dir
+        java = self._java_executable(instance.get('java_path'))
+        with METRICS.phase('launch.prepare', version=version_id):
+            plan = self.prepare_launch_plan(version_id)
+            command = render_command(plan, args['username'], args['uuid'], args['accessToken'], game_dir)
+            command[0] = java
+            command[1:1] = self.jvm_args(plan, java, game_dir, instance.get('max_ram')) + instance.get('jvm_args', [])
+        os.makedirs(game_dir, exist_ok=True)
+        process.setWorkingDirectory(game_dir)
         process.start(command[0], command[1:])
\ No newline at end of file
@@ -0,0 +1,183 @@
+import time
+import threading
+from urllib.parse import urlsplit
+from typing import List, Dict, Optional
+from metrics import METRICS
+
+# Служебные ключи секции [Mirrors]; остальные ключи — хосты апстрима со списком зеркал через запятую
+SETTINGS = ('enabled', 'probe_interval', 'failure_threshold', 'cooldown', 'max_cooldown')
+PROBE_TIMEOUT = 5
+# Скорость учитывается по файлам от этого размера: у мелких время уходит на задержку, а не на передачу
+THROUGHPUT_MIN_SIZE = 256 * 1024
+# Оценка строится для типичного файла библиотеки
+TYPICAL_SIZE = 512 * 1024
+EWMA_WEIGHT = 0.3
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    return sample if current is None else current + EWMA_WEIGHT * (sample - current)
+
+
+class Mirror:
+    def __init__(self, host: str, base: str, upstream: bool = False):
+        self.host = host
+        self.base = base.rstrip('/')
+        self.upstream = upstream
+        self.latency: Optional[float] = None
+        self.throughput: Optional[float] = None
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = 0.0
+
+    def available(self, now: float) -> bool:
+        # После паузы зеркало снова получает запросы; первая же ошибка откроет цепь заново
+        return self.open_until <= now
+
+    def score(self) -> float:
+        if self.latency is None:
+            # Непроверенное зеркало не вытесняет апстрим, пока не измерено
+            return float('inf') if not self.upstream else 1.0
+        transfer = TYPICAL_SIZE / self.throughput if self.throughput else 0.0
+        return self.latency + transfer
+
+    def snapshot(self) -> Dict:
+        return {
+            'base': self.base,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'throughput': round(self.throughput) if self.throughput else None,
+            'failures': self.failures,
+            'open': self.open_until > time.monotonic()
+        }
+
+
+class MirrorSelector:
+    def __init__(self, config, session=None):
+        self.session = session
+        self.enabled = False
+        self.probe_interval = 1800
+        self.failure_threshold = 3
+        self.base_cooldown = 300.0
+        self.max_cooldown = 3600.0
+        self.mirrors: Dict[str, List[Mirror]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # Проверки зеркал — фоновый трафик: пока идёт игра, они не выполняются
+        self.paused = False
+
+        if config is None or not config.has_section('Mirrors'):
+            return
+        self.enabled = config.getboolean('Mirrors', 'enabled', fallback=True)
+        self.probe_interval = config.getint('Mirrors', 'probe_interval', fallback=self.probe_interval)
+        self.failure_threshold = config.getint('Mirrors', 'failure_threshold', fallback=self.failure_threshold)
+        self.base_cooldown = config.getfloat('Mirrors', 'cooldown', fallback=self.base_cooldown)
+        self.max_cooldown = config.getfloat('Mirrors', 'max_cooldown', fallback=self.max_cooldown)
+        for host, value in config.items('Mirrors'):
+            if host in SETTINGS:
+                continue
+            bases = [base.strip() for base in value.split(',') if base.strip()]
+            if bases:
+                # Апстрим участвует в выборе наравне с зеркалами и остаётся последним запасным вариантом
+                self.mirrors[host.lower()] = [Mirror(host, base) for base in bases] + \
+                                             [Mirror(host, f"https://{host}", upstream=True)]
+        self.enabled = self.enabled and bool(self.mirrors)
+
+    def _find(self, url: str) -> Optional[Mirror]:
+        host = (urlsplit(url).hostname or '').lower()
+        for mirror in self.mirrors.get(host, []):
+            if url.startswith(mirror.base + '/') or url == mirror.base:
+                return mirror
+        for mirrors in self.mirrors.values():
+            for mirror in mirrors:
+                if url.startswith(mirror.base + '/'):
+                    return mirror
+        return None
+
+    def candidates(self, url: str) -> List[str]:
+        # Адреса для скачивания в порядке предпочтения: здоровые зеркала по оценке, апстрим всегда в списке
+        if not self.enabled:
+            return [url]
+        parts = urlsplit(url)
+        mirrors = self.mirrors.get((parts.hostname or '').lower())
+        if not mirrors or parts.scheme != 'https':
+            return [url]
+        path = url[len(f"{parts.scheme}://{parts.netloc}"):]
+        now = time.monotonic()
+        with self._lock:
+            ordered = sorted((m for m in mirrors if m.available(now)), key=lambda m: m.score())
+        urls = [url if mirror.upstream else mirror.base + path for mirror in ordered]
+        if url not in urls:
+            urls.append(url)
+        return urls
+
+    def record_success(self, url: str, size: int, seconds: float):
+        mirror = self._find(url)
+        if mirror is None:
+            return
+        with self._lock:
+            mirror.failures = 0
+            mirror.cooldown = 0.0
+            if size >= THROUGHPUT_MIN_SIZE and seconds > 0:
+                mirror.throughput = _ewma(mirror.throughput, size / seconds)
+
+    def record_failure(self, url: str, bad_data: bool = False):
+        mirror = self._find(url)
+        if mirror is None:
+            return
+        with self._lock:
+            mirror.failures += 1
+            # Неверные данные опаснее обрыва: такое зеркало отключается сразу
+            if bad_data or mirror.failures >= self.failure_threshold:
+                mirror.cooldown = min(self.max_cooldown, mirror.cooldown * 2 or self.base_cooldown)
+                mirror.open_until = time.monotonic() + mirror.cooldown
+                mirror.failures = 0
+                opened = True
+            else:
+                opened = False
+        METRICS.incr('mirrors.bad_data' if bad_data else 'mirrors.failures')
+        if opened:
+            METRICS.event('mirror_disabled', base=mirror.base, cooldown=mirror.cooldown, bad_data=bad_data)
+
+    def probe(self):
+        for mirrors in list(self.mirrors.values()):
+            for mirror in mirrors:
+                if self._stop.is_set():
+                    return
+                started = time.perf_counter()
+                try:
+                    # Время до заголовков ответа; код 4xx тоже означает, что сервер жив
+                    with self.session.get(f"{mirror.base}/", stream=True, timeout=PROBE_TIMEOUT) as response:
+                        elapsed = time.perf_counter() - started
+                        healthy = response.status_code < 500
+                except Exception:
+                    healthy = False
+                    elapsed = None
+                if healthy:
+                    with self._lock:
+                        mirror.latency = _ewma(mirror.latency, elapsed)
+                else:
+                    self.record_failure(f"{mirror.base}/")
+        METRICS.event('mirrors_probed', mirrors={host: [m.snapshot() for m in mirrors]
+                                                 for host, mirrors in self.mirrors.items()})
+
+    def start(self):
+        if not self.enabled or self.session is None or self._thread:
+            return
+        self._thread = threading.Thread(target=self._probe_loop, name='mirror-probe', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            try:
+                if not self.paused:
+                    self.probe()
+            except Exception as e:
+                print(f"Error probing mirrors: {str(e)}")
+            self._stop.wait(self.probe_interval)
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        with self._lock:
+            return {host: [mirror.snapshot() for mirror in mirrors] for host, mirrors in self.mirrors.items()}
@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from typing import List, Dict, Optional, Callable
+from PyQt5.QtCore import Qt, QObject, QAbstractListModel, QModelIndex, QThreadPool, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+from tasks import run_task
+
+ICON_SIZE = 32
+
+
+class ModRecord:
+    __slots__ = ('id', 'name', 'summary', 'downloads', 'logo_url', 'download_url')
+
+    def __init__(self, mod_id: int, name: str, summary: str, downloads: int,
+                 logo_url: Optional[str], download_url: Optional[str]):
+        self.id = mod_id
+        self.name = name
+        self.summary = summary
+        self.downloads = downloads
+        self.logo_url = logo_url
+        self.download_url = download_url
+
+    @classmethod
+    def from_dict(cls, mod: Dict) -> 'ModRecord':
+        # Понимает и строки локального каталога, и сырые ответы CurseForge
+        logo_url = mod.get('logoUrl') or (mod.get('logo') or {}).get('thumbnailUrl')
+        download_url = mod.get('downloadUrl')
+        if not download_url and mod.get('latestFiles'):
+            download_url = mod['latestFiles'][0].get('downloadUrl')
+        return cls(mod['id'], mod['name'], mod.get('summary', ''), int(mod.get('downloadCount', 0)),
+                   logo_url, download_url)
+
+
+def _decode_icon(downloader, url: str) -> QImage:
+    image = QImage.fromData(downloader.fetch_bytes(url))
+    return image.scaled(ICON_SIZE, ICON_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class IconLoader(QObject):
+    icon_ready = pyqtSignal(str)
+
+    def __init__(self, downloader, capacity: int = 256, parent=None):
+        super().__init__(parent)
+        # Иконки — фоновый трафик: идут через лимиты DownloadManager
+        self.downloader = downloader
+        self.capacity = capacity
+        self._cache = OrderedDict()
+        self._pending = set()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(4)
+
+    def get(self, url: Optional[str]) -> Optional[QPixmap]:
+        if not url or self.downloader is None:
+            return None
+        pixmap = self._cache.get(url)
+        if pixmap is not None:
+            self._cache.move_to_end(url)
+            return pixmap
+        if url not in self._pending:
+            self._pending.add(url)
+            # Картинка декодируется в пуле, QPixmap создаётся уже в GUI-потоке
+            run_task(_decode_icon, self.downloader, url, pool=self._pool,
+                     on_result=lambda image, url=url: self._store(url, image),
+                     on_error=lambda message, url=url: self._pending.discard(url))
+        return None
+
+    def _store(self, url: str, image: QImage):
+        self._pending.discard(url)
+        if image.isNull():
+            return
+        self._cache[url] = QPixmap.fromImage(image)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+        self.icon_ready.emit(url)
+
+
+class ModListModel(QAbstractListModel):
+    def __init__(self, icon_loader: IconLoader, page_size: int = 100, parent=None):
+        super().__init__(parent)
+        self.icon_loader = icon_loader
+        self.page_size = page_size
+        self._rows: List[ModRecord] = []
+        self._rows_by_icon = {}
+        self._fetch_page: Optional[Callable] = None
+        self._exhausted = True
+        self.icon_loader.icon_ready.connect(self._on_icon_ready)
+
+    def set_source(self, fetch_page: Callable[[int, int], List[Dict]]):
+        # fetch_page(offset, limit) возвращает следующую страницу модов
+        self.beginResetModel()
+        self._rows = []
+        self._rows_by_icon = {}
+        self._fetch_page = fetch_page
+        self._exhausted = False
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def set_mods(self, mods: List[Dict]):
+        self.set_source(lambda offset, limit: mods[offset:offset + limit])
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        record = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return record.name
+        if role == Qt.ToolTipRole:
+            return record.summary
+        if role == Qt.DecorationRole:
+            return self.icon_loader.get(record.logo_url)
+        if role == Qt.SizeHintRole:
+            return QSize(0, ICON_SIZE + 8)
+        if role == Qt.UserRole:
+            return record
+        return None
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and not self._exhausted and self._fetch_page is not None
+
+    def fetchMore(self, parent: QModelIndex):
+        try:
+            page = self._fetch_page(len(self._rows), self.page_size)
+        except Exception as e:
+            print(f"Error fetching mods page: {str(e)}")
+            page = []
+        if len(page) < self.page_size:
+            self._exhausted = True
+        if not page:
+            return
+
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        for offset, mod in enumerate(page):
+            record = ModRecord.from_dict(mod)
+            self._rows.append(record)
+            if record.logo_url:
+                self._rows_by_icon.setdefault(record.logo_url, []).append(start + offset)
+        self.endInsertRows()
+
+    def _on_icon_ready(self, url: str):
+        for row in self._rows_by_icon.get(url, []):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
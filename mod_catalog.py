@@ -0,0 +1,177 @@
+import re
+import requests
+from typing import List, Dict, Optional, Callable, Tuple
+from endpoints import endpoint
+
+MINECRAFT_GAME_ID = 432
+MODS_CLASS_ID = 6
+SORT_LAST_UPDATED = 3
+PAGE_SIZE = 50
+# CurseForge не отдаёт результаты поиска дальше index + pageSize = 10000
+MAX_SEARCH_INDEX = 10000
+# Выборки, которые не удалось разбить до лимита: старые моды из них в локальный каталог не попадают
+INCOMPLETE_KEY = 'catalog:incomplete'
+# Загрузчик -> версия игры -> категория
+MAX_SPLIT_DEPTH = 2
+
+LOADERS = {
+    1: 'forge',
+    4: 'fabric',
+    5: 'quilt',
+    6: 'neoforge'
+}
+
+
+def build_match_query(query: str) -> Optional[str]:
+    # Каждое слово ищется по префиксу, все слова обязательны
+    tokens = re.findall(r"\w+", query.lower())
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class ModCatalog:
+    def __init__(self, db, config, session: Optional[requests.Session] = None):
+        self.db = db
+        self.api_key = config['Mods']['curseforge_api_key']
+        self.api_url = f"{endpoint(config, 'curseforge_api')}/v1"
+        self.search_url = f"{self.api_url}/mods/search"
+        self.session = session or requests.Session()
+        self.timeout = 30
+
+    def search(self, query: str = '', loader: Optional[str] = None, game_version: Optional[str] = None,
+               limit: int = 50, offset: int = 0) -> List[Dict]:
+        return self.db.search_catalog(build_match_query(query), loader, game_version, limit, offset)
+
+    def sync(self, progress_cb: Optional[Callable] = None) -> int:
+        # Каталог обходится по загрузчикам; выборка больше лимита в 10000 делится по версиям игры,
+        # а версия, в которой модов всё ещё больше, — по категориям
+        self._game_versions = None
+        self._categories = None
+        incomplete = set(filter(None, (self.db.get_sync_state(INCOMPLETE_KEY) or '').split(',')))
+        total = 0
+        for loader_type, loader in LOADERS.items():
+            total += self._sync_split(loader, {'modLoaderType': loader_type}, 0, incomplete, progress_cb)
+        if incomplete:
+            print(f"Warning: catalog partitions over the search limit: {', '.join(sorted(incomplete))}")
+        self.db.set_sync_state({INCOMPLETE_KEY: ','.join(sorted(incomplete)) or None})
+        return total
+
+    def _sync_split(self, key: str, filters: Dict, depth: int, incomplete: set,
+                    progress_cb: Optional[Callable]) -> int:
+        synced, complete = self._sync_partition(key, filters, depth < MAX_SPLIT_DEPTH, progress_cb)
+        if complete:
+            return synced
+        children = self._children(key, filters, depth)
+        if not children:
+            incomplete.add(key)
+        for child_key, child_filters in children:
+            synced += self._sync_split(child_key, child_filters, depth + 1, incomplete, progress_cb)
+        # Части пройдены: дальше выборка обновляется целиком, от самого свежего мода на момент деления
+        self.db.set_sync_state({f"catalog:{key}:cursor": self.db.get_sync_state(f"catalog:{key}:top"),
+                                f"catalog:{key}:index": None, f"catalog:{key}:top": None})
+        return synced
+
+    def _children(self, key: str, filters: Dict, depth: int) -> List[Tuple[str, Dict]]:
+        if depth == 0:
+            if self._game_versions is None:
+                self._game_versions = [entry['versionString'] for entry in self._get('minecraft/version')]
+            return [(f"{key}:{version}", dict(filters, gameVersion=version)) for version in self._game_versions]
+        if depth == 1:
+            if self._categories is None:
+                self._categories = [category['id'] for category in
+                                    self._get('categories', {'gameId': MINECRAFT_GAME_ID, 'classId': MODS_CLASS_ID})
+                                    if not category.get('isClass')]
+            return [(f"{key}:{category}", dict(filters, categoryId=category)) for category in self._categories]
+        return []
+
+    def _sync_partition(self, key: str, filters: Dict, divisible: bool,
+                        progress_cb: Optional[Callable]) -> Tuple[int, bool]:
+        cursor_key = f"catalog:{key}:cursor"
+        index_key = f"catalog:{key}:index"
+        top_key = f"catalog:{key}:top"
+
+        cursor = self.db.get_sync_state(cursor_key)
+        index = int(self.db.get_sync_state(index_key, '0'))
+        top = self.db.get_sync_state(top_key)
+        synced = 0
+
+        while index + PAGE_SIZE <= MAX_SEARCH_INDEX:
+            page = self._fetch_page(filters, index)
+            mods = page.get('data', [])
+            if not mods:
+                break
+            if top is None:
+                top = mods[0]['dateModified']
+            total_count = page.get('pagination', {}).get('totalCount', 0)
+            if divisible and cursor is None and index == 0 and total_count > MAX_SEARCH_INDEX:
+                # Полный обход не дойдёт до конца выборки: её сразу делят, запомнив самый свежий мод
+                self.db.set_sync_state({top_key: top})
+                return synced, False
+
+            index += len(mods)
+            self.db.save_catalog_mods([self._compact(mod) for mod in mods],
+                                      {index_key: str(index), top_key: top})
+            synced += len(mods)
+            if progress_cb:
+                progress_cb(key, synced)
+
+            # Дальше идут моды, не менявшиеся с прошлой синхронизации
+            if cursor and mods[-1]['dateModified'] <= cursor:
+                break
+            if index >= total_count:
+                break
+        else:
+            # С прошлой синхронизации изменилось больше модов, чем отдаёт поиск
+            return synced, False
+
+        self.db.set_sync_state({cursor_key: top or cursor, index_key: None, top_key: None})
+        return synced, True
+
+    def _get(self, path: str, params: Optional[Dict] = None) -> List[Dict]:
+        response = self.session.get(f"{self.api_url}/{path}", params=params,
+                                    headers={'x-api-key': self.api_key}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get('data', [])
+
+    def _fetch_page(self, filters: Dict, index: int) -> Dict:
+        params = dict(filters, **{
+            'gameId': MINECRAFT_GAME_ID,
+            'classId': MODS_CLASS_ID,
+            'sortField': SORT_LAST_UPDATED,
+            'sortOrder': 'desc',
+            'index': index,
+            'pageSize': PAGE_SIZE
+        })
+        response = self.session.get(self.search_url, params=params,
+                                    headers={'x-api-key': self.api_key}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _compact(self, mod: Dict) -> Dict:
+        versions = set()
+        files = []
+        for entry in mod.get('latestFilesIndexes', []):
+            loader = LOADERS.get(entry.get('modLoader'))
+            if loader:
+                versions.add((entry['gameVersion'], loader))
+            files.append({
+                'fileId': entry['fileId'],
+                'gameVersion': entry['gameVersion'],
+                'loader': loader
+            })
+
+        latest_files = mod.get('latestFiles') or [{}]
+        return {
+            'id': mod['id'],
+            'name': mod['name'],
+            'slug': mod.get('slug', ''),
+            'summary': mod.get('summary', ''),
+            'categories': ' '.join(c['name'] for c in mod.get('categories', [])),
+            'downloads': int(mod.get('downloadCount', 0)),
+            'date_modified': mod.get('dateModified', ''),
+            'logo_url': (mod.get('logo') or {}).get('thumbnailUrl'),
+            'download_url': latest_files[0].get('downloadUrl'),
+            'files': files,
+            'versions': sorted(versions)
+        }
@@ -1,27 +1,96 @@
 import os
-import requests
-from typing import List, Dict
+from typing import List, Dict, Optional, Callable
+from downloader import DownloadManager, DownloadTask
+from metadata_cache import MetadataCache
+from mod_catalog import ModCatalog
+from mod_resolver import ModResolver, ResolutionResult
+from mod_scanner import ModScanner
+from mod_updates import ModUpdateChecker, UpdateCheckResult
+from database import Database
+from metrics import METRICS
+from endpoints import endpoint
 
 class ModManager:
-    def __init__(self, config):
+    def __init__(self, config, downloader=None, db=None):
         self.config = config
+        self.db = db or Database(config)
+        self.downloader = downloader or DownloadManager(config)
+        self.meta = MetadataCache(config, self.downloader.session)
+        self.catalog = ModCatalog(self.db, config, self.downloader.session)
+        self.resolver = ModResolver(config, self.downloader.session, self.downloader.workers)
+        self.scanner = ModScanner(self.db)
+        self.updates = ModUpdateChecker(self.db, self.resolver, self.scanner, self.downloader, config)
         self.mod_dir = os.path.expanduser(config['Mods']['mods_dir'])
         self.api_key = config['Mods']['curseforge_api_key']
 
-    def get_featured_mods(self) -> List[Dict]:
-        url = "https://api.curseforge.com/v1/mods/search"
+    def get_featured_mods(self, offline: bool = False) -> List[Dict]:
+        url = f"{endpoint(self.config, 'curseforge_api')}/v1/mods/search"
         params = {
             'gameId': 432,
             'sort': 6,
             'pageSize': 50
         }
         headers = {'x-api-key': self.api_key}
-        response = requests.get(url, params=params, headers=headers)
-        return response.json()['data']
+        return self.meta.get_json(url, params=params, headers=headers, offline=offline)['data']
 
-    def download_mod(self, mod_id: int, file_url: str):
+    def search_mods(self, query: str, loader: Optional[str] = None, game_version: Optional[str] = None,
+                    limit: int = 50, offset: int = 0) -> List[Dict]:
+        return self.catalog.search(query, loader, game_version, limit, offset)
+
+    def has_catalog(self) -> bool:
+        return bool(self.catalog.search(limit=1))
+
+    def sync_catalog(self, progress_cb: Optional[Callable] = None) -> int:
+        with METRICS.phase('catalog.sync'):
+            return self.catalog.sync(progress_cb)
+
+    def scan_installed(self, mod_dir: Optional[str] = None, progress_cb: Optional[Callable] = None) -> int:
+        return self.scanner.scan(mod_dir or self.mod_dir, progress_cb)
+
+    def installed_mods(self, query: str = '', loader: Optional[str] = None, limit: int = 100, offset: int = 0,
+                       mod_dir: Optional[str] = None) -> List[Dict]:
+        # Только чтение индекса: jar заново не открываются
+        return self.scanner.list(mod_dir or self.mod_dir, query, loader, limit, offset)
+
+    def check_updates(self, game_version: str, loader: str, mod_dir: Optional[str] = None) -> UpdateCheckResult:
+        return self.updates.check(mod_dir or self.mod_dir, game_version, loader)
+
+    def update_mods(self, updates: List, progress_cb: Optional[Callable] = None,
+                    speed_cb: Optional[Callable] = None) -> tuple:
+        return self.updates.apply(updates, progress_cb, speed_cb)
+
+    def download_mod(self, mod_id: int, file_url: str, progress_cb: Optional[Callable] = None):
         file_path = os.path.join(self.mod_dir, f"{mod_id}.jar")
-        response = requests.get(file_url, stream=True)
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
\ No newline at end of file
+        self.downloader.download(file_url, file_path, progress_cb=progress_cb)
+
+    def install_mods(self, mod_ids: List[int], game_version: str, loader: str,
+                     progress_cb: Optional[Callable] = None, message_cb: Optional[Callable] = None,
+                     speed_cb: Optional[Callable] = None, mod_dir: Optional[str] = None) -> ResolutionResult:
+        message_cb = message_cb or (lambda m: None)
+        mod_dir = mod_dir or self.mod_dir
+        message_cb("Разрешение зависимостей...")
+        with METRICS.phase('mods.resolve', requested=len(mod_ids)):
+            result = self.resolver.resolve(mod_ids, game_version, loader)
+        if result.conflicts:
+            names = ", ".join(f"{a} и {b}" for a, b in result.conflicts)
+            raise Exception(f"Несовместимые моды: {names}")
+        missing_requested = [mod_id for mod_id, _ in result.missing if mod_id in mod_ids]
+        if missing_requested and not result.mods:
+            raise Exception(f"Нет подходящих файлов для {loader} {game_version}")
+
+        message_cb(f"Скачивание модов: {len(result.mods)}...")
+        mods = list(result.mods.values())
+        tasks = [DownloadTask(mod.download_url, os.path.join(mod_dir, mod.file_name), mod.size, mod.sha1)
+                 for mod in mods]
+        with METRICS.phase('mods.download', files=len(tasks)):
+            self.downloader.download_many(tasks, progress_cb, speed_cb)
+
+        self.db.save_mods([{
+            'name': mod.name,
+            'version': mod.display_name or str(mod.file_id),
+            'file_path': task.path,
+            'mod_id': str(mod.mod_id),
+            'sha1': mod.sha1,
+            'download_url': mod.download_url
+        } for mod, task in zip(mods, tasks)])
+        return result
\ No newline at end of file
@@ -0,0 +1,140 @@
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterable
+from mod_catalog import LOADERS
+from endpoints import endpoint
+
+RELATION_REQUIRED = 3
+RELATION_INCOMPATIBLE = 5
+RELEASE_TYPES = {1: 0, 2: 1, 3: 2}
+HASH_SHA1 = 1
+GAME_ID = 432
+
+LOADER_TYPES = {name: loader_type for loader_type, name in LOADERS.items()}
+
+
+class ResolvedMod:
+    def __init__(self, mod_id: int, file: Dict):
+        self.mod_id = mod_id
+        self.name = file.get('displayName') or file['fileName']
+        self.file_id = file['id']
+        self.file_name = file['fileName']
+        self.display_name = file.get('displayName', '')
+        self.download_url = file.get('downloadUrl')
+        self.size = file.get('fileLength', 0)
+        self.sha1 = next((h['value'] for h in file.get('hashes', []) if h.get('algo') == HASH_SHA1), None)
+        self.dependencies = [d['modId'] for d in file.get('dependencies', [])
+                             if d.get('relationType') == RELATION_REQUIRED]
+        self.incompatible = [d['modId'] for d in file.get('dependencies', [])
+                             if d.get('relationType') == RELATION_INCOMPATIBLE]
+        self.required_by = []
+
+
+class ResolutionResult:
+    def __init__(self):
+        self.mods: Dict[int, ResolvedMod] = {}
+        self.missing: List[tuple] = []
+        self.conflicts: List[tuple] = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.conflicts
+
+
+class ModResolver:
+    def __init__(self, config, session: Optional[requests.Session] = None, workers: int = 8):
+        self.api_key = config['Mods']['curseforge_api_key']
+        self.api_url = f"{endpoint(config, 'curseforge_api')}/v1"
+        self.session = session or requests.Session()
+        self.workers = workers
+        self.timeout = 30
+
+    def _get(self, path: str, params: Optional[Dict] = None) -> Dict:
+        response = self.session.get(f"{self.api_url}{path}", params=params,
+                                    headers={'x-api-key': self.api_key}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _post(self, path: str, payload: Dict) -> Dict:
+        response = self.session.post(f"{self.api_url}{path}", json=payload,
+                                     headers={'x-api-key': self.api_key}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_compatible_files(self, mod_id: int, game_version: str, loader: str) -> List[Dict]:
+        params = {'gameVersion': game_version, 'pageSize': 50}
+        if loader in LOADER_TYPES:
+            params['modLoaderType'] = LOADER_TYPES[loader]
+        files = self._get(f"/mods/{mod_id}/files", params)['data']
+        return [f for f in files if game_version in f.get('gameVersions', []) and f.get('isAvailable', True)]
+
+    def pick_file(self, files: List[Dict]) -> Optional[Dict]:
+        # Стабильные релизы важнее бет и альф, среди равных берётся самый свежий
+        if not files:
+            return None
+        newest_first = sorted(files, key=lambda f: f.get('fileDate', ''), reverse=True)
+        return min(newest_first, key=lambda f: RELEASE_TYPES.get(f.get('releaseType'), 3))
+
+    def _resolve_one(self, mod_id: int, game_version: str, loader: str):
+        try:
+            return self.pick_file(self.get_compatible_files(mod_id, game_version, loader)), None
+        except requests.RequestException as e:
+            return None, str(e)
+
+    def resolve(self, mod_ids: Iterable[int], game_version: str, loader: str) -> ResolutionResult:
+        result = ResolutionResult()
+        seen = set()
+        frontier = list(dict.fromkeys(mod_ids))
+        parents = {mod_id: [] for mod_id in frontier}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Граф обходится по уровням: все моды одного уровня запрашиваются параллельно
+            while frontier:
+                seen.update(frontier)
+                futures = {mod_id: executor.submit(self._resolve_one, mod_id, game_version, loader)
+                           for mod_id in frontier}
+                next_frontier = []
+                for mod_id, future in futures.items():
+                    file, error = future.result()
+                    if file is None:
+                        result.missing.append((mod_id, error or f"Нет файлов для {loader} {game_version}"))
+                        continue
+                    resolved = ResolvedMod(mod_id, file)
+                    resolved.required_by = parents.get(mod_id, [])
+                    if not resolved.download_url:
+                        result.missing.append((mod_id, "Автор запретил скачивание через сторонние лаунчеры"))
+                        continue
+                    result.mods[mod_id] = resolved
+                    for dependency in resolved.dependencies:
+                        parents.setdefault(dependency, []).append(mod_id)
+                        if dependency not in seen and dependency not in next_frontier:
+                            next_frontier.append(dependency)
+                frontier = next_frontier
+
+        for mod in result.mods.values():
+            for other in mod.incompatible:
+                if other in result.mods:
+                    result.conflicts.append((mod.mod_id, other))
+
+        self._fill_names(result)
+        return result
+
+    def get_mods(self, mod_ids: List[int]) -> List[Dict]:
+        return self._post("/mods", {'modIds': list(mod_ids)})['data']
+
+    def get_files(self, file_ids: List[int]) -> List[Dict]:
+        return self._post("/mods/files", {'fileIds': list(file_ids)})['data']
+
+    def get_fingerprint_matches(self, fingerprints: List[int]) -> List[Dict]:
+        return self._post(f"/fingerprints/{GAME_ID}", {'fingerprints': list(fingerprints)})['data']['exactMatches']
+
+    def _fill_names(self, result: ResolutionResult):
+        if not result.mods:
+            return
+        try:
+            mods = self.get_mods(result.mods)
+        except requests.RequestException:
+            return
+        for mod in mods:
+            if mod['id'] in result.mods:
+                result.mods[mod['id']].name = mod['name']
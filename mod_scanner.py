@@ -0,0 +1,268 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import zipfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Callable
+from metrics import METRICS
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+MOD_EXTENSIONS = ('.jar', '.jar.disabled')
+MURMUR_M = 0x5bd1e995
+# Jar читаются кусками: большие моды не загружаются в память целиком
+HASH_CHUNK = 1024 * 1024
+# CurseForge считает отпечаток по файлу без табуляций, переводов строк и пробелов
+FINGERPRINT_SKIP = b'\t\n\r '
+
+
+def _read_json(archive: zipfile.ZipFile, name: str):
+    # Многие моды кладут в JSON переводы строк и табуляции прямо внутри строк
+    return json.loads(archive.read(name).decode('utf-8', errors='replace'), strict=False)
+
+
+def _authors(value) -> str:
+    names = []
+    for author in value or []:
+        names.append(author.get('name', '') if isinstance(author, dict) else str(author))
+    return ', '.join(name for name in names if name)
+
+
+def _parse_fabric(data: Dict, loader: str = 'fabric') -> Dict:
+    return {
+        'loader': loader,
+        'mod_id': data.get('id'),
+        'name': data.get('name') or data.get('id'),
+        'version': data.get('version'),
+        'description': data.get('description', ''),
+        'authors': _authors(data.get('authors')),
+        'depends': sorted(data.get('depends', {}))
+    }
+
+
+def _parse_quilt(data: Dict) -> Dict:
+    loader = data.get('quilt_loader', {})
+    metadata = loader.get('metadata', {})
+    depends = [d if isinstance(d, str) else d.get('id', '') for d in loader.get('depends', [])]
+    contributors = metadata.get('contributors', {})
+    return {
+        'loader': 'quilt',
+        'mod_id': loader.get('id'),
+        'name': metadata.get('name') or loader.get('id'),
+        'version': loader.get('version'),
+        'description': metadata.get('description', ''),
+        'authors': ', '.join(contributors) if isinstance(contributors, dict) else '',
+        'depends': sorted(d for d in depends if d)
+    }
+
+
+def _parse_toml(text: str) -> Dict:
+    if tomllib:
+        return tomllib.loads(text)
+    # Без tomllib (Python < 3.11) достаём только поля первого [[mods]]
+    mods_section = text.split('[[mods]]', 1)[-1].split('[[', 1)[0]
+    fields = dict(re.findall(r'^\s*(\w+)\s*=\s*"([^"]*)"', mods_section, re.MULTILINE))
+    return {'mods': [fields], 'dependencies': {}}
+
+
+def _manifest_version(archive: zipfile.ZipFile) -> Optional[str]:
+    try:
+        manifest = archive.read('META-INF/MANIFEST.MF').decode('utf-8', errors='replace')
+    except KeyError:
+        return None
+    match = re.search(r'^Implementation-Version:\s*(\S+)', manifest, re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def _parse_mods_toml(archive: zipfile.ZipFile, name: str, loader: str) -> Dict:
+    data = _parse_toml(archive.read(name).decode('utf-8', errors='replace'))
+    mod = (data.get('mods') or [{}])[0]
+    version = mod.get('version')
+    if not version or '${' in version:
+        version = _manifest_version(archive) or version
+    dependencies = data.get('dependencies', {}).get(mod.get('modId'), [])
+    return {
+        'loader': loader,
+        'mod_id': mod.get('modId'),
+        'name': mod.get('displayName') or mod.get('modId'),
+        'version': version,
+        'description': (mod.get('description') or '').strip(),
+        'authors': mod.get('authors') or data.get('authors', ''),
+        'depends': sorted({d.get('modId') for d in dependencies
+                           if isinstance(d, dict) and d.get('modId') and d.get('mandatory', d.get('type') == 'required')})
+    }
+
+
+def _parse_mcmod_info(data) -> Dict:
+    mods = data.get('modList', []) if isinstance(data, dict) else data
+    mod = mods[0] if mods else {}
+    return {
+        'loader': 'forge',
+        'mod_id': mod.get('modid'),
+        'name': mod.get('name') or mod.get('modid'),
+        'version': mod.get('version'),
+        'description': mod.get('description', ''),
+        'authors': ', '.join(mod.get('authorList') or mod.get('authors') or []),
+        'depends': sorted(mod.get('requiredMods') or [])
+    }
+
+
+class Murmur2:
+    # Потоковый MurmurHash2: длина всех данных входит в начальное состояние и должна быть известна заранее
+    def __init__(self, length: int, seed: int = 1):
+        self.h = (seed ^ length) & 0xffffffff
+        self.rest = b''
+
+    def update(self, data: bytes):
+        data = self.rest + data
+        tail = len(data) & ~3
+        words = array('I')
+        words.frombytes(data[:tail])
+        if sys.byteorder == 'big':
+            words.byteswap()
+        h = self.h
+        for k in words:
+            k = (k * MURMUR_M) & 0xffffffff
+            k ^= k >> 24
+            k = (k * MURMUR_M) & 0xffffffff
+            h = ((h * MURMUR_M) & 0xffffffff) ^ k
+        self.h = h
+        self.rest = data[tail:]
+
+    def digest(self) -> int:
+        h, rest = self.h, self.rest
+        if len(rest) == 3:
+            h ^= rest[2] << 16
+        if len(rest) >= 2:
+            h ^= rest[1] << 8
+        if rest:
+            h ^= rest[0]
+            h = (h * MURMUR_M) & 0xffffffff
+        h ^= h >> 13
+        h = (h * MURMUR_M) & 0xffffffff
+        return h ^ (h >> 15)
+
+
+def murmur2(data: bytes, seed: int = 1) -> int:
+    murmur = Murmur2(len(data), seed)
+    murmur.update(data)
+    return murmur.digest()
+
+
+def jar_hashes(path: str) -> Dict:
+    sha1 = hashlib.sha1()
+    length = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            sha1.update(chunk)
+            length += len(chunk.translate(None, FINGERPRINT_SKIP))
+        # Отпечатку нужна длина без пробельных байтов, поэтому он считается вторым проходом из кэша ОС
+        murmur = Murmur2(length)
+        f.seek(0)
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            murmur.update(chunk.translate(None, FINGERPRINT_SKIP))
+    return {
+        'fingerprint': murmur.digest(),
+        'sha1': sha1.hexdigest()
+    }
+
+
+def parse_mod_jar(path: str) -> Dict:
+    # Читаются только нужные записи через центральный каталог zip, без распаковки jar
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+            if 'fabric.mod.json' in names:
+                return _parse_fabric(_read_json(archive, 'fabric.mod.json'))
+            if 'quilt.mod.json' in names:
+                return _parse_quilt(_read_json(archive, 'quilt.mod.json'))
+            if 'META-INF/neoforge.mods.toml' in names:
+                return _parse_mods_toml(archive, 'META-INF/neoforge.mods.toml', 'neoforge')
+            if 'META-INF/mods.toml' in names:
+                return _parse_mods_toml(archive, 'META-INF/mods.toml', 'forge')
+            if 'mcmod.info' in names:
+                return _parse_mcmod_info(_read_json(archive, 'mcmod.info'))
+            return {'error': "Нет метаданных мода"}
+    except (zipfile.BadZipFile, OSError, ValueError, KeyError, IndexError, AttributeError, TypeError) as e:
+        return {'error': str(e) or type(e).__name__}
+
+
+def scan_mod_jar(path: str) -> Dict:
+    # Метаданные и отпечатки за одно открытие файла в рабочем процессе
+    info = parse_mod_jar(path)
+    try:
+        info.update(jar_hashes(path))
+    except OSError as e:
+        info.setdefault('error', str(e))
+    return info
+
+
+class ModScanner:
+    def __init__(self, db, workers: Optional[int] = None):
+        self.db = db
+        self.workers = workers or os.cpu_count() or 4
+
+    def scan(self, mods_dir: str, progress_cb: Optional[Callable] = None) -> int:
+        mods_dir = os.path.abspath(mods_dir)
+        known = self.db.get_mod_index_stats(mods_dir)
+        current = {}
+        if os.path.isdir(mods_dir):
+            for entry in os.scandir(mods_dir):
+                if entry.is_file() and entry.name.endswith(MOD_EXTENSIONS):
+                    stat = entry.stat()
+                    current[entry.path] = (stat.st_size, stat.st_mtime_ns)
+
+        # Заново разбираются только новые jar и jar с изменившимися размером или mtime
+        changed = [path for path, stats in current.items() if known.get(path) != stats]
+        removed = [path for path in known if path not in current]
+        if removed:
+            self.db.delete_mod_index(removed)
+        if not changed:
+            return 0
+
+        # Отпечаток считается на чистом Python и держит GIL: даже один jar разбирается в отдельном процессе,
+        # чтобы поток сканирования не подвешивал интерфейс
+        with METRICS.phase('mods.scan', files=len(changed)):
+            workers = min(self.workers, len(changed))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(scan_mod_jar, changed, chunksize=max(1, min(8, len(changed) // workers)))
+                entries = self._entries(mods_dir, changed, results, current, progress_cb)
+        self.db.save_mod_index(entries)
+        METRICS.incr('mods.scanned', len(entries))
+        return len(entries)
+
+    def _entries(self, mods_dir: str, paths: List[str], results, stats: Dict, progress_cb: Optional[Callable]) -> List[Dict]:
+        entries = []
+        for number, (path, info) in enumerate(zip(paths, results), start=1):
+            size, mtime_ns = stats[path]
+            file_name = os.path.basename(path)
+            entries.append({
+                'path': path,
+                'directory': mods_dir,
+                'size': size,
+                'mtime_ns': mtime_ns,
+                'loader': info.get('loader'),
+                'mod_id': info.get('mod_id'),
+                'name': info.get('name') or file_name,
+                'version': info.get('version'),
+                'description': info.get('description', ''),
+                'authors': info.get('authors', ''),
+                'depends': info.get('depends', []),
+                'enabled': not file_name.endswith('.disabled'),
+                'fingerprint': info.get('fingerprint'),
+                'sha1': info.get('sha1'),
+                'error': info.get('error')
+            })
+            if progress_cb:
+                progress_cb(int(number * 100 / len(paths)))
+        return entries
+
+    def list(self, mods_dir: str, query: str = '', loader: Optional[str] = None,
+             limit: int = 100, offset: int = 0) -> List[Dict]:
+        return self.db.search_mod_index(os.path.abspath(mods_dir), query, loader, limit, offset)
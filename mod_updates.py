@@ -0,0 +1,180 @@
+import os
+from typing import List, Dict, Optional, Callable, Tuple
+from downloader import DownloadTask, DownloadError
+from mod_resolver import ResolvedMod, LOADER_TYPES, RELEASE_TYPES
+from endpoints import endpoint
+from metrics import METRICS
+
+# Отпечатков/хэшей в одном запросе; 300 модов укладываются в один запрос к каждому сервису
+LOOKUP_BATCH = 500
+
+SOURCE_CURSEFORGE = 'curseforge'
+SOURCE_MODRINTH = 'modrinth'
+
+
+def _chunks(items: List, size: int):
+    for offset in range(0, len(items), size):
+        yield items[offset:offset + size]
+
+
+class ModUpdate:
+    def __init__(self, path: str, name: str, current_version: Optional[str], source: str, mod_id: str,
+                 file_name: str, version: str, download_url: str, sha1: Optional[str], size: int):
+        self.path = path
+        self.name = name
+        self.current_version = current_version
+        self.source = source
+        self.mod_id = mod_id
+        self.file_name = file_name
+        self.version = version
+        self.download_url = download_url
+        self.sha1 = sha1
+        self.size = size
+
+
+class UpdateCheckResult:
+    def __init__(self):
+        self.checked = 0
+        self.identified = 0
+        self.updates: List[ModUpdate] = []
+        self.missing: List[tuple] = []
+
+
+class ModUpdateChecker:
+    def __init__(self, db, resolver, scanner, downloader, config):
+        self.db = db
+        self.resolver = resolver
+        self.scanner = scanner
+        self.downloader = downloader
+        self.modrinth_url = f"{endpoint(config, 'modrinth_api')}/v2"
+
+    def check(self, mod_dir: str, game_version: str, loader: str) -> UpdateCheckResult:
+        # Отпечатки берутся из индекса сканера: пересчитываются только изменившиеся jar
+        self.scanner.scan(mod_dir)
+        mods = [mod for mod in self.scanner.list(mod_dir, limit=-1) if mod['enabled'] and mod['sha1']]
+        result = UpdateCheckResult()
+        result.checked = len(mods)
+        with METRICS.phase('mods.update_check', mods=len(mods)):
+            identified = self._curseforge_updates(mods, game_version, loader, result)
+            rest = [mod for mod in mods if mod['path'] not in identified]
+            identified |= self._modrinth_updates(rest, game_version, loader, result)
+        result.identified = len(identified)
+        return result
+
+    def _curseforge_updates(self, mods: List[Dict], game_version: str, loader: str,
+                            result: UpdateCheckResult) -> set:
+        by_fingerprint = {mod['fingerprint']: mod for mod in mods if mod['fingerprint'] is not None}
+        current = {}
+        try:
+            for chunk in _chunks(list(by_fingerprint), LOOKUP_BATCH):
+                for match in self.resolver.get_fingerprint_matches(chunk):
+                    local = by_fingerprint.get(match['file'].get('fileFingerprint'))
+                    if local:
+                        current[match['id']] = (local, match['file'])
+            if not current:
+                return set()
+
+            # Самый свежий подходящий файл каждого мода есть в latestFilesIndexes: отдельный запрос на мод не нужен
+            loader_type = LOADER_TYPES.get(loader)
+            names = {}
+            newest = []
+            for chunk in _chunks(list(current), LOOKUP_BATCH):
+                for mod in self.resolver.get_mods(chunk):
+                    names[mod['id']] = mod['name']
+                    candidates = [entry for entry in mod.get('latestFilesIndexes', [])
+                                  if entry.get('gameVersion') == game_version
+                                  and (loader_type is None or entry.get('modLoader') == loader_type)]
+                    if not candidates:
+                        continue
+                    by_date = sorted(candidates, key=lambda entry: entry['fileId'], reverse=True)
+                    best = min(by_date, key=lambda entry: RELEASE_TYPES.get(entry.get('releaseType'), 3))
+                    if best['fileId'] != current[mod['id']][1]['id']:
+                        newest.append(best['fileId'])
+
+            for chunk in _chunks(newest, LOOKUP_BATCH):
+                for file in self.resolver.get_files(chunk):
+                    local, _ = current[file['modId']]
+                    resolved = ResolvedMod(file['modId'], file)
+                    name = names.get(file['modId'], local['name'])
+                    if not resolved.download_url:
+                        result.missing.append((name, "Автор запретил скачивание через сторонние лаунчеры"))
+                        continue
+                    result.updates.append(ModUpdate(local['path'], name, local['version'], SOURCE_CURSEFORGE,
+                                                    str(file['modId']), resolved.file_name,
+                                                    resolved.display_name or resolved.file_name,
+                                                    resolved.download_url, resolved.sha1, resolved.size))
+        except Exception as e:
+            print(f"Error checking CurseForge updates: {str(e)}")
+        return {local['path'] for local, _ in current.values()}
+
+    def _modrinth_updates(self, mods: List[Dict], game_version: str, loader: str,
+                          result: UpdateCheckResult) -> set:
+        by_sha1 = {mod['sha1']: mod for mod in mods}
+        identified = set()
+        for chunk in _chunks(list(by_sha1), LOOKUP_BATCH):
+            try:
+                response = self.downloader.session.post(f"{self.modrinth_url}/version_files/update", json={
+                    'hashes': chunk,
+                    'algorithm': 'sha1',
+                    'loaders': [loader],
+                    'game_versions': [game_version]
+                }, timeout=30)
+                response.raise_for_status()
+                versions = response.json()
+            except Exception as e:
+                print(f"Error checking Modrinth updates: {str(e)}")
+                continue
+            for digest, version in versions.items():
+                local = by_sha1.get(digest)
+                files = version.get('files', [])
+                if not local or not files:
+                    continue
+                identified.add(local['path'])
+                file = next((f for f in files if f.get('primary')), files[0])
+                if file.get('hashes', {}).get('sha1') == digest:
+                    continue
+                result.updates.append(ModUpdate(local['path'], local['name'], local['version'], SOURCE_MODRINTH,
+                                                version.get('project_id', ''), file['filename'],
+                                                version.get('version_number', ''), file['url'],
+                                                file.get('hashes', {}).get('sha1'), file.get('size', 0)))
+        return identified
+
+    def apply(self, updates: List[ModUpdate], progress_cb: Optional[Callable] = None,
+              speed_cb: Optional[Callable] = None) -> Tuple[List[ModUpdate], List[tuple]]:
+        tasks = [(update, DownloadTask(update.download_url, os.path.join(os.path.dirname(update.path), update.file_name),
+                                       update.size, update.sha1)) for update in updates]
+        with METRICS.phase('mods.update', files=len(tasks)):
+            try:
+                self.downloader.download_many([task for _, task in tasks], progress_cb, speed_cb)
+                errors = set()
+            except DownloadError as e:
+                print(f"Error downloading mod updates: {str(e)}")
+                errors = {id(task) for task in e.failed}
+            except Exception as e:
+                print(f"Error downloading mod updates: {str(e)}")
+                errors = {id(task) for _, task in tasks}
+
+        updated = []
+        failed = []
+        for update, task in tasks:
+            # Файл с тем же именем мог остаться от старой версии: успех определяет загрузчик, а не наличие файла
+            if id(task) in errors:
+                failed.append((update.name, "Не удалось скачать"))
+                continue
+            # Старый jar удаляется только после успешной загрузки нового, иначе мод останется прежним
+            if os.path.abspath(task.path) != os.path.abspath(update.path) and os.path.exists(update.path):
+                os.remove(update.path)
+            updated.append(update)
+
+        self.db.save_mods([{
+            'name': update.name,
+            'version': update.version,
+            'file_path': os.path.join(os.path.dirname(update.path), update.file_name),
+            'mod_id': update.mod_id,
+            'sha1': update.sha1,
+            'download_url': update.download_url
+        } for update in updated])
+        for mod_dir in {os.path.dirname(update.path) for update in updated}:
+            self.scanner.scan(mod_dir)
+        METRICS.incr('mods.updated', len(updated))
+        return updated, failed
@@ -0,0 +1,282 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import zipfile
+from typing import List, Dict, Optional, Callable
+from downloader import DownloadTask, DownloadError
+from endpoints import endpoint
+from metrics import METRICS
+
+MRPACK_INDEX = 'modrinth.index.json'
+CURSEFORGE_MANIFEST = 'manifest.json'
+HASH_SHA1 = 1
+
+# Зависимость в modrinth.index.json / id загрузчика CurseForge -> тип версии лаунчера
+MRPACK_LOADERS = {
+    'fabric-loader': 'fabric',
+    'quilt-loader': 'quilt',
+    'forge': 'forge',
+    'neoforge': 'neoforge'
+}
+SUPPORTED_LOADERS = ('vanilla', 'fabric', 'forge')
+
+# classId CurseForge -> каталог внутри сборки
+CURSEFORGE_CLASS_DIRS = {
+    6: 'mods',
+    12: 'resourcepacks',
+    6552: 'shaderpacks'
+}
+
+EXPORT_OVERRIDES = ('config', 'defaultconfigs', 'kubejs', 'resourcepacks', 'shaderpacks', 'options.txt')
+
+
+class ModpackInfo:
+    def __init__(self, pack_format: str, name: str, version: str, game_version: str, loader: str,
+                 loader_version: Optional[str]):
+        self.format = pack_format
+        self.name = name
+        self.version = version
+        self.game_version = game_version
+        self.loader = loader
+        self.loader_version = loader_version
+
+
+class ModpackResult:
+    def __init__(self, info: ModpackInfo):
+        self.info = info
+        self.installed: List[str] = []
+        self.missing: List[tuple] = []
+        self.overrides = 0
+        self.instance = None
+
+
+def _safe_path(root: str, relative: str) -> str:
+    # Пути из архива не должны выходить за пределы каталога сборки
+    root = os.path.abspath(root)
+    target = os.path.abspath(os.path.join(root, relative))
+    if os.path.isabs(relative) or not target.startswith(root + os.sep):
+        raise Exception(f"Недопустимый путь в модпаке: {relative}")
+    return target
+
+
+def read_modpack_info(path: str) -> ModpackInfo:
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        if MRPACK_INDEX in names:
+            index = json.loads(archive.read(MRPACK_INDEX))
+            dependencies = dict(index.get('dependencies', {}))
+            game_version = dependencies.pop('minecraft', None)
+            loader, loader_version = 'vanilla', None
+            for key, value in dependencies.items():
+                if key in MRPACK_LOADERS:
+                    loader, loader_version = MRPACK_LOADERS[key], value
+            return ModpackInfo('mrpack', index.get('name', 'Modpack'), index.get('versionId', ''),
+                               game_version, loader, loader_version)
+        if CURSEFORGE_MANIFEST in names:
+            manifest = json.loads(archive.read(CURSEFORGE_MANIFEST))
+            minecraft = manifest.get('minecraft', {})
+            loaders = minecraft.get('modLoaders', [])
+            primary = next((l for l in loaders if l.get('primary')), loaders[0] if loaders else None)
+            loader, loader_version = 'vanilla', None
+            if primary:
+                loader, _, loader_version = primary['id'].partition('-')
+            return ModpackInfo('curseforge', manifest.get('name', 'Modpack'), manifest.get('version', ''),
+                               minecraft.get('version'), loader, loader_version)
+    raise Exception("Файл не похож на модпак Modrinth или CurseForge")
+
+
+class ModpackManager:
+    def __init__(self, db, mod_manager, config):
+        self.db = db
+        self.downloader = mod_manager.downloader
+        self.resolver = mod_manager.resolver
+        self.modrinth_url = f"{endpoint(config, 'modrinth_api')}/v2"
+
+    def import_pack(self, path: str, info: ModpackInfo, game_dir: str, progress_cb: Optional[Callable] = None,
+                    message_cb: Optional[Callable] = None, speed_cb: Optional[Callable] = None) -> ModpackResult:
+        message_cb = message_cb or (lambda m: None)
+        result = ModpackResult(info)
+        # Архив читается по записям: оверрайды пишутся сразу в каталог сборки, без временной распаковки
+        with zipfile.ZipFile(path) as archive:
+            if info.format == 'mrpack':
+                index = json.loads(archive.read(MRPACK_INDEX))
+                tasks = self._mrpack_tasks(index, game_dir)
+                prefixes = ['overrides/', 'client-overrides/']
+            else:
+                manifest = json.loads(archive.read(CURSEFORGE_MANIFEST))
+                message_cb("Получение списка файлов CurseForge...")
+                tasks = self._curseforge_tasks(manifest, game_dir, result)
+                prefixes = [f"{manifest.get('overrides', 'overrides').strip('/')}/"]
+
+            message_cb("Копирование файлов модпака...")
+            with METRICS.phase('modpack.overrides', pack=info.name):
+                for prefix in prefixes:
+                    result.overrides += self._extract_overrides(archive, prefix, game_dir)
+
+        message_cb(f"Скачивание файлов модпака: {len(tasks)}...")
+        with METRICS.phase('modpack.download', pack=info.name, files=len(tasks)):
+            try:
+                self.downloader.download_many([task for task, _ in tasks], progress_cb, speed_cb)
+                errors = set()
+            except DownloadError as e:
+                print(f"Error downloading modpack files: {str(e)}")
+                errors = {id(task) for task in e.failed}
+            except Exception as e:
+                print(f"Error downloading modpack files: {str(e)}")
+                errors = {id(task) for task, _ in tasks}
+
+        mods = []
+        for task, mod_id in tasks:
+            # Файл мог остаться от прошлого импорта в тот же каталог: успех определяет загрузчик
+            if id(task) in errors:
+                result.missing.append((os.path.basename(task.path), "Не удалось скачать"))
+                continue
+            result.installed.append(task.path)
+            if os.path.basename(os.path.dirname(task.path)) == 'mods':
+                mods.append({
+                    'name': os.path.splitext(os.path.basename(task.path))[0],
+                    'version': info.version,
+                    'file_path': task.path,
+                    'mod_id': mod_id,
+                    'sha1': task.sha1,
+                    'download_url': task.url
+                })
+        self.db.save_mods(mods)
+        return result
+
+    def _mrpack_tasks(self, index: Dict, game_dir: str) -> List[tuple]:
+        tasks = []
+        for entry in index.get('files', []):
+            if entry.get('env', {}).get('client') == 'unsupported' or not entry.get('downloads'):
+                continue
+            tasks.append((DownloadTask(entry['downloads'][0], _safe_path(game_dir, entry['path']),
+                                       entry.get('fileSize', 0), entry.get('hashes', {}).get('sha1')), None))
+        return tasks
+
+    def _curseforge_tasks(self, manifest: Dict, game_dir: str, result: ModpackResult) -> List[tuple]:
+        entries = [f for f in manifest.get('files', []) if f.get('required', True)]
+        if not entries:
+            return []
+        files = self.resolver.get_files([f['fileID'] for f in entries])
+        class_ids = {mod['id']: mod.get('classId') for mod in self.resolver.get_mods({f['modId'] for f in files})}
+        tasks = []
+        for file in files:
+            if not file.get('downloadUrl'):
+                result.missing.append((file['fileName'], "Автор запретил скачивание через сторонние лаунчеры"))
+                continue
+            directory = CURSEFORGE_CLASS_DIRS.get(class_ids.get(file['modId']), 'mods')
+            sha1 = next((h['value'] for h in file.get('hashes', []) if h.get('algo') == HASH_SHA1), None)
+            path = _safe_path(game_dir, os.path.join(directory, file['fileName']))
+            tasks.append((DownloadTask(file['downloadUrl'], path, file.get('fileLength', 0), sha1), str(file['modId'])))
+        return tasks
+
+    def _extract_overrides(self, archive: zipfile.ZipFile, prefix: str, game_dir: str) -> int:
+        count = 0
+        for entry in archive.infolist():
+            if entry.is_dir() or not entry.filename.startswith(prefix):
+                continue
+            target = _safe_path(game_dir, entry.filename[len(prefix):])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.tmp"
+            with archive.open(entry) as source, open(tmp_path, 'wb') as destination:
+                shutil.copyfileobj(source, destination, 1024 * 1024)
+            os.replace(tmp_path, target)
+            count += 1
+        return count
+
+    def export_pack(self, instance: Dict, version_data: Dict, path: str) -> int:
+        game_dir = instance['game_dir']
+        mods_dir = os.path.join(game_dir, 'mods')
+        jars = sorted(os.path.join(mods_dir, name) for name in os.listdir(mods_dir)
+                      if name.endswith('.jar')) if os.path.isdir(mods_dir) else []
+        hashes = {jar: self._file_hashes(jar) for jar in jars}
+        known = self._modrinth_lookup([h['sha1'] for h in hashes.values()])
+
+        files = []
+        embedded = []
+        for jar, digest in hashes.items():
+            url = known.get(digest['sha1'])
+            if not url:
+                # Мод не найден на Modrinth: кладётся в архив как оверрайд
+                embedded.append(jar)
+                continue
+            files.append({
+                'path': f"mods/{os.path.basename(jar)}",
+                'hashes': digest,
+                'env': {'client': 'required', 'server': 'required'},
+                'downloads': [url],
+                'fileSize': os.path.getsize(jar)
+            })
+
+        index = {
+            'formatVersion': 1,
+            'game': 'minecraft',
+            'versionId': '1.0.0',
+            'name': instance['name'],
+            'files': files,
+            'dependencies': self._dependencies(version_data)
+        }
+        tmp_path = f"{path}.tmp"
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(MRPACK_INDEX, json.dumps(index, ensure_ascii=False, indent=2))
+            # Jar уже сжаты: повторное сжатие только тратит время
+            for jar in embedded:
+                archive.write(jar, f"overrides/mods/{os.path.basename(jar)}", zipfile.ZIP_STORED)
+            for name in EXPORT_OVERRIDES:
+                source = os.path.join(game_dir, name)
+                for file_path in self._walk(source):
+                    archive.write(file_path, f"overrides/{os.path.relpath(file_path, game_dir).replace(os.sep, '/')}")
+        os.replace(tmp_path, path)
+        return len(files) + len(embedded)
+
+    def _walk(self, source: str) -> List[str]:
+        if os.path.isfile(source):
+            return [source]
+        paths = []
+        for root, _, names in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in names)
+        return sorted(paths)
+
+    def _file_hashes(self, path: str) -> Dict[str, str]:
+        sha1 = hashlib.sha1()
+        sha512 = hashlib.sha512()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha1.update(block)
+                sha512.update(block)
+        return {'sha1': sha1.hexdigest(), 'sha512': sha512.hexdigest()}
+
+    def _modrinth_lookup(self, sha1_hashes: List[str]) -> Dict[str, str]:
+        # Один запрос на все моды: sha1 -> адрес файла на Modrinth
+        if not sha1_hashes:
+            return {}
+        try:
+            response = self.downloader.session.post(f"{self.modrinth_url}/version_files",
+                                                    json={'hashes': sha1_hashes, 'algorithm': 'sha1'}, timeout=30)
+            response.raise_for_status()
+            versions = response.json()
+        except Exception as e:
+            print(f"Error looking up mods on Modrinth: {str(e)}")
+            return {}
+        urls = {}
+        for digest, version in versions.items():
+            for file in version.get('files', []):
+                if file.get('hashes', {}).get('sha1') == digest:
+                    urls[digest] = file['url']
+        return urls
+
+    def _dependencies(self, version_data: Dict) -> Dict[str, str]:
+        dependencies = {'minecraft': version_data['version']}
+        version_id = version_data.get('version_id') or ''
+        if version_data['type'] == 'fabric':
+            # fabric-loader-<версия загрузчика>-<версия игры>
+            match = re.match(r"fabric-loader-(.+)-" + re.escape(version_data['version']) + "$", version_id)
+            if match:
+                dependencies['fabric-loader'] = match.group(1)
+        elif version_data['type'] == 'forge':
+            match = re.match(re.escape(version_data['version']) + r"-forge-?(.+)$", version_id)
+            if match:
+                dependencies['forge'] = match.group(1)
+        return dependencies
@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import shutil
+import zipfile
+import hashlib
+import platform
+import threading
+from typing import List, Dict, Optional, Tuple
+from version_files import load_version_chain
+
+NATIVE_EXTENSIONS = ('.so', '.dll', '.dylib', '.jnilib')
+MANIFEST_NAME = '.manifest.json'
+
+_ensure_locks: Dict[str, threading.Lock] = {}
+_ensure_locks_guard = threading.Lock()
+
+# natives-платформа лаунчера -> имя ОС в правилах и ключах "natives" старых JSON
+LEGACY_OS_NAMES = {
+    'natives-windows': 'windows',
+    'natives-linux': 'linux',
+    'natives-macos': 'osx'
+}
+
+# os.arch из правил JSON (значения Java) -> архитектура машины
+RULE_ARCHES = {
+    'x86': 'x86',
+    'amd64': 'x86_64',
+    'x86_64': 'x86_64',
+    'aarch64': 'arm64',
+    'arm64': 'arm64',
+    'arm': 'arm32'
+}
+# Суффиксы классификаторов natives-<ОС> под архитектуру в порядке предпочтения; без суффикса — сборка под x86_64
+ARCH_SUFFIXES = {
+    'x86_64': [''],
+    'x86': ['-x86', ''],
+    'arm64': ['-arm64', '-aarch_64', ''],
+    'arm32': ['-arm32', '']
+}
+
+
+def machine_arch() -> str:
+    machine = platform.machine().lower()
+    if machine in ('arm64', 'aarch64', 'armv8l', 'armv8b'):
+        return 'arm64'
+    if machine.startswith('arm'):
+        return 'arm32'
+    if machine in ('i386', 'i486', 'i586', 'i686', 'x86'):
+        return 'x86'
+    return 'x86_64'
+
+
+def _os_version(os_name: str) -> str:
+    # То же, что System.getProperty("os.version") у Java, с которым сверяет правила официальный лаунчер
+    if os_name == 'osx':
+        return platform.mac_ver()[0]
+    if os_name == 'windows':
+        return platform.version()
+    return platform.release()
+
+
+def _rules_allow(rules: Optional[List[Dict]], os_name: str, arch: str) -> bool:
+    if not rules:
+        return True
+    allowed = False
+    for rule in rules:
+        os_rule = rule.get('os', {})
+        if os_rule.get('name') not in (None, os_name):
+            continue
+        if 'arch' in os_rule and RULE_ARCHES.get(os_rule['arch'], os_rule['arch']) != arch:
+            continue
+        if 'version' in os_rule and not re.search(os_rule['version'], _os_version(os_name)):
+            continue
+        allowed = rule.get('action') == 'allow'
+    return allowed
+
+
+def _native_suffix(library: Dict, natives_platform: str) -> Optional[str]:
+    # Суффикс архитектуры, если библиотека — архив natives этой ОС: org.lwjgl:lwjgl:3.3.3:natives-macos-arm64
+    classifier = library.get('name', '').rpartition(':')[2]
+    if classifier == natives_platform or classifier.startswith(f"{natives_platform}-"):
+        return classifier[len(natives_platform):]
+    return None
+
+
+def platform_libraries(libraries: List[Dict], natives_platform: str) -> List[Dict]:
+    # Библиотеки для этой машины: правила ОС, архитектуры и версии ОС, а из архивов natives одного
+    # артефакта — собранный под архитектуру машины, если он есть, иначе общий
+    os_name = LEGACY_OS_NAMES.get(natives_platform, 'linux')
+    arch = machine_arch()
+    suffixes = ARCH_SUFFIXES.get(arch, [''])
+    allowed = [library for library in libraries if _rules_allow(library.get('rules'), os_name, arch)]
+    best = {}
+    for library in allowed:
+        suffix = _native_suffix(library, natives_platform)
+        if suffix in suffixes:
+            group = library['name'].rpartition(':')[0]
+            best[group] = min(best.get(group, len(suffixes)), suffixes.index(suffix))
+    selected = []
+    for library in allowed:
+        suffix = _native_suffix(library, natives_platform)
+        if suffix is not None and (suffix not in suffixes or
+                                   suffixes.index(suffix) != best[library['name'].rpartition(':')[0]]):
+            continue
+        selected.append(library)
+    return selected
+
+
+def _native_artifact(library: Dict, natives_platform: str) -> Optional[Dict]:
+    downloads = library.get('downloads', {})
+    if 'natives' in library:
+        # Старые JSON: классификатор из карты natives, ${arch} — разрядность
+        os_name = LEGACY_OS_NAMES.get(natives_platform, 'linux')
+        bits = '64' if machine_arch() in ('x86_64', 'arm64') else '32'
+        classifier = library['natives'].get(os_name, '').replace('${arch}', bits)
+        return downloads.get('classifiers', {}).get(classifier)
+    if _native_suffix(library, natives_platform) is not None:
+        return downloads.get('artifact')
+    return None
+
+
+def library_artifacts(library: Dict, natives_platform: str) -> List[Dict]:
+    # Артефакты библиотеки из platform_libraries: основной jar и архив нативных библиотек
+    artifacts = [library.get('downloads', {}).get('artifact')]
+    if 'natives' in library:
+        artifacts.append(_native_artifact(library, natives_platform))
+    return [artifact for artifact in artifacts if artifact and artifact.get('path')]
+
+
+def native_artifacts(minecraft_dir: str, version_id: str, natives_platform: str) -> List[Tuple[str, str]]:
+    # Архивы с нативными библиотеками версии: (путь к jar, sha1)
+    libraries_dir = os.path.join(minecraft_dir, 'libraries')
+    artifacts = []
+    for data in load_version_chain(minecraft_dir, version_id):
+        for library in platform_libraries(data.get('libraries', []), natives_platform):
+            artifact = _native_artifact(library, natives_platform)
+            if artifact and artifact.get('path'):
+                artifacts.append((os.path.join(libraries_dir, artifact['path']), artifact.get('sha1', '')))
+    return artifacts
+
+
+def is_natives_ready(natives_dir: Optional[str]) -> bool:
+    return bool(natives_dir) and os.path.exists(os.path.join(natives_dir, MANIFEST_NAME))
+
+
+class NativesCache:
+    def __init__(self, minecraft_dir: str, natives_platform: str):
+        self.root = os.path.join(minecraft_dir, 'natives')
+        self.minecraft_dir = minecraft_dir
+        self.natives_platform = natives_platform
+
+    def ensure(self, version_id: str) -> str:
+        artifacts = native_artifacts(self.minecraft_dir, version_id, self.natives_platform)
+        # Версии с одинаковыми архивами LWJGL получают один и тот же каталог
+        digest = hashlib.sha1(self.natives_platform.encode('utf-8'))
+        for path, sha1 in sorted(artifacts, key=lambda a: a[1] or a[0]):
+            digest.update((sha1 or os.path.basename(path)).encode('utf-8'))
+        natives_dir = os.path.join(self.root, digest.hexdigest()[:16])
+        if is_natives_ready(natives_dir):
+            return natives_dir
+
+        # Сборки с общим каталогом внутри процесса собирают его по очереди; второй поток берёт готовый
+        with _ensure_locks_guard:
+            lock = _ensure_locks.setdefault(natives_dir, threading.Lock())
+        with lock:
+            if not is_natives_ready(natives_dir):
+                self._build(version_id, artifacts, natives_dir)
+        return natives_dir
+
+    def _build(self, version_id: str, artifacts: List[Tuple[str, str]], natives_dir: str):
+        tmp_dir = f"{natives_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        files = []
+        for path, _ in artifacts:
+            files.extend(self._extract(path, tmp_dir))
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump({'version': version_id, 'platform': self.natives_platform, 'files': sorted(files)}, f)
+
+        # Готовый каталог не удаляется: его может держать запущенная игра. Убирается только недособранный
+        if os.path.exists(natives_dir) and not is_natives_ready(natives_dir):
+            stale_dir = f"{natives_dir}.stale-{os.getpid()}"
+            shutil.rmtree(stale_dir, ignore_errors=True)
+            try:
+                os.replace(natives_dir, stale_dir)
+            except FileNotFoundError:
+                pass
+            shutil.rmtree(stale_dir, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, natives_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            # Каталог успел собрать другой процесс лаунчера; без манифеста это настоящая ошибка
+            if not is_natives_ready(natives_dir):
+                raise
+
+    def _extract(self, jar_path: str, target_dir: str) -> List[str]:
+        if not os.path.exists(jar_path):
+            raise Exception(f"Не найден архив нативных библиотек: {jar_path}")
+        extracted = []
+        with zipfile.ZipFile(jar_path) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or not name.endswith(NATIVE_EXTENSIONS):
+                    continue
+                with archive.open(info) as source, open(os.path.join(target_dir, name), 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                extracted.append(name)
+        return extracted
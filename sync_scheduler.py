@@ -0,0 +1,145 @@
+import os
+import json
+import random
+import hashlib
+from typing import List, Dict, Tuple
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from tasks import run_task
+from metrics import METRICS
+
+COALESCE_MS = 2000
+BACKOFF_BASE_S = 30
+BACKOFF_MAX_S = 3600
+
+
+def resource_hash(data: Dict) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def collect_resources(db) -> Dict[Tuple[str, str], Dict]:
+    resources = {}
+    for version in db.get_versions():
+        resources[('version', version['version_id'])] = {
+            'version': version['version'],
+            'type': version['type'],
+            'version_id': version['version_id']
+        }
+    for mod in db.get_mods():
+        resources[('mod', mod['name'])] = {
+            'name': mod['name'],
+            'version': mod['version'],
+            'mod_id': mod['mod_id'],
+            'file': os.path.basename(mod['file_path'] or '')
+        }
+    for instance in db.get_instances():
+        resources[('instance', instance['name'])] = {
+            'name': instance['name'],
+            'version': instance['version'],
+            'version_id': instance['version_id']
+        }
+    return resources
+
+
+def compute_delta(db) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+    # Отправляются только ресурсы, чей хэш отличается от последнего отправленного
+    synced = db.get_synced_hashes()
+    upserted = []
+    for (kind, key), data in collect_resources(db).items():
+        digest = resource_hash(data)
+        if synced.pop((kind, key), None) != digest:
+            upserted.append({'kind': kind, 'key': key, 'hash': digest, 'data': data})
+    return upserted, list(synced)
+
+
+class SyncScheduler(QObject):
+    synced = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, db, api, auth, config, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.api = api
+        self.auth = auth
+        self.interval = 300
+        self.batch_size = 200
+        self.on_startup = True
+        if config.has_section('API'):
+            self.interval = config.getint('API', 'sync_interval', fallback=self.interval)
+            self.batch_size = config.getint('API', 'sync_batch_size', fallback=self.batch_size)
+        if config.has_section('Database'):
+            self.on_startup = config.getboolean('Database', 'sync_on_startup', fallback=self.on_startup)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._run)
+        self.running = False
+        self.pending = False
+        self.failures = 0
+
+    def start(self):
+        if self.on_startup:
+            self.timer.start(COALESCE_MS)
+        else:
+            self._schedule_next()
+
+    def stop(self):
+        self.timer.stop()
+
+    def request_sync(self):
+        # Серия локальных изменений подряд уходит одной синхронизацией
+        if self.running:
+            self.pending = True
+        elif not self.failures and (not self.timer.isActive() or self.timer.remainingTime() > COALESCE_MS):
+            self.timer.start(COALESCE_MS)
+
+    def _schedule_next(self):
+        if self.interval > 0:
+            self.timer.start(self.interval * 1000)
+
+    def _run(self):
+        if self.running:
+            return
+        if not self.auth.is_authenticated():
+            self._schedule_next()
+            return
+        self.running = True
+        self.pending = False
+        run_task(self.sync_now, on_result=self._on_synced, on_error=self._on_failed, on_finished=self._on_finished)
+
+    def sync_now(self) -> int:
+        with METRICS.phase('sync.run'):
+            upserted, deleted = compute_delta(self.db)
+            changes = [('upsert', item) for item in upserted] + [('delete', key) for key in deleted]
+            user = self.auth.get_uuid()
+            for offset in range(0, len(changes), self.batch_size):
+                batch = changes[offset:offset + self.batch_size]
+                payload = {
+                    'user': user,
+                    'upserted': [item for action, item in batch if action == 'upsert'],
+                    'deleted': [{'kind': key[0], 'key': key[1]} for action, key in batch if action == 'delete']
+                }
+                if not self.api.sync_resources(payload):
+                    raise Exception("Сервер отклонил синхронизацию")
+                # Каждый принятый пакет фиксируется сразу: после сбоя отправка продолжится с места остановки
+                self.db.mark_synced([(item['kind'], item['key'], item['hash']) for item in payload['upserted']],
+                                    [(item['kind'], item['key']) for item in payload['deleted']])
+                METRICS.incr('sync.resources', len(batch))
+            return len(changes)
+
+    def _on_synced(self, count: int):
+        self.failures = 0
+        self.synced.emit(count)
+        if self.pending:
+            self.timer.start(COALESCE_MS)
+        else:
+            self._schedule_next()
+
+    def _on_failed(self, message: str):
+        self.failures += 1
+        delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (self.failures - 1))
+        self.timer.start(int(delay * random.uniform(0.8, 1.2) * 1000))
+        METRICS.incr('sync.failures')
+        self.failed.emit(message)
+
+    def _on_finished(self):
+        self.running = False
@@ -0,0 +1,45 @@
+from typing import Callable, Optional
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+_active_tasks = set()
+
+
+class TaskSignals(QObject):
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+
+class Task(QRunnable):
+    def __init__(self, fn: Callable, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+def run_task(fn: Callable, *args, on_result: Optional[Callable] = None, on_error: Optional[Callable] = None,
+             on_finished: Optional[Callable] = None, pool: Optional[QThreadPool] = None, **kwargs) -> Task:
+    task = Task(fn, *args, **kwargs)
+    if on_result:
+        task.signals.result.connect(on_result)
+    if on_error:
+        task.signals.error.connect(on_error)
+    if on_finished:
+        task.signals.finished.connect(on_finished)
+    # Держим ссылку до завершения, иначе сигналы могут не дойти до GUI-потока
+    _active_tasks.add(task)
+    task.signals.finished.connect(lambda: _active_tasks.discard(task))
+    (pool or QThreadPool.globalInstance()).start(task)
+    return task
@@ -0,0 +1,28 @@
+import os
+import sys
+import unittest
+import importlib.util
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmark import DEFERRED_MODULES
+
+
+@unittest.skipUnless(importlib.util.find_spec('PyQt5'), "PyQt5 не установлен")
+class ColdStartTest(unittest.TestCase):
+    def test_main_import_defers_services(self):
+        # Свежий интерпретатор: модули сервисов не должны загружаться до первой отрисовки окна
+        code = (
+            "import sys; import main; "
+            f"print(','.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        loaded = [name for name in result.stdout.strip().split(',') if name]
+        self.assertEqual(loaded, [], f"Загружены при импорте main: {', '.join(loaded)}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import json
+from typing import List, Dict, Optional, Tuple
+
+
+def version_json_path(minecraft_dir: str, version_id: str) -> str:
+    return os.path.join(minecraft_dir, 'versions', version_id, f"{version_id}.json")
+
+
+def maven_path(name: str) -> str:
+    # group:artifact:version[:classifier][@ext] -> путь внутри maven-репозитория
+    extension = 'jar'
+    if '@' in name:
+        name, extension = name.split('@', 1)
+    parts = name.split(':')
+    group, artifact, version = parts[0], parts[1], parts[2]
+    classifier = f"-{parts[3]}" if len(parts) > 3 else ''
+    return '/'.join(group.split('.') + [artifact, version, f"{artifact}-{version}{classifier}.{extension}"])
+
+
+def load_version_chain(minecraft_dir: str, version_id: str) -> List[Dict]:
+    # Цепочка JSON версии: сама версия и все родители через inheritsFrom
+    chain = []
+    current = version_id
+    while current:
+        path = version_json_path(minecraft_dir, current)
+        if not os.path.exists(path):
+            break
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        chain.append(data)
+        current = data.get('inheritsFrom')
+    return chain
+
+
+def collect_version_files(minecraft_dir: str, version_id: str) -> List[Tuple[str, str, int]]:
+    # Файлы версии с известным SHA-1: (абсолютный путь, sha1, размер)
+    files = []
+    libraries_dir = os.path.join(minecraft_dir, 'libraries')
+    for data in load_version_chain(minecraft_dir, version_id):
+        client = data.get('downloads', {}).get('client')
+        if client and client.get('sha1'):
+            jar_path = os.path.join(minecraft_dir, 'versions', data['id'], f"{data['id']}.jar")
+            files.append((jar_path, client['sha1'], client.get('size', 0)))
+
+        for library in data.get('libraries', []):
+            if 'downloads' not in library and library.get('name') and library.get('sha1'):
+                files.append((os.path.join(libraries_dir, maven_path(library['name'])),
+                              library['sha1'], library.get('size', 0)))
+                continue
+            downloads = library.get('downloads', {})
+            artifacts = [downloads.get('artifact')] + list(downloads.get('classifiers', {}).values())
+            for artifact in artifacts:
+                if artifact and artifact.get('path') and artifact.get('sha1'):
+                    files.append((os.path.join(libraries_dir, artifact['path']),
+                                  artifact['sha1'], artifact.get('size', 0)))
+
+        asset_index = data.get('assetIndex')
+        if asset_index and asset_index.get('sha1'):
+            files.extend(collect_asset_files(minecraft_dir, asset_index))
+    return files
+
+
+def collect_asset_files(minecraft_dir: str, asset_index: Dict) -> List[Tuple[str, str, int]]:
+    assets_dir = os.path.join(minecraft_dir, 'assets')
+    index_path = os.path.join(assets_dir, 'indexes', f"{asset_index['id']}.json")
+    files = [(index_path, asset_index['sha1'], asset_index.get('size', 0))]
+    if not os.path.exists(index_path):
+        return files
+
+    with open(index_path, 'r', encoding='utf-8') as f:
+        objects = json.load(f).get('objects', {})
+    for obj in objects.values():
+        digest = obj['hash']
+        files.append((os.path.join(assets_dir, 'objects', digest[:2], digest), digest, obj.get('size', 0)))
+    return files
+
+
+def collect_version_urls(minecraft_dir: str, version_id: str, resources_url: str) -> Dict[str, str]:
+    # Адреса скачивания файлов версии по абсолютному пути, для точечного восстановления
+    urls = {}
+    libraries_dir = os.path.join(minecraft_dir, 'libraries')
+    for data in load_version_chain(minecraft_dir, version_id):
+        client = data.get('downloads', {}).get('client')
+        if client and client.get('url'):
+            urls[os.path.join(minecraft_dir, 'versions', data['id'], f"{data['id']}.jar")] = client['url']
+
+        for library in data.get('libraries', []):
+            if 'downloads' not in library and library.get('name'):
+                base_url = library.get('url', 'https://libraries.minecraft.net/').rstrip('/')
+                urls[os.path.join(libraries_dir, maven_path(library['name']))] = f"{base_url}/{maven_path(library['name'])}"
+                continue
+            downloads = library.get('downloads', {})
+            artifacts = [downloads.get('artifact')] + list(downloads.get('classifiers', {}).values())
+            for artifact in artifacts:
+                if artifact and artifact.get('path') and artifact.get('url'):
+                    urls[os.path.join(libraries_dir, artifact['path'])] = artifact['url']
+
+        asset_index = data.get('assetIndex')
+        if asset_index and asset_index.get('url'):
+            assets_dir = os.path.join(minecraft_dir, 'assets')
+            urls[os.path.join(assets_dir, 'indexes', f"{asset_index['id']}.json")] = asset_index['url']
+            for path, digest, _ in collect_asset_files(minecraft_dir, asset_index)[1:]:
+                urls[path] = f"{resources_url}/{digest[:2]}/{digest}"
+    return urls
+
+
+def find_manifest_entry(manifest: Dict, version_id: str) -> Optional[Dict]:
+    for entry in manifest.get('versions', []):
+        if entry['id'] == version_id:
+            return entry
+    return None